@@ -1,20 +1,29 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import numpy as np
 import cv2
 import math
-from typing import Optional, List, Dict
-import uvicorn
+from typing import Optional, List, Dict, Tuple
 from pydantic import BaseModel
 import io
 from PIL import Image
 import base64
-import pandas as pd
 import os
-from building_recognition import BuildingRecognizer
+import threading
+import time
+import asyncio
+import uuid
+import json
+from building_registry import load_building_registry
+from building_recognition import BuildingRecognizer, RECOGNITION_MODES, extract_descriptors
 from distance_estimator import DistanceEstimator
-from trilateration import TrilaterationSolver, Point
+from geodesy import LocalProjection, CAMPUS_ORIGIN
+from image_decoding import DecodePolicy, decode_image
+from executors import TaskExecutor, TaskTimeout
+from localization import analyze_frame
+from position_stream import PositionBroadcaster, follow, follow_until
+from trilateration import TrilaterationSolver, Point, SESSION_BYTES_ESTIMATE
 from visualization import PositionVisualizer, VisualizationConfig
 
 app = FastAPI(title="FastNUces Explorer API")
@@ -28,44 +37,122 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Working-resolution policy for uploaded images
+DECODE_POLICY = DecodePolicy(
+    max_side=int(os.getenv('DECODE_MAX_SIDE', '1280')),
+    grayscale=os.getenv('DECODE_GRAYSCALE', '1') == '1',
+    keypoint_budget=int(os.getenv('KEYPOINT_BUDGET', '2000'))
+)
+
+# Executor layer: a process pool for feature extraction and clustering and a
+# thread pool for lighter blocking work, so handlers never block the event loop
+executor = TaskExecutor(
+    process_workers=int(os.getenv('EXECUTOR_PROCESS_WORKERS', '0')) or None,
+    thread_workers=int(os.getenv('EXECUTOR_THREAD_WORKERS', '8')),
+    task_timeout=float(os.getenv('EXECUTOR_TASK_TIMEOUT', '30'))
+)
+# Training and vocabulary builds get a longer timeout than per-request work
+TRAINING_TIMEOUT = float(os.getenv('EXECUTOR_TRAINING_TIMEOUT', '300'))
+
 # Initialize recognizers
-building_recognizer = BuildingRecognizer()
-distance_estimator = DistanceEstimator()
-trilateration_solver = TrilaterationSolver()
+# RECOGNIZER_INDEX selects the matching backend ('exact', 'flann' or 'ivf');
+# RECOGNIZER_INDEX_RECALL sets its recall/speed knob (FLANN checks, IVF nprobe)
+RECOGNIZER_INDEX = os.getenv('RECOGNIZER_INDEX', 'flann')
+RECOGNIZER_INDEX_RECALL = os.getenv('RECOGNIZER_INDEX_RECALL')
+index_params = {}
+if RECOGNIZER_INDEX_RECALL:
+    index_params['checks' if RECOGNIZER_INDEX == 'flann' else 'nprobe'] = int(RECOGNIZER_INDEX_RECALL)
+# RECOGNIZER_INCREMENTAL_TRAINING=0 restores a full KMeans refit on every /train_building
+building_recognizer = BuildingRecognizer(
+    index_backend=RECOGNIZER_INDEX,
+    index_params=index_params if RECOGNIZER_INDEX != 'exact' else None,
+    incremental_training=os.getenv('RECOGNIZER_INCREMENTAL_TRAINING', '1') == '1',
+    binary_descriptors=tuple(
+        d.strip() for d in os.getenv('RECOGNIZER_BINARY_DESCRIPTORS', 'orb').split(',') if d.strip()
+    ),
+    keypoint_budget=DECODE_POLICY.keypoint_budget
+)
+# Default recognition mode and descriptor pipeline; requests may override them
+# with the 'mode' and 'descriptor' form fields
+RECOGNIZER_MODE = os.getenv('RECOGNIZER_MODE', 'centers')
+RECOGNIZER_DESCRIPTOR = os.getenv('RECOGNIZER_DESCRIPTOR', 'sift')
+ENABLED_DESCRIPTORS = ['sift'] + list(building_recognizer.binary_stores)
+building_recognizer.cluster_runner = lambda fn, *args: executor.run_cpu_sync(fn, *args, timeout=TRAINING_TIMEOUT)
+# Geometry runs in metres in a campus-local east-north-up frame; latitude and
+# longitude are converted only at the API boundary
+PROJECTION = LocalProjection(
+    float(os.getenv('CAMPUS_ORIGIN_LAT', str(CAMPUS_ORIGIN[0]))),
+    float(os.getenv('CAMPUS_ORIGIN_LON', str(CAMPUS_ORIGIN[1])))
+)
+distance_estimator = DistanceEstimator(projection=PROJECTION)
+# Tracking sessions are capped by count and by an approximate memory budget;
+# idle sessions expire after SESSION_TTL_SECONDS
+SESSION_MEMORY_CAP_MB = float(os.getenv('SESSION_MEMORY_CAP_MB', '64'))
+MAX_SESSIONS = min(
+    int(os.getenv('SESSION_MAX_COUNT', '10000')),
+    max(int(SESSION_MEMORY_CAP_MB * 1024 * 1024) // SESSION_BYTES_ESTIMATE, 1)
+)
+# Closed-form fixes whose RMS range residual is under TRILATERATION_LINEAR_TOLERANCE
+# are returned without nonlinear refinement
+# TRACKING_MODE is the default smoothing of new sessions ('window' or 'kalman')
+trilateration_solver = TrilaterationSolver(
+    max_sessions=MAX_SESSIONS,
+    session_ttl=float(os.getenv('SESSION_TTL_SECONDS', '1800')),
+    linear_tolerance=float(os.getenv('TRILATERATION_LINEAR_TOLERANCE', '1.0')),
+    tracking_mode=os.getenv('TRACKING_MODE', 'window'),
+    kalman_params={
+        'process_noise': float(os.getenv('KALMAN_PROCESS_NOISE', '0.5')),
+        'measurement_noise': float(os.getenv('KALMAN_MEASUREMENT_NOISE', '4.0'))
+    },
+    flush_delay=float(os.getenv('TRILATERATION_FLUSH_DELAY', '0.5')),
+    projection=PROJECTION
+)
+
+def to_lat_lon(points: List[Point]) -> List[Dict[str, float]]:
+    """Convert ENU solver positions to latitude/longitude in one vectorized call"""
+    if not points:
+        return []
+    geodetic = PROJECTION.inverse([[p.x, p.y, p.z] for p in points])
+    return [{"latitude": float(lat), "longitude": float(lon)} for lat, lon, _ in geodetic]
+
+# Push new fixes to streaming clients of their session. Each connection
+# queues at most STREAM_MAX_PENDING fixes; a keepalive goes out after
+# STREAM_KEEPALIVE_SECONDS without fixes (0 disables it). Closed WebSockets
+# are noticed at once; closed SSE clients have to be polled for, every
+# STREAM_DISCONNECT_POLL_SECONDS, even when nothing is sent
+broadcaster = PositionBroadcaster(max_pending=int(os.getenv('STREAM_MAX_PENDING', '32')))
+STREAM_KEEPALIVE = float(os.getenv('STREAM_KEEPALIVE_SECONDS', '15'))
+STREAM_DISCONNECT_POLL = float(os.getenv('STREAM_DISCONNECT_POLL_SECONDS', '1'))
+
+def publish_fix(session_id: str, position: Point, version: int) -> None:
+    if broadcaster.has_subscribers(session_id):
+        broadcaster.publish(session_id, {
+            "version": version,
+            "position": to_lat_lon([position])[0],
+            "time": time.time()
+        })
+
+trilateration_solver.on_fix = publish_fix
 
 # Initialize visualizer
 visualizer = PositionVisualizer(trilateration_solver)
+# Matplotlib figures are not thread-safe
+visualization_lock = threading.Lock()
 
 # Load building data
+# The annotation CSV is compiled once into a small per-building registry
+ANNOTATIONS_FILE = os.getenv('ANNOTATIONS_FILE', '../Module-1/annotations/annotation.csv')
+BUILDING_REGISTRY_FILE = os.getenv('BUILDING_REGISTRY_FILE', 'building_registry.json')
+
 def load_building_data():
     try:
-        # Read the CSV file
-        df = pd.read_csv('../Module-1/annotations/annotation.csv')
+        buildings = load_building_registry(ANNOTATIONS_FILE, BUILDING_REGISTRY_FILE)
         
-        # Extract unique locations and their coordinates
-        buildings = {}
-        for _, row in df.iterrows():
-            location = row['label']
-            if location not in buildings:
-                # Extract coordinates from the location name
-                # This is a simplified example - you'll need to implement proper coordinate extraction
-                lat = 24.9147  # Example latitude
-                lon = 67.0997  # Example longitude
-                
-                # Determine if it's a building or facility
-                building_type = 'building' if 'Block' in location else 'facility'
-                
-                buildings[location] = {
-                    'name': location,
-                    'coordinates': {'latitude': lat, 'longitude': lon},
-                    'type': building_type
-                }
-                
-                # Add to trilateration solver
-                trilateration_solver.update_landmark_position(
-                    location,
-                    Point(lat, lon)
-                )
+        # Add to trilateration solver in one batch
+        trilateration_solver.update_landmark_positions({
+            name: Point(info['coordinates']['latitude'], info['coordinates']['longitude'])
+            for name, info in buildings.items()
+        })
         
         return buildings
     except Exception as e:
@@ -75,6 +162,14 @@ def load_building_data():
 # Load building data
 BUILDINGS = load_building_data()
 
+def building_location(name: str) -> Optional[Tuple[float, float]]:
+    """(lat, lon) of a recognized building from the registry, else from the solver's landmarks"""
+    if name in BUILDINGS:
+        coordinates = BUILDINGS[name]['coordinates']
+        return coordinates['latitude'], coordinates['longitude']
+    landmark = trilateration_solver.landmark_positions.get(name)
+    return (landmark.x, landmark.y) if landmark else None
+
 class Location(BaseModel):
     latitude: float
     longitude: float
@@ -86,41 +181,72 @@ class CalibrationPoint(BaseModel):
 class PositionUpdate(BaseModel):
     distances: Dict[str, float]
     confidences: Optional[Dict[str, float]] = None
+    session_id: Optional[str] = None
+    timestamp: Optional[float] = None  # seconds; defaults to the time the update is processed
+
+class LandmarkUpdate(BaseModel):
+    building_name: str
+    latitude: float
+    longitude: float
+
+class LandmarkBatch(BaseModel):
+    landmarks: List[LandmarkUpdate]
+
+class PositionBatch(BaseModel):
+    fixes: List[PositionUpdate]
 
 @app.post("/recognize_building")
 async def recognize_building(
     image: UploadFile = File(...),
     latitude: float = Form(...),
-    longitude: float = Form(...)
+    longitude: float = Form(...),
+    mode: Optional[str] = Form(None),
+    descriptor: Optional[str] = Form(None)
 ):
     """Recognize buildings from images"""
     try:
         # Read image
         contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image_np = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image_np, decode_info = await executor.run_thread(decode_image, contents, DECODE_POLICY)
         
         if image_np is None:
             raise HTTPException(status_code=400, detail="Invalid image data")
         
-        # Extract features
-        features = building_recognizer.extract_features(image_np)
+        mode = mode or RECOGNIZER_MODE
+        if mode not in RECOGNITION_MODES:
+            raise HTTPException(status_code=400, detail=f"Unknown recognition mode: {mode}")
+        descriptor = descriptor or RECOGNIZER_DESCRIPTOR
+        if descriptor not in ENABLED_DESCRIPTORS:
+            raise HTTPException(status_code=400, detail=f"Descriptor pipeline not enabled: {descriptor}")
+
+        # Extract features in a worker process
+        keypoints, descriptors = await executor.run_cpu(
+            extract_descriptors, image_np, descriptor, DECODE_POLICY.keypoint_budget
+        )
         
         # Recognize building
-        building_name = building_recognizer.recognize(features)
+        building_name = await executor.run_thread(
+            building_recognizer.recognize, (None, descriptors), mode, descriptor
+        )
         
         if building_name:
             building_info = BUILDINGS.get(building_name, {})
             return JSONResponse({
                 "building": building_name,
                 "type": building_info.get('type', 'unknown'),
-                "coordinates": building_info.get('coordinates', {})
+                "coordinates": building_info.get('coordinates', {}),
+                "decode": decode_info,
+                "keypoints": keypoints
             })
         else:
             return JSONResponse({
                 "building": None,
-                "message": "No building recognized"
+                "message": "No building recognized",
+                "decode": decode_info,
+                "keypoints": keypoints
             })
+    except TaskTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -134,22 +260,26 @@ async def estimate_distance(
     try:
         # Read image
         contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image_np = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image_np, decode_info = await executor.run_thread(decode_image, contents, DECODE_POLICY)
         
         if image_np is None:
             raise HTTPException(status_code=400, detail="Invalid image data")
         
         # Estimate distance
-        distance = distance_estimator.estimate_distance(
+        distance = await executor.run_thread(
+            distance_estimator.estimate_distance,
             image_np,
-            (latitude, longitude)
+            (latitude, longitude),
+            decode_info['scale']
         )
         
         return JSONResponse({
             "distance": float(distance),
-            "unit": "meters"
+            "unit": "meters",
+            "decode": decode_info
         })
+    except TaskTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -158,9 +288,12 @@ async def update_position(update: PositionUpdate):
     """Update user position using trilateration"""
     try:
         # Estimate position using trilateration
-        position = trilateration_solver.estimate_position(
+        position = await executor.run_thread(
+            trilateration_solver.estimate_position,
             update.distances,
-            update.confidences
+            update.confidences,
+            update.session_id,
+            update.timestamp
         )
         
         if position is None:
@@ -170,18 +303,131 @@ async def update_position(update: PositionUpdate):
             )
         
         # Get position history for smoothing
-        history = trilateration_solver.get_position_history()
+        history = trilateration_solver.get_position_history(update.session_id)
         
         return JSONResponse({
-            "position": {
-                "latitude": position.x,
-                "longitude": position.y
-            },
-            "history": [
-                {"latitude": p.x, "longitude": p.y}
-                for p in history
+            "position": to_lat_lon([position])[0],
+            "history": to_lat_lon(history),
+            "tracking": trilateration_solver.get_tracking_state(update.session_id)
+        })
+    except TaskTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/update_positions")
+async def update_positions(batch: PositionBatch):
+    """Estimate many positions (e.g. a replayed walk log or many users) in one solve"""
+    try:
+        positions, converged = await executor.run_thread(
+            trilateration_solver.estimate_positions,
+            [fix.distances for fix in batch.fixes],
+            [fix.confidences for fix in batch.fixes],
+            None,
+            [fix.session_id for fix in batch.fixes],
+            [fix.timestamp for fix in batch.fixes]
+        )
+        
+        geodetic = PROJECTION.inverse(positions)
+        return JSONResponse({
+            "positions": [
+                {
+                    "position": {"latitude": float(p[0]), "longitude": float(p[1])} if ok else None,
+                    "converged": bool(ok)
+                }
+                for p, ok in zip(geodetic, converged)
             ]
         })
+    except TaskTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/localize")
+async def localize(
+    images: List[UploadFile] = File(...),
+    latitude: Optional[float] = Form(None),
+    longitude: Optional[float] = Form(None),
+    mode: Optional[str] = Form(None),
+    descriptor: Optional[str] = Form(None),
+    session_id: Optional[str] = Form(None)
+):
+    """Estimate position from one or more images in a single call"""
+    try:
+        request_start = time.perf_counter()
+        mode = mode or RECOGNIZER_MODE
+        descriptor = descriptor or RECOGNIZER_DESCRIPTOR
+        if mode not in RECOGNITION_MODES or descriptor not in ENABLED_DESCRIPTORS:
+            return JSONResponse(status_code=400, content={
+                "detail": f"Unsupported recognition mode or descriptor: {mode}, {descriptor}"
+            })
+        user_location = (latitude, longitude) if latitude is not None and longitude is not None else None
+
+        # Decode, extract features and measure each image once, in parallel worker processes
+        contents = [await image.read() for image in images]
+        frames = await asyncio.gather(*[
+            executor.run_cpu(analyze_frame, data, DECODE_POLICY, descriptor)
+            for data in contents
+        ])
+
+        observations = []
+        distances: Dict[str, List[float]] = {}
+        timings = {"decode": 0.0, "extract": 0.0, "measure": 0.0, "recognize": 0.0, "distance": 0.0}
+        for image, frame in zip(images, frames):
+            for stage, seconds in frame['timings'].items():
+                timings[stage] += seconds
+            if not frame['valid']:
+                observations.append({"image": image.filename, "error": "Invalid image data"})
+                continue
+
+            start = time.perf_counter()
+            building_name = await executor.run_thread(
+                building_recognizer.recognize, (None, frame['descriptors']), mode, descriptor
+            )
+            timings['recognize'] += time.perf_counter() - start
+
+            observation = {
+                "image": image.filename,
+                "building": building_name,
+                "keypoints": frame['keypoints'],
+                "decode": frame['decode']
+            }
+            if building_name and frame['width_px']:
+                start = time.perf_counter()
+                try:
+                    distance = distance_estimator.distance_from_width(
+                        frame['width_px'], user_location, building_location(building_name)
+                    )
+                    observation["distance"] = float(distance)
+                    distances.setdefault(building_name, []).append(float(distance))
+                except ValueError as e:
+                    observation["error"] = str(e)
+                timings['distance'] += time.perf_counter() - start
+            observations.append(observation)
+
+        # Trilaterate from the mean distance to each recognized landmark
+        start = time.perf_counter()
+        position = None
+        if len(distances) >= 3:
+            position = await executor.run_thread(
+                trilateration_solver.estimate_position,
+                {name: float(np.mean(values)) for name, values in distances.items()},
+                None,
+                session_id
+            )
+        timings['trilateration'] = time.perf_counter() - start
+        timings['total'] = time.perf_counter() - request_start
+
+        response = {
+            "position": to_lat_lon([position])[0] if position else None,
+            "observations": observations,
+            "timings_ms": {stage: seconds * 1000.0 for stage, seconds in timings.items()}
+        }
+        if position is None:
+            response["message"] = "Could not estimate position. Need distances to at least 3 landmarks."
+        return JSONResponse(response)
+    except TaskTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -195,25 +441,52 @@ async def get_buildings():
 @app.post("/train_building")
 async def train_building(
     image: UploadFile = File(...),
-    building_name: str = Form(...)
+    building_name: str = Form(...),
+    descriptor: Optional[str] = Form(None)
 ):
     """Train the building recognizer with new images"""
     try:
         # Read image
         contents = await image.read()
-        nparr = np.frombuffer(contents, np.uint8)
-        image_np = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image_np, decode_info = await executor.run_thread(decode_image, contents, DECODE_POLICY)
         
         if image_np is None:
             raise HTTPException(status_code=400, detail="Invalid image data")
         
-        # Train recognizer
-        building_recognizer.train(image_np, building_name)
+        if descriptor is not None and descriptor not in ENABLED_DESCRIPTORS:
+            raise HTTPException(status_code=400, detail=f"Descriptor pipeline not enabled: {descriptor}")
+
+        # Train recognizer (all enabled pipelines unless one is requested)
+        training = await executor.run_thread(
+            building_recognizer.train, image_np, building_name, descriptor,
+            timeout=TRAINING_TIMEOUT
+        )
         
         return JSONResponse({
             "message": "Training successful",
-            "building": building_name
+            "building": building_name,
+            "training": training,
+            "decode": decode_info
         })
+    except TaskTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/build_vocabulary")
+async def build_vocabulary(n_words: Optional[int] = None):
+    """Build the visual vocabulary used by the 'bow' recognition mode"""
+    try:
+        stats = await executor.run_thread(
+            building_recognizer.build_vocabulary, n_words,
+            timeout=TRAINING_TIMEOUT
+        )
+        return JSONResponse({
+            "message": "Vocabulary built successfully",
+            "vocabulary": stats
+        })
+    except TaskTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -232,7 +505,7 @@ async def calibrate_distance(calibration: CalibrationPoint):
             image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
         
         # Calibrate the estimator
-        success = distance_estimator.calibrate(calibration.known_distance, image_np)
+        success = await executor.run_thread(distance_estimator.calibrate, calibration.known_distance, image_np)
         
         if success:
             return JSONResponse({
@@ -241,6 +514,8 @@ async def calibrate_distance(calibration: CalibrationPoint):
             })
         else:
             raise HTTPException(status_code=400, detail="Calibration failed")
+    except TaskTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -286,33 +561,137 @@ async def update_landmark_position(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/sessions")
+async def create_session(tracking: Optional[str] = None):
+    """Issue a session token for per-client position tracking"""
+    session_id = uuid.uuid4().hex
+    if tracking is not None:
+        try:
+            trilateration_solver.configure_session(session_id, tracking)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return JSONResponse({
+        "session_id": session_id,
+        "tracking": tracking or trilateration_solver.tracking_mode,
+        "ttl_seconds": trilateration_solver.sessions.ttl_seconds
+    })
+
+@app.get("/sessions")
+async def session_stats():
+    """Get the number of active tracking sessions and eviction counters"""
+    stats = trilateration_solver.sessions.stats()
+    stats["streams"] = broadcaster.stats()
+    return JSONResponse(stats)
+
+@app.get("/sessions/{session_id}/stream")
+async def stream_positions(session_id: str, request: Request):
+    """Stream a session's new fixes as server-sent events"""
+    async def events():
+        subscription = broadcaster.subscribe(session_id)
+        try:
+            async for message in follow(subscription, request.is_disconnected,
+                                        STREAM_KEEPALIVE, STREAM_DISCONNECT_POLL):
+                if message is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: fix\ndata: {json.dumps(message)}\n\n"
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+async def wait_closed(websocket: WebSocket) -> None:
+    """Consume client frames until the WebSocket closes"""
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+@app.websocket("/sessions/{session_id}/ws")
+async def websocket_positions(websocket: WebSocket, session_id: str):
+    """Stream a session's new fixes over a WebSocket"""
+    await websocket.accept()
+    subscription = broadcaster.subscribe(session_id)
+    # A send only fails once the client is gone, so watch for the close frame too
+    closing = asyncio.ensure_future(wait_closed(websocket))
+    try:
+        async for message in follow_until(subscription, closing, STREAM_KEEPALIVE):
+            await websocket.send_json(message if message is not None else {"keepalive": True})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closing.cancel()
+        broadcaster.unsubscribe(subscription)
+
+@app.post("/update_landmark_positions")
+async def update_landmark_positions(batch: LandmarkBatch):
+    """Update many landmark positions with a single write of the calibration file"""
+    try:
+        trilateration_solver.update_landmark_positions({
+            landmark.building_name: Point(landmark.latitude, landmark.longitude)
+            for landmark in batch.landmarks
+        })
+        return JSONResponse({
+            "message": "Landmark positions updated successfully",
+            "count": len(batch.landmarks)
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/get_position_history")
-async def get_position_history():
+async def get_position_history(session_id: Optional[str] = None):
     """Get the history of position estimates"""
-    history = trilateration_solver.get_position_history()
+    history = trilateration_solver.get_position_history(session_id)
     return JSONResponse({
-        "history": [
-            {"latitude": p.x, "longitude": p.y}
-            for p in history
-        ]
+        "history": to_lat_lon(history)
     })
 
 @app.post("/reset_position_history")
-async def reset_position_history():
+async def reset_position_history(session_id: Optional[str] = None):
     """Reset the position history"""
-    trilateration_solver.reset_position_history()
+    trilateration_solver.reset_position_history(session_id)
     return JSONResponse({
         "message": "Position history reset successfully"
     })
 
+def render_position_plot() -> str:
+    with visualization_lock:
+        return visualizer.get_current_plot()
+
+def render_position_png():
+    with visualization_lock:
+        return visualizer.render_png()
+
 @app.get("/get_position_visualization")
-async def get_position_visualization():
-    """Get current position visualization as base64 encoded image"""
+async def get_position_visualization(format: str = 'png', session_id: Optional[str] = None):
+    """Get current position visualization as base64 encoded image, or as GeoJSON"""
     try:
-        plot_data = visualizer.get_current_plot()
+        if format == 'geojson':
+            # Coordinates only, for clients that draw on their own map; no matplotlib involved
+            collection = await executor.run_thread(visualizer.get_geojson, session_id)
+            return JSONResponse(collection, media_type="application/geo+json")
+        if format != 'png':
+            raise HTTPException(status_code=400, detail=f"Unknown visualization format: {format}")
+        plot_data = await executor.run_thread(render_position_plot)
         return JSONResponse({
             "plot": plot_data
         })
+    except TaskTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/position_visualization.png")
+async def get_position_visualization_png(request: Request):
+    """Get current position visualization as a PNG, or 304 if the client's copy is current"""
+    try:
+        # The ETag is derived from version counters, so unchanged plots cost no rendering
+        if request.headers.get('if-none-match') == visualizer.current_etag():
+            return Response(status_code=304, headers={"ETag": visualizer.current_etag()})
+        png, etag = await executor.run_thread(render_position_png)
+        return Response(content=png, media_type="image/png",
+                        headers={"ETag": etag, "Cache-Control": "no-cache"})
+    except TaskTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -345,8 +724,9 @@ async def update_visualization_config(
         visualizer.config = new_config
         
         # Recreate plot with new config
-        visualizer.close()
-        visualizer._setup_plot()
+        with visualization_lock:
+            visualizer.close()
+            visualizer._setup_plot()
         
         return JSONResponse({
             "message": "Visualization configuration updated successfully",
@@ -364,5 +744,25 @@ async def update_visualization_config(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+@app.get("/executor_metrics")
+async def executor_metrics():
+    """Get queue depth and task counters of the worker pools"""
+    return JSONResponse({
+        "pools": executor.metrics()
+    })
+
+@app.get("/solver_metrics")
+async def solver_metrics():
+    """Get how often trilateration took the linear, refined and fallback paths"""
+    return JSONResponse({
+        "paths": trilateration_solver.stats.snapshot()
+    })
+
+@app.on_event("startup")
+async def bind_broadcaster():
+    broadcaster.bind(asyncio.get_running_loop())
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    executor.shutdown()
+    trilateration_solver.close()
@@ -0,0 +1,86 @@
+"""Microbenchmark for the trilateration solver.
+
+Compares the per-landmark Python loop with numerically estimated Jacobian
+against the vectorized residuals with the analytic Jacobian, for growing
+landmark counts, and M separate least_squares calls against one batched
+Gauss-Newton solve. Run from Module-3/api:
+
+    python benchmark_trilateration.py
+"""
+import math
+import time
+import numpy as np
+from scipy.optimize import least_squares
+from trilateration import LandmarkArrays, TrilaterationSolver
+
+def _loop_residuals(point: np.ndarray, landmarks: LandmarkArrays) -> np.ndarray:
+    """Reference implementation: one Python iteration per landmark"""
+    residuals = []
+    for position, distance, confidence in zip(landmarks.positions, landmarks.distances, landmarks.confidences):
+        calculated_distance = math.sqrt(
+            (point[0] - position[0]) ** 2 +
+            (point[1] - position[1]) ** 2 +
+            (point[2] - position[2]) ** 2
+        )
+        residuals.append((calculated_distance - distance) * confidence)
+    return np.array(residuals)
+
+def make_problem(n_landmarks: int, noise: float = 0.5, seed: int = 0) -> LandmarkArrays:
+    rng = np.random.default_rng(seed)
+    positions = np.zeros((n_landmarks, 3))
+    positions[:, :2] = rng.uniform(-200.0, 200.0, (n_landmarks, 2))
+    truth = np.array([10.0, -20.0, 0.0])
+    distances = np.linalg.norm(positions - truth, axis=1) + rng.normal(0.0, noise, n_landmarks)
+    return LandmarkArrays(positions, distances, np.ones(n_landmarks))
+
+def time_solve(landmarks: LandmarkArrays, vectorized: bool, repeats: int) -> float:
+    initial_guess = np.array([landmarks.positions[:, 0].mean(), landmarks.positions[:, 1].mean(), 0.0])
+    kwargs = dict(args=(landmarks,), method='trf', loss='soft_l1')
+    if vectorized:
+        fun, kwargs['jac'] = TrilaterationSolver._residuals, TrilaterationSolver._jacobian
+    else:
+        fun = _loop_residuals
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        least_squares(fun, initial_guess, **kwargs)
+    return (time.perf_counter() - start) / repeats
+
+def time_batch(n_fixes: int, n_landmarks: int = 8) -> tuple:
+    # Every fix sees the same landmarks from a different true position
+    positions = make_problem(n_landmarks).positions
+    distances = np.stack([
+        np.linalg.norm(positions - np.array([seed, -seed, 0.0]), axis=1) for seed in range(n_fixes)
+    ])
+    weights = np.ones_like(distances)
+    initial = np.tile([positions[:, 0].mean(), positions[:, 1].mean(), 0.0], (n_fixes, 1))
+
+    start = time.perf_counter()
+    for row in range(n_fixes):
+        least_squares(
+            TrilaterationSolver._residuals, initial[row], jac=TrilaterationSolver._jacobian,
+            args=(LandmarkArrays(positions, distances[row], weights[row]),), method='trf', loss='soft_l1'
+        )
+    separate = time.perf_counter() - start
+
+    start = time.perf_counter()
+    TrilaterationSolver._gauss_newton_batch(positions, distances, weights, initial)
+    batched = time.perf_counter() - start
+    return separate, batched
+
+def main():
+    print(f"{'landmarks':>10} {'loop ms':>10} {'vector ms':>10} {'speedup':>8}")
+    for n_landmarks in (3, 10, 30, 100, 300, 1000):
+        landmarks = make_problem(n_landmarks)
+        repeats = max(5, 2000 // n_landmarks)
+        loop = time_solve(landmarks, vectorized=False, repeats=repeats)
+        vector = time_solve(landmarks, vectorized=True, repeats=repeats)
+        print(f"{n_landmarks:>10} {loop * 1000:>10.3f} {vector * 1000:>10.3f} {loop / vector:>7.1f}x")
+
+    print(f"\n{'fixes':>10} {'scipy ms':>10} {'batch ms':>10} {'speedup':>8}")
+    for n_fixes in (1, 10, 100, 1000):
+        separate, batched = time_batch(n_fixes)
+        print(f"{n_fixes:>10} {separate * 1000:>10.3f} {batched * 1000:>10.3f} {separate / batched:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
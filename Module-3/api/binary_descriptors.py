@@ -0,0 +1,172 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+
+# Number of set bits for every byte value, used for Hamming distances on packed descriptors
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+BINARY_DETECTORS = ('orb', 'akaze')
+
+def hamming_knn(query: np.ndarray, vectors: np.ndarray, k: int,
+                chunk_size: int = 256) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact k-NN of packed binary query rows against packed vectors by Hamming distance"""
+    k = min(k, len(vectors))
+    distances = np.empty((len(query), k), dtype=np.int32)
+    indices = np.empty((len(query), k), dtype=np.int64)
+
+    # Chunk the queries to bound the (queries x vectors x bytes) XOR buffer
+    for start in range(0, len(query), chunk_size):
+        block = query[start:start + chunk_size]
+        d = POPCOUNT[block[:, None, :] ^ vectors[None, :, :]].sum(axis=2, dtype=np.int32)
+
+        nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+        nearest_d = np.take_along_axis(d, nearest, axis=1)
+        order = np.argsort(nearest_d, axis=1)
+        indices[start:start + len(block)] = np.take_along_axis(nearest, order, axis=1)
+        distances[start:start + len(block)] = np.take_along_axis(nearest_d, order, axis=1)
+
+    return distances, indices
+
+def k_majority(samples: np.ndarray, k: int, iterations: int = 8, seed: int = 42) -> np.ndarray:
+    """Cluster packed binary descriptors with k-majority (k-means under Hamming distance)"""
+    from scipy import sparse
+    rng = np.random.default_rng(seed)
+    k = min(k, len(samples))
+    centers = samples[rng.choice(len(samples), k, replace=False)].copy()
+    bits = np.unpackbits(samples, axis=1).astype(np.float32)
+
+    for _ in range(iterations):
+        _, nearest = hamming_knn(samples, centers, k=1)
+        assignment = nearest[:, 0]
+        one_hot = sparse.csr_matrix(
+            (np.ones(len(samples), dtype=np.float32), (assignment, np.arange(len(samples)))),
+            shape=(k, len(samples))
+        )
+        bit_sums = np.asarray(one_hot @ bits)
+        sizes = np.bincount(assignment, minlength=k)
+
+        # Each center takes the majority bit of its members; empty clusters keep their center
+        majority = np.packbits(bit_sums * 2 > sizes[:, None], axis=1)
+        occupied = sizes > 0
+        if np.array_equal(centers[occupied], majority[occupied]):
+            break
+        centers[occupied] = majority[occupied]
+
+    return centers
+
+
+def create_binary_detector(detector: str, n_features: int = 1000):
+    """Create the OpenCV detector for a binary pipeline"""
+    if detector not in BINARY_DETECTORS:
+        raise ValueError(f"Unknown binary detector: {detector}")
+    return cv2.ORB_create(nfeatures=n_features) if detector == 'orb' else cv2.AKAZE_create()
+
+
+class BinaryDescriptorStore:
+    """Bit-packed center store and Hamming matcher for a binary descriptor pipeline.
+
+    Each building keeps a bounded reservoir sample of its raw descriptors, so
+    retraining a building costs the same no matter how many images it has seen.
+    """
+
+    def __init__(self, features_dir: Path, detector: str = 'orb', n_clusters: int = 100,
+                 max_samples: int = 20000, n_features: int = 1000):
+        self.detector_name = detector
+        self.detector = create_binary_detector(detector, n_features)
+        self.n_clusters = n_clusters
+        self.max_samples = max_samples
+        self.store_dir = Path(features_dir) / f"binary_{detector}"
+        self.store_dir.mkdir(exist_ok=True)
+        self._rng = np.random.default_rng(42)
+
+        self.samples: Dict[str, np.ndarray] = {}
+        self.seen: Dict[str, int] = {}
+        self.centers: Dict[str, np.ndarray] = {}
+        self.names: List[str] = []
+        self.vectors = np.empty((0, 0), dtype=np.uint8)
+        self.labels = np.empty(0, dtype=np.int32)
+        self.load()
+
+    def extract(self, gray: np.ndarray) -> Tuple[list, np.ndarray]:
+        """Detect keypoints and compute packed binary descriptors"""
+        keypoints, descriptors = self.detector.detectAndCompute(gray, None)
+        if descriptors is None:
+            return [], np.empty((0, 0), dtype=np.uint8)
+        return keypoints, descriptors
+
+    def _stack(self) -> None:
+        """Stack all centers into one matrix with a parallel label array"""
+        self.names = sorted(self.centers)
+        if not self.names:
+            self.vectors = np.empty((0, 0), dtype=np.uint8)
+            self.labels = np.empty(0, dtype=np.int32)
+            return
+        blocks = [self.centers[name] for name in self.names]
+        self.vectors = np.ascontiguousarray(np.vstack(blocks))
+        self.labels = np.concatenate([
+            np.full(len(block), label, dtype=np.int32)
+            for label, block in enumerate(blocks)
+        ])
+
+    def _add_samples(self, building_name: str, descriptors: np.ndarray) -> None:
+        """Reservoir-sample descriptors so each building keeps at most max_samples"""
+        current = self.samples.get(building_name, np.empty((0, descriptors.shape[1]), dtype=np.uint8))
+        seen = self.seen.get(building_name, 0)
+        room = max(self.max_samples - len(current), 0)
+
+        current = np.vstack([current, descriptors[:room]])
+        rest = descriptors[room:]
+        if len(rest):
+            # Item t (1-based over everything seen) is kept with probability max_samples / t
+            t = seen + room + np.arange(1, len(rest) + 1)
+            keep = self._rng.random(len(rest)) < self.max_samples / t
+            slots = self._rng.integers(0, self.max_samples, keep.sum())
+            current[slots] = rest[keep]
+
+        self.samples[building_name] = current
+        self.seen[building_name] = seen + len(descriptors)
+
+    def train(self, building_name: str, descriptors: np.ndarray) -> None:
+        """Add descriptors for a building and refresh its centers"""
+        self._add_samples(building_name, descriptors)
+        self.centers[building_name] = k_majority(self.samples[building_name], self.n_clusters)
+        self._stack()
+        self.save(building_name)
+
+    def recognize(self, descriptors: np.ndarray, ratio: float = 0.8, min_votes: int = 10) -> Optional[str]:
+        """Vote for a building with a Hamming ratio test against all centers at once"""
+        if descriptors is None or not len(descriptors) or len(self.labels) < 2:
+            return None
+
+        distances, indices = hamming_knn(descriptors, self.vectors, k=2)
+        good = distances[:, 0] < ratio * distances[:, 1]
+        votes = np.bincount(self.labels[indices[good, 0]], minlength=len(self.names))
+
+        best = int(np.argmax(votes))
+        return self.names[best] if votes[best] > min_votes else None
+
+    def save(self, building_name: str) -> None:
+        """Persist one building's reservoir and centers"""
+        try:
+            np.savez(
+                self.store_dir / f"{building_name}.npz",
+                samples=self.samples[building_name],
+                centers=self.centers[building_name],
+                seen=self.seen[building_name]
+            )
+        except Exception as e:
+            print(f"Error saving {self.detector_name} features for {building_name}: {str(e)}")
+
+    def load(self) -> None:
+        """Load every building's reservoir and centers"""
+        for store_file in self.store_dir.glob('*.npz'):
+            building_name = store_file.stem
+            try:
+                with np.load(store_file) as data:
+                    self.samples[building_name] = data['samples']
+                    self.centers[building_name] = data['centers']
+                    self.seen[building_name] = int(data['seen'])
+            except Exception as e:
+                print(f"Error loading {self.detector_name} features for {building_name}: {str(e)}")
+        self._stack()
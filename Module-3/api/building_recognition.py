@@ -1,44 +1,134 @@
 import cv2
 import numpy as np
-from sklearn.cluster import KMeans
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import os
+import json
 import pickle
+import threading
+import time
 from pathlib import Path
+from descriptor_index import DescriptorIndex, centers_fingerprint, create_index
+from visual_vocabulary import VisualVocabulary
+from binary_descriptors import BinaryDescriptorStore, BINARY_DETECTORS, create_binary_detector
+
+if TYPE_CHECKING:
+    from sklearn.cluster import MiniBatchKMeans
+
+# Bump when the layout of the persisted centers artifact changes
+CENTERS_ARTIFACT_VERSION = 1
+
+# 'centers': nearest-neighbour votes against per-building centers
+# 'bow': TF-IDF scoring against the shared visual vocabulary
+RECOGNITION_MODES = ('centers', 'bow')
+
+# 'sift' is the float L2 pipeline; binary detectors use packed descriptors and Hamming matching
+DESCRIPTOR_TYPES = ('sift',) + BINARY_DETECTORS
+
+# Detectors created lazily in each worker process by extract_descriptors
+_worker_detectors: Dict[Tuple[str, int], object] = {}
+
+def preprocess_for_features(image: np.ndarray) -> np.ndarray:
+    """Preprocess image for better feature detection"""
+    # Convert to grayscale if needed
+    if len(image.shape) == 3:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = image
+
+    # Apply histogram equalization
+    equalized = cv2.equalizeHist(gray)
+    
+    # Apply Gaussian blur to reduce noise
+    blurred = cv2.GaussianBlur(equalized, (5, 5), 0)
+    
+    return blurred
+
+def extract_descriptors(image: np.ndarray, descriptor: str = 'sift',
+                        keypoint_budget: int = 0) -> Tuple[int, np.ndarray]:
+    """Extract descriptors without a recognizer instance, for use in worker processes.
+
+    Returns the keypoint count and the descriptors (an empty array if none).
+    """
+    key = (descriptor, keypoint_budget)
+    if key not in _worker_detectors:
+        _worker_detectors[key] = (cv2.SIFT_create(nfeatures=keypoint_budget) if descriptor == 'sift'
+                                  else create_binary_detector(descriptor, keypoint_budget or 1000))
+    keypoints, descriptors = _worker_detectors[key].detectAndCompute(preprocess_for_features(image), None)
+    if descriptors is None:
+        return len(keypoints), np.array([])
+    return len(keypoints), descriptors
+
+def fit_kmeans_centers(descriptors: np.ndarray, n_clusters: int) -> np.ndarray:
+    """Fit K-means and return the cluster centers"""
+    # sklearn is imported on first use to keep app startup fast
+    from sklearn.cluster import KMeans
+    kmeans = KMeans(n_clusters=min(n_clusters, len(descriptors)), random_state=42)
+    kmeans.fit(descriptors)
+    return kmeans.cluster_centers_
 
 class BuildingRecognizer:
-    def __init__(self, features_dir: str = 'building_features'):
+    def __init__(self, features_dir: str = 'building_features',
+                 index_backend: str = 'exact', index_params: Optional[Dict] = None,
+                 incremental_training: bool = False, binary_descriptors: Tuple[str, ...] = (),
+                 keypoint_budget: int = 0):
         self.features_dir = Path(features_dir)
         self.features_dir.mkdir(exist_ok=True)
         self.feature_centers = {}
-        self.sift = cv2.SIFT_create()
+        # Keep only the strongest keypoint_budget keypoints (0 = unlimited)
+        self.keypoint_budget = keypoint_budget
+        self.sift = cv2.SIFT_create(nfeatures=keypoint_budget)
         self.matcher = cv2.BFMatcher()
+        # Raw descriptors are only loaded when retraining needs them
         self.feature_cache = {}
+        self.feature_counts: Dict[str, int] = {}
+        self.n_clusters = 100
+        self.centers_file = self.features_dir / 'centers.npy'
+        self.manifest_file = self.features_dir / 'centers_manifest.json'
+        # When enabled, train() updates centers from the new image's descriptors only
+        self.incremental_training = incremental_training
+        self._incremental_models: Dict[str, 'MiniBatchKMeans'] = {}
+        # Nearest-neighbour index over all buildings' centers, persisted in features_dir
+        self.index: DescriptorIndex = create_index(index_backend, **(index_params or {}))
+        # Shared visual vocabulary for the 'bow' recognition mode, built on demand
+        self.vocabulary = VisualVocabulary()
+        self.vocabulary_file = self.features_dir / 'vocabulary.npz'
+        # Enabled binary pipelines, each with its own bit-packed center store
+        self.binary_stores: Dict[str, BinaryDescriptorStore] = {
+            detector: BinaryDescriptorStore(self.features_dir, detector, n_clusters=self.n_clusters,
+                                            n_features=keypoint_budget or 1000)
+            for detector in binary_descriptors
+        }
+        # Optional callable(fn, *args) used to run K-means elsewhere, e.g. a process pool
+        self.cluster_runner = None
+        # Guards the centers, index and vocabulary that matching reads. Training
+        # holds it only to read descriptors and to swap in new results
+        self._lock = threading.RLock()
+        # Serializes training runs against each other
+        self._train_lock = threading.Lock()
         self.load_building_features()
+        self.vocabulary.load(self.vocabulary_file)
+
+    def _binary_store(self, descriptor: str) -> BinaryDescriptorStore:
+        if descriptor not in self.binary_stores:
+            raise ValueError(f"Descriptor pipeline not enabled: {descriptor}")
+        return self.binary_stores[descriptor]
 
     def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """Preprocess image for better feature detection"""
-        # Convert to grayscale if needed
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        else:
-            gray = image
+        return preprocess_for_features(image)
 
-        # Apply histogram equalization
-        equalized = cv2.equalizeHist(gray)
-        
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(equalized, (5, 5), 0)
-        
-        return blurred
-
-    def extract_features(self, image: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        """Extract SIFT features from an image"""
+    def extract_features(self, image: np.ndarray, descriptor: str = 'sift') -> Tuple[np.ndarray, np.ndarray]:
+        """Extract SIFT (or binary) features from an image"""
         # Preprocess image
         processed = self._preprocess_image(image)
         
         # Detect keypoints and compute descriptors
-        keypoints, descriptors = self.sift.detectAndCompute(processed, None)
+        if descriptor == 'sift':
+            keypoints, descriptors = self.sift.detectAndCompute(processed, None)
+        else:
+            keypoints, descriptors = self._binary_store(descriptor).extract(processed)
+            if not len(descriptors):
+                descriptors = None
         
         if descriptors is None:
             return np.array([]), np.array([])
@@ -50,31 +140,175 @@ class BuildingRecognizer:
         if not descriptors:
             return
         
+        # Store the centers
+        self.feature_centers[building_name] = self._fit_centers(descriptors)
+        # Any incremental model now lags behind the refit centers
+        self._incremental_models.pop(building_name, None)
+
+    def _fit_centers(self, descriptors: List[np.ndarray]) -> np.ndarray:
+        """Fit K-means centers to all of a building's descriptors"""
         # Combine all descriptors
         all_descriptors = np.vstack(descriptors)
         
         # Use K-means to find feature centers
-        kmeans = KMeans(n_clusters=min(100, len(all_descriptors)), random_state=42)
-        kmeans.fit(all_descriptors)
-        
-        # Store the centers
-        self.feature_centers[building_name] = kmeans.cluster_centers_
+        if self.cluster_runner is not None:
+            return self.cluster_runner(fit_kmeans_centers, all_descriptors, self.n_clusters)
+        return fit_kmeans_centers(all_descriptors, self.n_clusters)
+
+    def _update_feature_centers(self, building_name: str, descriptors: np.ndarray) -> Optional[np.ndarray]:
+        """Update feature centers with MiniBatchKMeans using only the new descriptors.
+
+        Returns the new centers without storing them, or None when there is not
+        yet enough data for a full set of centers, in which case the caller
+        should fall back to a full refit.
+        """
+        model = self._incremental_models.get(building_name)
+        if model is None:
+            from sklearn.cluster import MiniBatchKMeans
+            centers = self.feature_centers.get(building_name)
+            if centers is not None and len(centers) == self.n_clusters:
+                # Seed the model with the existing centers so the update continues from them
+                model = MiniBatchKMeans(n_clusters=self.n_clusters, init=centers, n_init=1, random_state=42)
+            elif centers is None and len(descriptors) >= self.n_clusters:
+                model = MiniBatchKMeans(n_clusters=self.n_clusters, random_state=42)
+            else:
+                return None
+            self._incremental_models[building_name] = model
+
+        model.partial_fit(np.asarray(descriptors, dtype=np.float32))
+        # partial_fit may write into its centers; matching keeps reading this copy
+        return model.cluster_centers_.copy()
 
     def load_building_features(self) -> None:
-        """Load building features from disk"""
+        """Load building feature centers, refitting only buildings whose features changed"""
+        fresh, persisted = self._load_feature_centers()
+        # Buildings listed in the manifest whose pickle changed or disappeared
+        stale = set(persisted) - set(fresh)
+
         for feature_file in self.features_dir.glob('*.pkl'):
             building_name = feature_file.stem
+            if building_name in fresh:
+                continue
             try:
-                with open(feature_file, 'rb') as f:
-                    features = pickle.load(f)
-                    self.feature_cache[building_name] = features
-                    
-                    # Compute feature centers if not already done
-                    if building_name not in self.feature_centers:
-                        self._compute_feature_centers(building_name, features)
+                features = self._load_descriptors(building_name)
+                
+                # Compute feature centers if not already done
+                if building_name not in self.feature_centers:
+                    self._compute_feature_centers(building_name, features)
+                stale.add(building_name)
             except Exception as e:
                 print(f"Error loading features for {building_name}: {str(e)}")
 
+        if stale or not self.manifest_file.exists():
+            self.save_feature_centers()
+
+        # Refit centers always invalidate the persisted index
+        self._load_or_build_index(force=bool(stale))
+
+    def _source_signature(self, building_name: str) -> Optional[Dict]:
+        """Size and mtime of a building's feature pickle, used to detect stale centers"""
+        feature_file = self.features_dir / f"{building_name}.pkl"
+        if not feature_file.exists():
+            return None
+        stat = feature_file.stat()
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _load_feature_centers(self) -> Tuple[List[str], List[str]]:
+        """Memory-map persisted centers.
+
+        Returns the buildings whose centers are up to date and all buildings in the manifest.
+        """
+        if not self.manifest_file.exists() or not self.centers_file.exists():
+            return [], []
+
+        try:
+            with open(self.manifest_file, 'r') as f:
+                manifest = json.load(f)
+            if (manifest.get('version') != CENTERS_ARTIFACT_VERSION
+                    or manifest.get('n_clusters') != self.n_clusters):
+                return [], []
+
+            centers = np.load(self.centers_file, mmap_mode='r')
+            fresh = []
+            for building_name, entry in manifest['buildings'].items():
+                if self._source_signature(building_name) != entry['source']:
+                    continue
+                offset, rows = entry['offset'], entry['rows']
+                self.feature_centers[building_name] = centers[offset:offset + rows]
+                self.feature_counts[building_name] = entry['images']
+                fresh.append(building_name)
+            return fresh, list(manifest['buildings'])
+        except Exception as e:
+            print(f"Error loading feature centers: {str(e)}")
+            return [], []
+
+    def save_feature_centers(self) -> None:
+        """Persist all feature centers as one array plus a versioned JSON manifest"""
+        names = sorted(self.feature_centers)
+        buildings = {}
+        offset = 0
+        for building_name in names:
+            rows = len(self.feature_centers[building_name])
+            buildings[building_name] = {
+                "offset": offset,
+                "rows": rows,
+                "images": self.feature_counts.get(building_name, 0),
+                "source": self._source_signature(building_name)
+            }
+            offset += rows
+
+        manifest = {
+            "version": CENTERS_ARTIFACT_VERSION,
+            "n_clusters": self.n_clusters,
+            "centers_file": self.centers_file.name,
+            "index_backend": self.index.backend,
+            "centers_hash": centers_fingerprint({name: self.feature_centers[name] for name in names}),
+            "buildings": buildings
+        }
+
+        try:
+            stacked = (np.vstack([np.asarray(self.feature_centers[name], dtype=np.float32) for name in names])
+                       if names else np.empty((0, 128), dtype=np.float32))
+            # Write to temporary files and rename so memory-mapped readers never see a partial file
+            tmp_centers = self.centers_file.with_suffix('.tmp.npy')
+            np.save(tmp_centers, stacked)
+            os.replace(tmp_centers, self.centers_file)
+
+            tmp_manifest = self.manifest_file.with_suffix('.tmp')
+            with open(tmp_manifest, 'w') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_manifest, self.manifest_file)
+        except Exception as e:
+            print(f"Error saving feature centers: {str(e)}")
+
+    def _load_descriptors(self, building_name: str) -> List[np.ndarray]:
+        """Return a building's raw descriptors, reading its pickle on first use"""
+        if building_name not in self.feature_cache:
+            feature_file = self.features_dir / f"{building_name}.pkl"
+            features = []
+            if feature_file.exists():
+                with open(feature_file, 'rb') as f:
+                    features = self._read_feature_file(f)
+            self.feature_cache[building_name] = features
+            self.feature_counts[building_name] = len(features)
+        return self.feature_cache[building_name]
+
+    def _load_or_build_index(self, force: bool = False) -> None:
+        """Load the persisted index, rebuilding it if it is missing, stale or force is set"""
+        if not force and self.index.load(self.features_dir) and self.index.matches(self.feature_centers):
+            return
+        self.index.build(self.feature_centers)
+        self.index.save(self.features_dir)
+
+    def _read_feature_file(self, f) -> List[np.ndarray]:
+        """Read a feature pickle: a list of descriptor arrays followed by appended arrays"""
+        features = list(pickle.load(f))
+        while True:
+            try:
+                features.append(pickle.load(f))
+            except EOFError:
+                return features
+
     def save_building_features(self, building_name: str) -> None:
         """Save building features to disk"""
         if building_name in self.feature_cache:
@@ -85,53 +319,162 @@ class BuildingRecognizer:
             except Exception as e:
                 print(f"Error saving features for {building_name}: {str(e)}")
 
-    def recognize(self, features: Tuple[np.ndarray, np.ndarray]) -> Optional[str]:
+    def append_building_features(self, building_name: str, descriptors: np.ndarray) -> None:
+        """Append one image's descriptors to disk without rewriting earlier ones"""
+        feature_file = self.features_dir / f"{building_name}.pkl"
+        try:
+            with open(feature_file, 'ab') as f:
+                # A new file starts with the list that save_building_features writes
+                pickle.dump(descriptors if f.tell() > 0 else [descriptors], f)
+        except Exception as e:
+            print(f"Error saving features for {building_name}: {str(e)}")
+
+    def recognize(self, features: Tuple[np.ndarray, np.ndarray], mode: str = 'centers',
+                  descriptor: str = 'sift') -> Optional[str]:
         """Recognize a building from its features"""
+        if mode not in RECOGNITION_MODES:
+            raise ValueError(f"Unknown recognition mode: {mode}")
         if not features[1].any():
             return None
-        
-        best_match = None
-        best_score = 0
-        
-        for building_name, centers in self.feature_centers.items():
-            # Match features against centers
-            matches = self.matcher.knnMatch(features[1], centers, k=2)
-            
-            # Apply ratio test
-            good_matches = []
-            for m, n in matches:
-                if m.distance < 0.75 * n.distance:
-                    good_matches.append(m)
-            
-            score = len(good_matches)
-            if score > best_score:
-                best_score = score
-                best_match = building_name
-        
-        return best_match if best_score > 10 else None
 
-    def train(self, image: np.ndarray, building_name: str) -> None:
-        """Train the recognizer with a new image"""
-        # Extract features
-        keypoints, descriptors = self.extract_features(image)
-        
-        if descriptors is None or len(descriptors) == 0:
-            raise ValueError("No features detected in the image")
-        
-        # Add features to cache
-        if building_name not in self.feature_cache:
-            self.feature_cache[building_name] = []
-        self.feature_cache[building_name].append(descriptors)
-        
-        # Update feature centers
-        self._compute_feature_centers(building_name, self.feature_cache[building_name])
-        
-        # Save features to disk
-        self.save_building_features(building_name)
+        with self._lock:
+            return self._match(features[1], mode, descriptor)
+
+    def _match(self, descriptors: np.ndarray, mode: str, descriptor: str) -> Optional[str]:
+        """Match descriptors against the stores of the selected pipeline"""
+
+        # Binary features are matched against their own store by Hamming distance
+        if descriptor != 'sift':
+            return self._binary_store(descriptor).recognize(descriptors)
+
+        if mode == 'bow':
+            if self.vocabulary.is_built:
+                building_name, _ = self.vocabulary.recognize(descriptors)
+                return building_name
+            print("Visual vocabulary not built, falling back to center matching")
+
+        if len(self.index) < 2:
+            return None
+
+        # Single k-NN query against every building's centers at once
+        distances, labels = self.index.knn(descriptors, k=2)
+
+        # Apply ratio test and vote for the label of each surviving match
+        good = distances[:, 0] < 0.75 * distances[:, 1]
+        votes = np.bincount(labels[good, 0], minlength=len(self.index.names))
+
+        best = int(np.argmax(votes))
+        best_score = int(votes[best])
+        return self.index.names[best] if best_score > 10 else None
+
+    def build_vocabulary(self, n_words: Optional[int] = None) -> Dict:
+        """Learn the shared visual vocabulary and inverted file from the stored features"""
+        start = time.perf_counter()
+        with self._train_lock:
+            with self._lock:
+                descriptors = {
+                    feature_file.stem: self._load_descriptors(feature_file.stem)
+                    for feature_file in self.features_dir.glob('*.pkl')
+                }
+
+            # Build off to the side and swap in, so recognition continues meanwhile
+            vocabulary = VisualVocabulary(n_words=n_words or self.vocabulary.n_words)
+            vocabulary.build(descriptors)
+            vocabulary.save(self.vocabulary_file)
+            with self._lock:
+                self.vocabulary = vocabulary
+
+        return {
+            "words": int(len(self.vocabulary.words)),
+            "buildings": len(self.vocabulary.names),
+            "build_seconds": time.perf_counter() - start
+        }
+
+    def train(self, image: np.ndarray, building_name: str, descriptor: Optional[str] = None) -> Dict:
+        """Train the recognizer with a new image.
+
+        Trains the SIFT pipeline and every enabled binary pipeline, or only
+        ``descriptor`` when given. Returns per-pipeline training stats.
+        """
+        descriptor_types = [descriptor] if descriptor else ['sift'] + list(self.binary_stores)
+        results = {}
+
+        for descriptor_type in descriptor_types:
+            keypoints, descriptors = self.extract_features(image, descriptor_type)
+            if descriptors is None or len(descriptors) == 0:
+                if descriptor_type == 'sift' or descriptor:
+                    raise ValueError("No features detected in the image")
+                continue
+
+            with self._train_lock:
+                if descriptor_type == 'sift':
+                    results['sift'] = self._train_sift(building_name, descriptors)
+                    continue
+                with self._lock:
+                    start = time.perf_counter()
+                    self._binary_store(descriptor_type).train(building_name, descriptors)
+                    results[descriptor_type] = {
+                        "mode": "reservoir",
+                        "descriptors": int(len(descriptors)),
+                        "update_seconds": time.perf_counter() - start
+                    }
+
+        return results
+
+    def _train_sift(self, building_name: str, descriptors: np.ndarray) -> Dict:
+        """Update the SIFT centers, index and vocabulary with one image's descriptors.
+
+        Like build_vocabulary, the centers and index are rebuilt off to the
+        side: the lock is only held to read the stored descriptors and to swap
+        in the results, so recognition keeps running during a K-means refit.
+        """
+        # Update feature centers, incrementally when possible
+        start = time.perf_counter()
+        mode = 'full'
+        features = None
+        centers = self._update_feature_centers(building_name, descriptors) if self.incremental_training else None
+        if centers is not None:
+            mode = 'incremental'
+        else:
+            with self._lock:
+                features = self._load_descriptors(building_name) + [descriptors]
+            centers = self._fit_centers(features)
+        update_seconds = time.perf_counter() - start
+        index = self.index.updated(building_name, centers)
+
+        with self._lock:
+            self.feature_centers[building_name] = centers
+            self.index = index
+            if features is not None:
+                self.feature_cache[building_name] = features
+                # Any incremental model now lags behind the refit centers
+                self._incremental_models.pop(building_name, None)
+            elif building_name in self.feature_cache:
+                # Only keep the cache in sync if it was already loaded
+                self.feature_cache[building_name].append(descriptors)
+            self.feature_counts[building_name] = self.feature_counts.get(building_name, 0) + 1
+
+            # Keep the inverted file current; the vocabulary itself only changes on rebuild
+            vocabulary = self.vocabulary
+            if vocabulary.is_built:
+                vocabulary.add(building_name, descriptors, reweight=True)
+
+        # Save features to disk; training runs are serialized, so nothing changes meanwhile
+        self.append_building_features(building_name, descriptors)
+        self.save_feature_centers()
+        index.save(self.features_dir)
+        if vocabulary.is_built:
+            vocabulary.save(self.vocabulary_file)
+
+        return {
+            "mode": mode,
+            "descriptors": int(len(descriptors)),
+            "update_seconds": update_seconds
+        }
 
     def get_building_info(self, building_name: str) -> Dict:
         """Get information about a building's features"""
-        if building_name not in self.feature_cache:
+        if building_name not in self.feature_counts:
             return {
                 "name": building_name,
                 "feature_count": 0,
@@ -140,6 +483,6 @@ class BuildingRecognizer:
         
         return {
             "name": building_name,
-            "feature_count": len(self.feature_cache[building_name]),
+            "feature_count": self.feature_counts[building_name],
             "has_centers": building_name in self.feature_centers
         } 
\ No newline at end of file
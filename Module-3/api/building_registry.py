@@ -0,0 +1,63 @@
+import csv
+import json
+import os
+from pathlib import Path
+from typing import Dict
+
+REGISTRY_VERSION = 1
+
+def compile_building_registry(annotations_file: Path) -> Dict[str, Dict]:
+    """Build the registry of unique buildings from the image annotation CSV"""
+    buildings = {}
+    with open(annotations_file, newline='') as f:
+        for row in csv.DictReader(f):
+            location = row['label']
+            if location in buildings:
+                continue
+            # Extract coordinates from the location name
+            # This is a simplified example - you'll need to implement proper coordinate extraction
+            lat = 24.9147  # Example latitude
+            lon = 67.0997  # Example longitude
+
+            # Determine if it's a building or facility
+            building_type = 'building' if 'Block' in location else 'facility'
+
+            buildings[location] = {
+                'name': location,
+                'coordinates': {'latitude': lat, 'longitude': lon},
+                'type': building_type
+            }
+    return buildings
+
+def _source_signature(path: Path) -> Dict:
+    stat = path.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def load_building_registry(annotations_file: str, registry_file: str) -> Dict[str, Dict]:
+    """Load the compiled building registry, recompiling it when the annotations change.
+
+    The registry holds one entry per building instead of one row per
+    annotated image. It is keyed by the size and mtime of the CSV, so a warm
+    start reads one small JSON file.
+    """
+    annotations_file, registry_file = Path(annotations_file), Path(registry_file)
+    signature = _source_signature(annotations_file)
+
+    if registry_file.exists():
+        try:
+            with open(registry_file, 'r') as f:
+                registry = json.load(f)
+            if registry.get('version') == REGISTRY_VERSION and registry.get('source') == signature:
+                return registry['buildings']
+        except Exception as e:
+            print(f"Error loading building registry: {str(e)}")
+
+    buildings = compile_building_registry(annotations_file)
+    tmp_file = registry_file.with_name(registry_file.name + '.tmp')
+    try:
+        with open(tmp_file, 'w') as f:
+            json.dump({'version': REGISTRY_VERSION, 'source': signature, 'buildings': buildings}, f)
+        os.replace(tmp_file, registry_file)
+    except Exception as e:
+        print(f"Error saving building registry: {str(e)}")
+    return buildings
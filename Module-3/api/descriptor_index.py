@@ -0,0 +1,372 @@
+import copy
+import cv2
+import hashlib
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+
+def knn_exact(query: np.ndarray, vectors: np.ndarray, sq_norms: np.ndarray,
+              k: int, chunk_size: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact k-NN of query rows against vectors, returning L2 distances and row indices"""
+    k = min(k, len(vectors))
+    distances = np.empty((len(query), k), dtype=np.float32)
+    indices = np.empty((len(query), k), dtype=np.int64)
+
+    # Chunk the queries to bound the size of the distance matrix
+    for start in range(0, len(query), chunk_size):
+        block = query[start:start + chunk_size]
+        d2 = (np.einsum('ij,ij->i', block, block)[:, None]
+              - 2.0 * block @ vectors.T
+              + sq_norms[None, :])
+        np.maximum(d2, 0, out=d2)
+
+        nearest = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        nearest_d2 = np.take_along_axis(d2, nearest, axis=1)
+        order = np.argsort(nearest_d2, axis=1)
+        indices[start:start + len(block)] = np.take_along_axis(nearest, order, axis=1)
+        distances[start:start + len(block)] = np.sqrt(np.take_along_axis(nearest_d2, order, axis=1))
+
+    return distances, indices
+
+def fill_missing_neighbours(distances: np.ndarray, missing: np.ndarray) -> np.ndarray:
+    """Give neighbours that were not found the distance of the previous one.
+
+    A missing second neighbour then ties with the first, so the ratio test
+    rejects the match instead of passing it against an infinite distance.
+    A missing first neighbour stays infinite.
+    """
+    distances[missing[:, 0], 0] = np.inf
+    for column in range(1, distances.shape[1]):
+        rows = missing[:, column]
+        distances[rows, column] = distances[rows, column - 1]
+    return distances
+
+def centers_fingerprint(centers: Dict[str, np.ndarray]) -> str:
+    """Hash of every building's centers, used to tell whether an index is stale"""
+    digest = hashlib.sha1()
+    for name in sorted(centers):
+        block = np.ascontiguousarray(centers[name], dtype=np.float32)
+        digest.update(name.encode('utf-8'))
+        digest.update(str(block.shape).encode('ascii'))
+        digest.update(block.tobytes())
+    return digest.hexdigest()
+
+class DescriptorIndex:
+    """Exact nearest-neighbour index over the feature centers of every building.
+
+    Subclasses trade recall for speed; this base class is the exact fallback.
+    Every entry carries an integer label that indexes into ``names``.
+    """
+    backend = 'exact'
+
+    def __init__(self, **params):
+        self.params = params
+        self.names: List[str] = []
+        self._blocks: Dict[str, np.ndarray] = {}
+        self.vectors = np.empty((0, 0), dtype=np.float32)
+        self.labels = np.empty(0, dtype=np.int32)
+        self._sq_norms = np.empty(0, dtype=np.float32)
+        # Fingerprint of the centers of the last saved or loaded artifact
+        self.fingerprint = ''
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def build(self, centers: Dict[str, np.ndarray]) -> None:
+        """Build the index from scratch from a name -> centers mapping"""
+        self.names = sorted(centers)
+        self._blocks = {
+            name: np.asarray(centers[name], dtype=np.float32)
+            for name in self.names
+        }
+        self._stack()
+        self._rebuild()
+
+    def update(self, building_name: str, centers: np.ndarray) -> None:
+        """Replace (or add) the centers of a single building"""
+        if building_name not in self._blocks:
+            self.names.append(building_name)
+        self._blocks[building_name] = np.asarray(centers, dtype=np.float32)
+        self._stack()
+        self._rebuild()
+
+    def updated(self, building_name: str, centers: np.ndarray) -> 'DescriptorIndex':
+        """Copy of the index with one building's centers replaced, leaving this one searchable.
+
+        update() rebinds every derived array instead of writing into it, so
+        the copy only needs its own name list and block map.
+        """
+        index = copy.copy(self)
+        index.names = list(self.names)
+        index._blocks = dict(self._blocks)
+        index.update(building_name, centers)
+        return index
+
+    def _stack(self) -> None:
+        """Stack per-building blocks into one matrix with a parallel label array"""
+        blocks = [self._blocks[name] for name in self.names]
+        if not blocks:
+            self.vectors = np.empty((0, 0), dtype=np.float32)
+            self.labels = np.empty(0, dtype=np.int32)
+            return
+
+        self.vectors = np.ascontiguousarray(np.vstack(blocks))
+        self.labels = np.concatenate([
+            np.full(len(block), label, dtype=np.int32)
+            for label, block in enumerate(blocks)
+        ])
+
+    def _rebuild(self) -> None:
+        """Rebuild any derived search structure from vectors/labels"""
+        # Squared norms are reused by every query
+        self._sq_norms = np.einsum('ij,ij->i', self.vectors, self.vectors) if len(self) else np.empty(0, dtype=np.float32)
+
+    def knn(self, query: np.ndarray, k: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (distances, labels) of the k nearest centers for every query row"""
+        query = np.asarray(query, dtype=np.float32)
+        distances, indices = knn_exact(query, self.vectors, self._sq_norms, k)
+        return distances, self.labels[indices]
+
+    def _artifact_path(self, directory: Path) -> Path:
+        return Path(directory) / f"index_{self.backend}.npz"
+
+    def save(self, directory: Path) -> None:
+        """Persist the index next to the building feature pickles"""
+        self.fingerprint = centers_fingerprint(self._blocks)
+        try:
+            np.savez(
+                self._artifact_path(directory),
+                names=np.array(self.names, dtype=object),
+                fingerprint=np.array(self.fingerprint),
+                vectors=self.vectors,
+                labels=self.labels,
+                **self._extra_arrays()
+            )
+        except Exception as e:
+            print(f"Error saving {self.backend} index: {str(e)}")
+
+    def load(self, directory: Path) -> bool:
+        """Load a persisted index; returns False if there is nothing usable on disk"""
+        path = self._artifact_path(directory)
+        if not path.exists():
+            return False
+
+        try:
+            with np.load(path, allow_pickle=True) as data:
+                self.names = [str(name) for name in data['names']]
+                self.vectors = np.ascontiguousarray(data['vectors'], dtype=np.float32)
+                self.labels = data['labels'].astype(np.int32)
+                # Artifacts written before fingerprints existed never match
+                self.fingerprint = str(data['fingerprint']) if 'fingerprint' in data.files else ''
+                extra = {key: data[key] for key in data.files
+                         if key not in ('names', 'fingerprint', 'vectors', 'labels')}
+            self._blocks = {
+                name: self.vectors[self.labels == label]
+                for label, name in enumerate(self.names)
+            }
+            self._restore(Path(directory), extra)
+            return True
+        except Exception as e:
+            print(f"Error loading {self.backend} index: {str(e)}")
+            return False
+
+    def _extra_arrays(self) -> Dict[str, np.ndarray]:
+        """Backend specific arrays to persist alongside the vectors"""
+        return {}
+
+    def _restore(self, directory: Path, extra: Dict[str, np.ndarray]) -> None:
+        """Restore backend specific state after vectors/labels are loaded"""
+        self._rebuild()
+
+    def matches(self, centers: Dict[str, np.ndarray]) -> bool:
+        """Check whether the index was built from the given centers"""
+        if sorted(self.names) != sorted(centers):
+            return False
+        if not all(len(self._blocks[name]) == len(centers[name]) for name in self.names):
+            return False
+        return self.fingerprint == centers_fingerprint(centers)
+
+
+class FlannIndex(DescriptorIndex):
+    """Randomized KD-forest index backed by OpenCV's FLANN.
+
+    ``checks`` is the recall/speed knob: more leaves visited means higher recall.
+    """
+    backend = 'flann'
+    FLANN_INDEX_KDTREE = 1
+
+    def __init__(self, trees: int = 4, checks: int = 64, **params):
+        super().__init__(trees=trees, checks=checks, **params)
+        self.trees = trees
+        self.checks = checks
+        self._flann = None
+
+    def _rebuild(self) -> None:
+        super()._rebuild()
+        # KD-forest construction over a few thousand centers takes milliseconds,
+        # so incremental updates simply rebuild the forest
+        self._flann = None
+        if len(self):
+            try:
+                self._flann = cv2.flann_Index(
+                    self.vectors,
+                    dict(algorithm=self.FLANN_INDEX_KDTREE, trees=self.trees)
+                )
+            except Exception as e:
+                # knn() falls back to exact matching without a forest
+                print(f"Error building {self.backend} forest: {str(e)}")
+
+    def knn(self, query: np.ndarray, k: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+        if self._flann is None:
+            return super().knn(query, k)
+
+        query = np.asarray(query, dtype=np.float32)
+        k = min(k, len(self))
+        indices, sq_distances = self._flann.knnSearch(query, k, params=dict(checks=self.checks))
+
+        # FLANN reports squared L2 and -1 for neighbours it did not reach
+        indices = indices.astype(np.int64)
+        distances = np.sqrt(np.maximum(sq_distances, 0)).astype(np.float32)
+        missing = indices < 0
+        fill_missing_neighbours(distances, missing)
+        indices[missing] = 0
+        return distances, self.labels[indices]
+
+    def save(self, directory: Path) -> None:
+        super().save(directory)
+        if self._flann is not None:
+            try:
+                self._flann.save(str(Path(directory) / f"index_{self.backend}.bin"))
+            except Exception as e:
+                print(f"Error saving {self.backend} forest: {str(e)}")
+
+    def _restore(self, directory: Path, extra: Dict[str, np.ndarray]) -> None:
+        DescriptorIndex._rebuild(self)
+        forest_file = directory / f"index_{self.backend}.bin"
+        self._flann = None
+        if len(self) and forest_file.exists():
+            try:
+                self._flann = cv2.flann_Index()
+                if not self._flann.load(self.vectors, str(forest_file)):
+                    self._flann = None
+            except Exception as e:
+                print(f"Error loading {self.backend} forest: {str(e)}")
+                self._flann = None
+        if self._flann is None:
+            self._rebuild()
+
+
+class IVFIndex(DescriptorIndex):
+    """Inverted-file index: a coarse k-means quantizer with one posting list per cell.
+
+    ``nprobe`` is the recall/speed knob: the number of cells scanned per query.
+    Updating a building only reassigns that building's centers to existing cells.
+    """
+    backend = 'ivf'
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 4, **params):
+        super().__init__(nlist=nlist, nprobe=nprobe, **params)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.coarse_centers = np.empty((0, 0), dtype=np.float32)
+        self.assignments = np.empty(0, dtype=np.int32)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Assign vectors to their nearest coarse cell"""
+        coarse_sq_norms = np.einsum('ij,ij->i', self.coarse_centers, self.coarse_centers)
+        _, cells = knn_exact(vectors, self.coarse_centers, coarse_sq_norms, k=1)
+        return cells[:, 0].astype(np.int32)
+
+    def _rebuild(self) -> None:
+        super()._rebuild()
+        if not len(self):
+            self.coarse_centers = np.empty((0, 0), dtype=np.float32)
+            self.assignments = np.empty(0, dtype=np.int32)
+            return
+
+        nlist = self.nlist or max(1, int(np.sqrt(len(self))))
+        nlist = min(nlist, len(self))
+        from sklearn.cluster import KMeans
+        kmeans = KMeans(n_clusters=nlist, n_init=1, random_state=42)
+        kmeans.fit(self.vectors)
+        self.coarse_centers = kmeans.cluster_centers_.astype(np.float32)
+        self.assignments = kmeans.labels_.astype(np.int32)
+
+    def update(self, building_name: str, centers: np.ndarray) -> None:
+        if not len(self.coarse_centers):
+            super().update(building_name, centers)
+            return
+
+        # Keep the coarse quantizer and only re-home this building's centers
+        if building_name not in self._blocks:
+            self.names.append(building_name)
+        label = self.names.index(building_name)
+        keep = self.labels != label
+        centers = np.asarray(centers, dtype=np.float32)
+
+        self._blocks[building_name] = centers
+        self.vectors = np.ascontiguousarray(np.vstack([self.vectors[keep], centers]))
+        self.labels = np.concatenate([self.labels[keep], np.full(len(centers), label, dtype=np.int32)])
+        self.assignments = np.concatenate([self.assignments[keep], self._assign(centers)])
+        DescriptorIndex._rebuild(self)
+
+    def knn(self, query: np.ndarray, k: int = 2) -> Tuple[np.ndarray, np.ndarray]:
+        if not len(self.coarse_centers):
+            return super().knn(query, k)
+
+        query = np.asarray(query, dtype=np.float32)
+        k = min(k, len(self))
+        nprobe = min(self.nprobe, len(self.coarse_centers))
+
+        coarse_sq_norms = np.einsum('ij,ij->i', self.coarse_centers, self.coarse_centers)
+        _, probes = knn_exact(query, self.coarse_centers, coarse_sq_norms, k=nprobe)
+
+        best_d = np.full((len(query), k), np.inf, dtype=np.float32)
+        best_i = np.zeros((len(query), k), dtype=np.int64)
+
+        # Scan each probed cell once for all queries that selected it
+        for cell in np.unique(probes):
+            rows = np.flatnonzero((probes == cell).any(axis=1))
+            members = np.flatnonzero(self.assignments == cell)
+            if not len(members):
+                continue
+
+            d, local = knn_exact(query[rows], self.vectors[members], self._sq_norms[members], k)
+            cand_d = np.concatenate([best_d[rows], d], axis=1)
+            cand_i = np.concatenate([best_i[rows], members[local]], axis=1)
+            order = np.argsort(cand_d, axis=1)[:, :k]
+            best_d[rows] = np.take_along_axis(cand_d, order, axis=1)
+            best_i[rows] = np.take_along_axis(cand_i, order, axis=1)
+
+        # Sparse probe lists can leave fewer than k candidates for a query
+        fill_missing_neighbours(best_d, ~np.isfinite(best_d))
+        return best_d, self.labels[best_i]
+
+    def _extra_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            'coarse_centers': self.coarse_centers,
+            'assignments': self.assignments
+        }
+
+    def _restore(self, directory: Path, extra: Dict[str, np.ndarray]) -> None:
+        DescriptorIndex._rebuild(self)
+        if 'coarse_centers' in extra and 'assignments' in extra:
+            self.coarse_centers = extra['coarse_centers'].astype(np.float32)
+            self.assignments = extra['assignments'].astype(np.int32)
+        else:
+            self._rebuild()
+
+
+INDEX_BACKENDS = {
+    'exact': DescriptorIndex,
+    'flann': FlannIndex,
+    'ivf': IVFIndex,
+}
+
+def create_index(backend: str = 'exact', **params) -> DescriptorIndex:
+    """Create a descriptor index, falling back to exact matching for unknown backends"""
+    index_cls = INDEX_BACKENDS.get(backend)
+    if index_cls is None:
+        print(f"Unknown index backend '{backend}', falling back to exact matching")
+        index_cls = DescriptorIndex
+    return index_cls(**params)
@@ -4,50 +4,86 @@ import math
 from typing import Optional, Tuple, List
 from pathlib import Path
 import json
+from geodesy import LocalProjection, CAMPUS_ORIGIN
+
+# Largest bearing (radians) the perspective correction follows; beyond it the
+# distance is stretched by at most 1 / cos(MAX_OBLIQUE_ANGLE)
+MAX_OBLIQUE_ANGLE = math.radians(60.0)
+
+def preprocess_for_edges(image: np.ndarray) -> np.ndarray:
+    """Preprocess image for better edge detection"""
+    # Convert to grayscale if needed
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    # Apply Gaussian blur
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    # Apply adaptive thresholding
+    thresh = cv2.adaptiveThreshold(
+        blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+        cv2.THRESH_BINARY, 11, 2
+    )
+    return thresh
+
+def detect_building_contours(image: np.ndarray, min_area: float = 1000) -> List[np.ndarray]:
+    """Detect roughly rectangular contours in a thresholded image"""
+    # Find contours
+    contours, _ = cv2.findContours(
+        image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+    
+    # Filter contours based on area and shape
+    valid_contours = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area > min_area:  # Minimum area threshold
+            # Approximate the contour
+            peri = cv2.arcLength(contour, True)
+            approx = cv2.approxPolyDP(contour, 0.04 * peri, True)
+            
+            # Check if the shape is roughly rectangular
+            if len(approx) >= 4 and len(approx) <= 6:
+                valid_contours.append(approx)
+    
+    return valid_contours
+
+def measure_building_width(image: np.ndarray, pixel_scale: float = 1.0) -> Optional[float]:
+    """Width in full-resolution pixels of the largest building contour, or None.
+
+    Needs no calibration state, so it can run in a worker process.
+    ``pixel_scale`` is the ratio of original to working resolution.
+    """
+    processed = preprocess_for_edges(image)
+
+    # The area threshold is in full-resolution pixels
+    contours = detect_building_contours(processed, min_area=1000 / pixel_scale ** 2)
+    if not contours:
+        return None
+
+    # Find the largest contour (assuming it's the building)
+    largest_contour = max(contours, key=cv2.contourArea)
+    x, y, w, h = cv2.boundingRect(largest_contour)
+    return w * pixel_scale
 
 class DistanceEstimator:
-    def __init__(self, calibration_file: str = 'camera_calibration.json'):
+    def __init__(self, calibration_file: str = 'camera_calibration.json',
+                 projection: Optional[LocalProjection] = None,
+                 reference_location: Tuple[float, float] = CAMPUS_ORIGIN):
         self.focal_length = None
         self.known_width = 3.0  # meters (average building width)
         self.camera_matrix = None
         self.dist_coeffs = None
         self.calibration_file = Path(calibration_file)
+        # Bearings are computed in local ENU metres; the building location is projected once
+        self.projection = projection or LocalProjection()
+        self.reference_enu = self.projection.forward(*reference_location)
         self.load_calibration()
         
     def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
         """Preprocess image for better edge detection"""
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        # Apply Gaussian blur
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        # Apply adaptive thresholding
-        thresh = cv2.adaptiveThreshold(
-            blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
-        )
-        return thresh
+        return preprocess_for_edges(image)
 
-    def _detect_edges(self, image: np.ndarray) -> List[np.ndarray]:
+    def _detect_edges(self, image: np.ndarray, min_area: float = 1000) -> List[np.ndarray]:
         """Detect edges in the image"""
-        # Find contours
-        contours, _ = cv2.findContours(
-            image, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-        )
-        
-        # Filter contours based on area and shape
-        valid_contours = []
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            if area > 1000:  # Minimum area threshold
-                # Approximate the contour
-                peri = cv2.arcLength(contour, True)
-                approx = cv2.approxPolyDP(contour, 0.04 * peri, True)
-                
-                # Check if the shape is roughly rectangular
-                if len(approx) >= 4 and len(approx) <= 6:
-                    valid_contours.append(approx)
-        
-        return valid_contours
+        return detect_building_contours(image, min_area)
 
     def _calculate_distance(self, width_in_pixels: float) -> float:
         """Calculate distance using the focal length"""
@@ -143,51 +179,51 @@ class DistanceEstimator:
             print(f"Calibration error: {str(e)}")
             return False
 
-    def estimate_distance(self, image: np.ndarray, user_location: Optional[Tuple[float, float]] = None) -> float:
-        """Estimate distance to the building in the image"""
+    def estimate_distance(self, image: np.ndarray, user_location: Optional[Tuple[float, float]] = None,
+                          pixel_scale: float = 1.0,
+                          building_location: Optional[Tuple[float, float]] = None) -> float:
+        """Estimate distance to the building in the image.
+
+        ``pixel_scale`` is the ratio of original to working resolution for
+        downscaled images, so widths stay in full-resolution pixels.
+        """
         try:
-            # Preprocess image
-            processed = self._preprocess_image(image)
-            
-            # Detect edges
-            contours = self._detect_edges(processed)
-            
-            if not contours:
+            width_in_pixels = measure_building_width(image, pixel_scale)
+            if width_in_pixels is None:
                 raise ValueError("No valid building contours detected")
-            
-            # Find the largest contour (assuming it's the building)
-            largest_contour = max(contours, key=cv2.contourArea)
-            
-            # Get the width in pixels
-            x, y, w, h = cv2.boundingRect(largest_contour)
-            width_in_pixels = w
-            
-            # Calculate distance
-            distance = self._calculate_distance(width_in_pixels)
-            
-            # If user location is provided, adjust distance based on perspective
-            if user_location and self.camera_matrix is not None:
-                # Convert distance to meters
-                distance_meters = distance
-                
-                # Calculate angle based on user location
-                lat1, lon1 = user_location
-                # Assuming building is at a fixed location (can be parameterized)
-                lat2, lon2 = 24.9147, 67.0997  # Example coordinates
-                
-                # Calculate bearing
-                dlon = lon2 - lon1
-                y = math.sin(dlon) * math.cos(lat2)
-                x = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(dlon)
-                bearing = math.atan2(y, x)
-                
-                # Adjust distance based on angle
-                distance = distance_meters / math.cos(bearing)
-            
-            return distance
+            return self.distance_from_width(width_in_pixels, user_location, building_location)
         except Exception as e:
             raise ValueError(f"Distance estimation error: {str(e)}")
 
+    def distance_from_width(self, width_in_pixels: float,
+                            user_location: Optional[Tuple[float, float]] = None,
+                            building_location: Optional[Tuple[float, float]] = None) -> float:
+        """Convert a measured building width in pixels to a distance.
+
+        ``building_location`` is the (lat, lon) of the recognized building;
+        without it the bearing is taken to ``reference_location``.
+        """
+        # Calculate distance
+        distance = self._calculate_distance(width_in_pixels)
+        
+        # If user location is provided, adjust distance based on perspective
+        if user_location and self.camera_matrix is not None:
+            # Convert distance to meters
+            distance_meters = distance
+            
+            # Calculate bearing from the user to the building
+            target = self.reference_enu if building_location is None else self.projection.forward(*building_location)
+            east, north, _ = target - self.projection.forward(*user_location)
+            bearing = math.atan2(east, north)
+            
+            # Adjust distance based on angle. The cosine is negative for
+            # buildings to the south and vanishes towards east and west, so
+            # its magnitude is floored at the steepest correction we accept
+            obliquity = max(abs(math.cos(bearing)), math.cos(MAX_OBLIQUE_ANGLE))
+            distance = distance_meters / obliquity
+        
+        return distance
+
     def save_calibration(self) -> None:
         """Save camera calibration parameters"""
         calibration_data = {
@@ -0,0 +1,133 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+class TaskTimeout(Exception):
+    """Raised when an offloaded task does not finish within its timeout"""
+
+@dataclass
+class PoolStats:
+    workers: int
+    in_flight: int = 0
+    max_in_flight: int = 0
+    completed: int = 0
+    failed: int = 0
+    timeouts: int = 0
+    total_seconds: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def start(self) -> None:
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finish(self, seconds: float, outcome: str) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            self.total_seconds += seconds
+            if outcome == 'completed':
+                self.completed += 1
+            elif outcome == 'timeout':
+                self.timeouts += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            finished = self.completed + self.failed + self.timeouts
+            return {
+                "workers": self.workers,
+                "in_flight": self.in_flight,
+                # Tasks submitted but still waiting for a free worker
+                "queue_depth": max(self.in_flight - self.workers, 0),
+                "max_in_flight": self.max_in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+                "mean_seconds": self.total_seconds / finished if finished else 0.0
+            }
+
+
+class TaskExecutor:
+    """Runs blocking work off the asyncio event loop.
+
+    CPU-heavy vision and clustering work goes to a process pool so it runs in
+    parallel across cores. Lighter work, such as NumPy matching, OpenCV calls
+    that release the GIL, and solver calls, goes to a thread pool. Every task
+    has a timeout. On timeout the caller stops waiting, but a task that has
+    already started keeps its worker until it finishes.
+    """
+
+    def __init__(self, process_workers: Optional[int] = None, thread_workers: int = 8,
+                 task_timeout: float = 30.0):
+        process_workers = process_workers or multiprocessing.cpu_count()
+        self.task_timeout = task_timeout
+        # Spawned workers import the modules of the functions they run plus the
+        # main module. Under `uvicorn app:app` the main module is uvicorn's CLI,
+        # which spawn skips, and run.py only imports uvicorn. A script that
+        # built the app as the main module would be re-imported in full
+        self._process_pool = ProcessPoolExecutor(
+            max_workers=process_workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        self._thread_pool = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix='api-worker')
+        self._stats = {
+            'process': PoolStats(workers=process_workers),
+            'thread': PoolStats(workers=thread_workers)
+        }
+
+    async def _run(self, pool_name: str, pool, fn: Callable, args: tuple,
+                   timeout: Optional[float]) -> Any:
+        stats = self._stats[pool_name]
+        loop = asyncio.get_running_loop()
+        stats.start()
+        start = time.perf_counter()
+        outcome = 'failed'
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(pool, fn, *args),
+                timeout=timeout or self.task_timeout
+            )
+            outcome = 'completed'
+            return result
+        except asyncio.TimeoutError:
+            outcome = 'timeout'
+            raise TaskTimeout(f"{getattr(fn, '__name__', 'task')} timed out after {timeout or self.task_timeout}s")
+        finally:
+            stats.finish(time.perf_counter() - start, outcome)
+
+    async def run_cpu(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run a picklable module-level function in the process pool"""
+        return await self._run('process', self._process_pool, fn, args, timeout)
+
+    async def run_thread(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run a function in the thread pool"""
+        return await self._run('thread', self._thread_pool, fn, args, timeout)
+
+    def run_cpu_sync(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Run a function in the process pool from a worker thread and wait for it"""
+        stats = self._stats['process']
+        stats.start()
+        start = time.perf_counter()
+        outcome = 'failed'
+        try:
+            result = self._process_pool.submit(fn, *args).result(timeout=timeout or self.task_timeout)
+            outcome = 'completed'
+            return result
+        except FutureTimeoutError:
+            outcome = 'timeout'
+            raise TaskTimeout(f"{getattr(fn, '__name__', 'task')} timed out after {timeout or self.task_timeout}s")
+        finally:
+            stats.finish(time.perf_counter() - start, outcome)
+
+    def metrics(self) -> Dict:
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
+
+    def shutdown(self) -> None:
+        self._thread_pool.shutdown(wait=False)
+        self._process_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,72 @@
+import numpy as np
+from typing import Union
+
+ArrayLike = Union[float, np.ndarray, list]
+
+# WGS84 ellipsoid
+WGS84_A = 6378137.0
+WGS84_F = 1.0 / 298.257223563
+WGS84_B = WGS84_A * (1.0 - WGS84_F)
+WGS84_E2 = WGS84_F * (2.0 - WGS84_F)
+WGS84_EP2 = (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+
+# Default projection origin on the FAST-NUCES Karachi campus
+CAMPUS_ORIGIN = (24.9147, 67.0997)
+
+def geodetic_to_ecef(lat: ArrayLike, lon: ArrayLike, alt: ArrayLike = 0.0) -> np.ndarray:
+    """Latitude/longitude in degrees and altitude in metres to (..., 3) ECEF metres"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    alt = np.asarray(alt, dtype=np.float64)
+    sin_lat = np.sin(lat)
+    radius = WGS84_A / np.sqrt(1.0 - WGS84_E2 * sin_lat ** 2)
+    return np.stack([
+        (radius + alt) * np.cos(lat) * np.cos(lon),
+        (radius + alt) * np.cos(lat) * np.sin(lon),
+        (radius * (1.0 - WGS84_E2) + alt) * sin_lat
+    ], axis=-1)
+
+def ecef_to_geodetic(ecef: np.ndarray) -> np.ndarray:
+    """(..., 3) ECEF metres to (..., 3) latitude, longitude (degrees) and altitude.
+
+    Uses Bowring's closed-form latitude, which is accurate to well below a
+    millimetre near the Earth's surface.
+    """
+    x, y, z = ecef[..., 0], ecef[..., 1], ecef[..., 2]
+    p = np.hypot(x, y)
+    theta = np.arctan2(z * WGS84_A, p * WGS84_B)
+    lat = np.arctan2(
+        z + WGS84_EP2 * WGS84_B * np.sin(theta) ** 3,
+        p - WGS84_E2 * WGS84_A * np.cos(theta) ** 3
+    )
+    radius = WGS84_A / np.sqrt(1.0 - WGS84_E2 * np.sin(lat) ** 2)
+    alt = p / np.cos(lat) - radius
+    return np.stack([np.degrees(lat), np.degrees(np.arctan2(y, x)), alt], axis=-1)
+
+
+class LocalProjection:
+    """East-north-up (ENU) frame in metres around a fixed origin.
+
+    The origin's ECEF position and rotation are computed once. forward and
+    inverse are vectorized, so a whole batch of points is converted in a
+    single call.
+    """
+
+    def __init__(self, origin_lat: float = CAMPUS_ORIGIN[0], origin_lon: float = CAMPUS_ORIGIN[1],
+                 origin_alt: float = 0.0):
+        self.origin = (origin_lat, origin_lon, origin_alt)
+        self._origin_ecef = geodetic_to_ecef(origin_lat, origin_lon, origin_alt)
+        lat, lon = np.radians(origin_lat), np.radians(origin_lon)
+        # Rows are the east, north and up unit vectors in ECEF
+        self._rotation = np.array([
+            [-np.sin(lon), np.cos(lon), 0.0],
+            [-np.sin(lat) * np.cos(lon), -np.sin(lat) * np.sin(lon), np.cos(lat)],
+            [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+        ])
+
+    def forward(self, lat: ArrayLike, lon: ArrayLike, alt: ArrayLike = 0.0) -> np.ndarray:
+        """Latitude/longitude (degrees) and altitude to (..., 3) east, north, up metres"""
+        return (geodetic_to_ecef(lat, lon, alt) - self._origin_ecef) @ self._rotation.T
+
+    def inverse(self, enu: ArrayLike) -> np.ndarray:
+        """(..., 3) east, north, up metres to (..., 3) latitude, longitude (degrees) and altitude"""
+        return ecef_to_geodetic(np.asarray(enu, dtype=np.float64) @ self._rotation + self._origin_ecef)
@@ -0,0 +1,73 @@
+import cv2
+import numpy as np
+import io
+from PIL import Image
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional, Tuple
+
+# cv2 flags that let libjpeg decode directly at 1/2, 1/4 or 1/8 of full size
+_REDUCED_FLAGS = {
+    (1, True): cv2.IMREAD_GRAYSCALE,
+    (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    (1, False): cv2.IMREAD_COLOR,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2,
+    (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+@dataclass
+class DecodePolicy:
+    max_side: int = 1280  # longest side of the working image in pixels, 0 = full resolution
+    grayscale: bool = True  # decode straight to grayscale where color isn't needed
+    keypoint_budget: int = 2000  # strongest-N keypoints kept by the detector, 0 = unlimited
+
+def _reduction_factor(width: int, height: int, max_side: int) -> int:
+    """Largest power-of-two reduction that keeps the longest side at or above max_side"""
+    if max_side <= 0:
+        return 1
+    longest = max(width, height)
+    factor = 1
+    while factor < 8 and longest // (factor * 2) >= max_side:
+        factor *= 2
+    return factor
+
+def decode_image(contents: bytes, policy: DecodePolicy,
+                 color: bool = False) -> Tuple[Optional[np.ndarray], Dict]:
+    """Decode an uploaded image at the policy's working resolution.
+
+    Returns the image (None if it cannot be decoded) and a record of the
+    decisions taken. ``scale`` maps working-image pixels back to pixels of
+    the original upload.
+    """
+    grayscale = policy.grayscale and not color
+    try:
+        # Only the header is parsed here, not the pixel data
+        width, height = Image.open(io.BytesIO(contents)).size
+    except Exception:
+        width, height = 0, 0
+
+    factor = _reduction_factor(width, height, policy.max_side) if width else 1
+    image = cv2.imdecode(np.frombuffer(contents, np.uint8), _REDUCED_FLAGS[(factor, grayscale)])
+    if image is None:
+        return None, {}
+
+    if not width:
+        height, width = image.shape[:2]
+
+    # Reduced decoding only halves; finish the last step with an area resize
+    longest = max(image.shape[:2])
+    if policy.max_side > 0 and longest > policy.max_side:
+        ratio = policy.max_side / longest
+        image = cv2.resize(image, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+
+    decoded_height, decoded_width = image.shape[:2]
+    return image, {
+        "original_size": [width, height],
+        "decoded_size": [decoded_width, decoded_height],
+        "reduction": factor,
+        "scale": max(width, height) / max(decoded_width, decoded_height),
+        "grayscale": grayscale,
+        "policy": asdict(policy)
+    }
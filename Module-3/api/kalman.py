@@ -0,0 +1,51 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# Measurement model: fixes observe the position part of the state
+_H = np.hstack([np.eye(3), np.zeros((3, 3))])
+
+@dataclass
+class KalmanTracker:
+    """Constant-velocity Kalman filter over [x, y, z, vx, vy, vz].
+
+    Each update is a fixed-size predict/correct step, so the cost does not
+    depend on how long the session has been tracked.
+    """
+    process_noise: float = 0.5  # acceleration noise spectral density (m^2 / s^3)
+    measurement_noise: float = 4.0  # variance of one position fix (m^2)
+    initial_velocity_variance: float = 4.0
+    state: Optional[np.ndarray] = None
+    covariance: Optional[np.ndarray] = None
+    timestamp: Optional[float] = None
+
+    def _predict(self, dt: float) -> None:
+        transition = np.eye(6)
+        transition[:3, 3:] = dt * np.eye(3)
+        # Discrete white-noise acceleration model
+        block = self.process_noise * np.array([[dt ** 3 / 3.0, dt ** 2 / 2.0],
+                                               [dt ** 2 / 2.0, dt]])
+        noise = np.kron(block, np.eye(3))
+        self.state = transition @ self.state
+        self.covariance = transition @ self.covariance @ transition.T + noise
+
+    def update(self, measurement: np.ndarray, timestamp: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Fuse one position fix; returns the filtered position and its 3x3 covariance"""
+        measurement = np.asarray(measurement, dtype=np.float64)
+        if self.state is None:
+            self.state = np.concatenate([measurement, np.zeros(3)])
+            self.covariance = np.diag([self.measurement_noise] * 3 + [self.initial_velocity_variance] * 3)
+        else:
+            self._predict(max(timestamp - self.timestamp, 0.0))
+            innovation = measurement - self.state[:3]
+            innovation_cov = self.covariance[:3, :3] + self.measurement_noise * np.eye(3)
+            gain = np.linalg.solve(innovation_cov, self.covariance[:3, :]).T
+            self.state = self.state + gain @ innovation
+            self.covariance = (np.eye(6) - gain @ _H) @ self.covariance
+            self.covariance = 0.5 * (self.covariance + self.covariance.T)
+        self.timestamp = timestamp
+        return self.state[:3].copy(), self.covariance[:3, :3].copy()
+
+    @property
+    def velocity(self) -> Optional[np.ndarray]:
+        return None if self.state is None else self.state[3:].copy()
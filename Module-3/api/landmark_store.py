@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+from dataclasses import asdict
+from pathlib import Path
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar('T')
+
+class LandmarkStore(Generic[T]):
+    """Landmark positions backed by a JSON file with debounced write-behind.
+
+    Upserts change the in-memory map right away and schedule one write
+    ``flush_delay`` seconds later, so a burst of updates costs a single file
+    write. Writes go to a temporary file that is renamed over the old one,
+    so readers never see a partial file.
+    """
+
+    def __init__(self, path: Path, point_type: Callable[..., T], flush_delay: float = 0.5):
+        self.path = Path(path)
+        self.point_type = point_type
+        self.flush_delay = flush_delay
+        self.positions: Dict[str, T] = {}
+        self.lock = threading.RLock()
+        # Serializes file writes without blocking readers of the positions
+        self._write_lock = threading.Lock()
+        self.writes = 0
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self.load()
+
+    def load(self) -> None:
+        """Load landmark positions from the file"""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            with self.lock:
+                self.positions.clear()
+                self.positions.update({name: self.point_type(**pos) for name, pos in data.items()})
+        except Exception as e:
+            print(f"Error loading landmark positions: {str(e)}")
+
+    def upsert(self, positions: Dict[str, T]) -> None:
+        """Insert or replace many landmarks and schedule a write if any changed"""
+        with self.lock:
+            changed = {name: pos for name, pos in positions.items() if self.positions.get(name) != pos}
+            if not changed:
+                return
+            self.positions.update(changed)
+            self._dirty = True
+            if self.flush_delay > 0 and self._timer is None:
+                self._timer = threading.Timer(self.flush_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if self.flush_delay <= 0:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write pending changes now"""
+        with self._write_lock:
+            with self.lock:
+                self._timer = None
+                if not self._dirty:
+                    return
+                data = {name: asdict(pos) for name, pos in self.positions.items()}
+                self._dirty = False
+
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f, indent=2)
+                os.replace(tmp_path, self.path)
+                self.writes += 1
+            except Exception as e:
+                with self.lock:
+                    self._dirty = True
+                print(f"Error saving landmark positions: {str(e)}")
+
+    def close(self) -> None:
+        """Cancel the pending timer and write any pending changes"""
+        with self.lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self.flush()
@@ -0,0 +1,38 @@
+import time
+from typing import Dict
+from building_recognition import extract_descriptors
+from distance_estimator import measure_building_width
+from image_decoding import DecodePolicy, decode_image
+
+def analyze_frame(contents: bytes, policy: DecodePolicy, descriptor: str = 'sift') -> Dict:
+    """Decode an upload once and run every per-image stage of localization on it.
+
+    The same grayscale buffer feeds feature extraction and building width
+    measurement. Nothing here needs recognizer or calibration state, so it
+    runs in a worker process; matching and the distance conversion happen
+    in the API process.
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    image, decode_info = decode_image(contents, policy)
+    timings['decode'] = time.perf_counter() - start
+    if image is None:
+        return {"valid": False, "timings": timings}
+
+    start = time.perf_counter()
+    keypoints, descriptors = extract_descriptors(image, descriptor, policy.keypoint_budget)
+    timings['extract'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    width_px = measure_building_width(image, decode_info['scale'])
+    timings['measure'] = time.perf_counter() - start
+
+    return {
+        "valid": True,
+        "keypoints": keypoints,
+        "descriptors": descriptors,
+        "width_px": width_px,
+        "decode": decode_info,
+        "timings": timings
+    }
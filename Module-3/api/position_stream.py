@@ -0,0 +1,133 @@
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+class Subscription:
+    """Pending position updates of one streaming connection.
+
+    At most ``max_pending`` updates are queued. When a slow consumer falls
+    behind, the oldest updates are dropped and counted, and the consumer
+    gets the remaining ones in a single message. A connection with nothing
+    to send waits on an event, so it uses no CPU.
+    """
+
+    def __init__(self, session_id: str, max_pending: int = 32):
+        self.session_id = session_id
+        self._pending = deque(maxlen=max_pending)
+        self._event = asyncio.Event()
+        self.coalesced = 0
+
+    def push(self, update: Dict) -> None:
+        if len(self._pending) == self._pending.maxlen:
+            self.coalesced += 1
+        self._pending.append(update)
+        self._event.set()
+
+    async def next(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Wait for updates; returns None if nothing arrived within timeout"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._event.clear()
+        message = {"session_id": self.session_id, "fixes": list(self._pending), "coalesced": self.coalesced}
+        self._pending.clear()
+        self.coalesced = 0
+        return message
+
+
+class PositionBroadcaster:
+    """Fans new fixes out to the streaming connections of their session.
+
+    publish may be called from any thread. Delivery happens on the event
+    loop, and only for sessions that have at least one subscriber.
+    """
+
+    def __init__(self, max_pending: int = 32):
+        self.max_pending = max_pending
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def subscribe(self, session_id: str) -> Subscription:
+        """Open a subscription; call from the event loop"""
+        subscription = Subscription(session_id, self.max_pending)
+        self._subscribers.setdefault(session_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.session_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.session_id]
+
+    def has_subscribers(self, session_id: str) -> bool:
+        return session_id in self._subscribers
+
+    def publish(self, session_id: str, update: Dict) -> None:
+        """Queue an update for every subscriber of the session"""
+        if self._loop is None or session_id not in self._subscribers:
+            return
+        self._loop.call_soon_threadsafe(self._deliver, session_id, update)
+
+    def _deliver(self, session_id: str, update: Dict) -> None:
+        self.published += 1
+        for subscription in list(self._subscribers.get(session_id, ())):
+            subscription.push(update)
+
+    def stats(self) -> Dict:
+        return {
+            "sessions": len(self._subscribers),
+            "connections": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published
+        }
+
+
+async def follow(subscription: Subscription, closed: Callable[[], Awaitable[bool]],
+                 keepalive: float = 0.0, poll: float = 1.0) -> AsyncIterator[Optional[Dict]]:
+    """Messages of a subscription, and None as a keepalive after ``keepalive`` idle seconds.
+
+    For connections whose closure can only be polled. Stops once ``closed()``
+    is true. It is checked at least every ``poll`` seconds whether or not
+    fixes arrive, so a client that went away from an idle session, or from a
+    stream without keepalives, is still noticed.
+    """
+    last_sent = time.monotonic()
+    while not await closed():
+        timeout = poll
+        if keepalive:
+            timeout = min(poll, max(0.0, last_sent + keepalive - time.monotonic()))
+        message = await subscription.next(timeout)
+        if message is None and not (keepalive and time.monotonic() - last_sent >= keepalive):
+            continue
+        if await closed():
+            return
+        last_sent = time.monotonic()
+        yield message
+
+
+async def follow_until(subscription: Subscription, closed: asyncio.Future,
+                       keepalive: float = 0.0) -> AsyncIterator[Optional[Dict]]:
+    """Messages of a subscription, and None as a keepalive after ``keepalive`` idle seconds.
+
+    Stops once the ``closed`` future completes. The next message and the
+    closure are awaited together, so an idle connection is not woken until
+    one of them happens.
+    """
+    message = None
+    try:
+        while not closed.done():
+            message = asyncio.ensure_future(subscription.next(keepalive or None))
+            await asyncio.wait({closed, message}, return_when=asyncio.FIRST_COMPLETED)
+            if closed.done():
+                return
+            yield message.result()
+    finally:
+        if message is not None:
+            message.cancel()
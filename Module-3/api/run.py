@@ -0,0 +1,19 @@
+"""Start the API server with uvicorn's CLI.
+
+    python run.py [uvicorn options, e.g. --port 9000 --workers 2]
+
+Equivalent to ``uvicorn app:app --host $HOST --port $PORT`` (defaults
+0.0.0.0 and 8000); options given on the command line take precedence.
+The app is handed to uvicorn by import string, so app.py is never the main
+module and the executor's spawned pool workers do not re-import it.
+"""
+import os
+import sys
+import uvicorn
+
+if __name__ == "__main__":
+    uvicorn.main([
+        'app:app', '--app-dir', os.path.dirname(os.path.abspath(__file__)),
+        '--host', os.getenv('HOST', '0.0.0.0'), '--port', os.getenv('PORT', '8000'),
+        *sys.argv[1:]
+    ])
@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar('T')
+
+class SessionStore(Generic[T]):
+    """Thread-safe LRU map of session token -> state with idle-time (TTL) expiry.
+
+    Sessions are kept in least-recently-used order, so expired sessions are
+    always at the front and are purged in amortized O(1) on every access.
+    When the store is full the least recently used session is evicted.
+    """
+
+    def __init__(self, factory: Callable[[], T], max_sessions: int = 10000,
+                 ttl_seconds: float = 1800.0):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: "OrderedDict[str, T]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def _purge_expired(self, now: float) -> None:
+        while self._sessions:
+            token = next(iter(self._sessions))
+            if now - self._last_access[token] <= self.ttl_seconds:
+                break
+            self._remove(token)
+            self.expired += 1
+
+    def _remove(self, token: str) -> None:
+        del self._sessions[token]
+        del self._last_access[token]
+
+    def get(self, token: str, create: bool = True) -> Optional[T]:
+        """Return the session for token, creating it if needed"""
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            session = self._sessions.get(token)
+            if session is None:
+                if not create:
+                    return None
+                session = self.factory()
+                self._sessions[token] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._remove(next(iter(self._sessions)))
+                    self.evicted += 1
+            self._sessions.move_to_end(token)
+            self._last_access[token] = now
+            return session
+
+    def discard(self, token: str) -> bool:
+        """Drop a session; returns False if it did not exist"""
+        with self._lock:
+            if token not in self._sessions:
+                return False
+            self._remove(token)
+            return True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            return {
+                "active": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "evicted": self.evicted,
+                "expired": self.expired
+            }
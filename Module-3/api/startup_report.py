@@ -0,0 +1,50 @@
+"""Cold-start benchmark for the API.
+
+Imports the app in a fresh interpreter with ``-X importtime`` and reports
+the wall-clock import time and the slowest top-level packages. Run from
+Module-3/api:
+
+    python startup_report.py [--module app] [--top 15]
+"""
+import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+def import_times(stderr: str) -> dict:
+    """Sum self time (microseconds) per top-level package from -X importtime output"""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|', 2)
+        totals[name.strip().split('.')[0]] += int(self_us)
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app', help='module to import')
+    parser.add_argument('--top', type=int, default=15, help='number of packages to list')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {args.module}'],
+        cwd=Path(__file__).resolve().parent, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1] if result.stderr else 'import failed')
+        sys.exit(result.returncode)
+
+    totals = import_times(result.stderr)
+    print(f"import {args.module}: {wall * 1000:.0f} ms wall clock "
+          f"({sum(totals.values()) / 1000:.0f} ms in imports)")
+    print(f"{'package':<30} {'ms':>8}")
+    for name, micros in sorted(totals.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{name:<30} {micros / 1000:>8.1f}")
+
+if __name__ == "__main__":
+    main()
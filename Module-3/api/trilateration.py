@@ -1,10 +1,15 @@
 import numpy as np
-from typing import List, Tuple, Dict, Optional
-import math
-from dataclasses import dataclass
-from scipy.optimize import least_squares
-import json
+from collections import deque
+from typing import Callable, Deque, List, Tuple, Dict, Optional, Sequence, Union
+from dataclasses import dataclass, field
+import itertools
+import threading
+import time
 from pathlib import Path
+from sessions import SessionStore
+from kalman import KalmanTracker
+from landmark_store import LandmarkStore
+from geodesy import LocalProjection
 
 @dataclass
 class Point:
@@ -12,167 +17,586 @@ class Point:
     y: float
     z: float = 0.0  # For 2D trilateration, z is always 0
 
+# Landmarks are given and persisted as Point(latitude, longitude, altitude);
+# every solver computation and every returned position is in local ENU metres
+# (x = east, y = north, z = up) of the solver's projection
+
+@dataclass
+class LandmarkArrays:
+    """Structure-of-arrays view of the landmarks observed in one fix"""
+    positions: np.ndarray  # (N, 3) landmark coordinates
+    distances: np.ndarray  # (N,) measured distances
+    confidences: np.ndarray  # (N,) residual weights
+
+    def __len__(self) -> int:
+        return len(self.distances)
+
+# 'window' averages the last max_history fixes; 'kalman' runs a constant-velocity filter
+TRACKING_MODES = ('window', 'kalman')
+
+@dataclass
+class TrackingSession:
+    """Smoothing state and warm start of one tracked client"""
+    tracking: str = 'window'
+    # Last fixes for display; in 'window' mode also the averaging window
+    position_history: Deque[Point] = field(default_factory=lambda: deque(maxlen=10))
+    last_position: Optional[Point] = None
+    kalman: Optional[KalmanTracker] = None
+    covariance: Optional[np.ndarray] = None
+    version: int = 0  # changes whenever the session's positions change
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+# Session used by callers that do not pass a session token
+DEFAULT_SESSION = 'default'
+# Rough upper bound of one session's footprint with a full smoothing buffer,
+# used to turn a memory cap into a session count
+SESSION_BYTES_ESTIMATE = 4096
+
+# Landmarks whose heights differ by less than this fraction of their
+# horizontal extent are treated as coplanar, and the solvers keep fixes on
+# their plane. Level campus landmarks still differ by millimetres in ENU,
+# because the up axis is only vertical at the origin
+PLANAR_Z_RATIO = 1e-3
+
+# How a fix was solved: accepted linear solution, linear guess refined by the
+# nonlinear solver, or nonlinear solver without a linear guess
+SOLVER_PATHS = ('linear', 'refined', 'fallback')
+
 @dataclass
-class Landmark:
-    name: str
-    position: Point
-    distance: float
-    confidence: float = 1.0
+class SolverStats:
+    counts: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(SOLVER_PATHS, 0))
+    seconds: Dict[str, float] = field(default_factory=lambda: dict.fromkeys(SOLVER_PATHS, 0.0))
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, path: str, seconds: float, fixes: int = 1) -> None:
+        with self.lock:
+            self.counts[path] += fixes
+            self.seconds[path] += seconds
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            total = sum(self.counts.values())
+            return {
+                path: {
+                    "count": self.counts[path],
+                    "fraction": self.counts[path] / total if total else 0.0,
+                    "mean_ms": 1000.0 * self.seconds[path] / self.counts[path] if self.counts[path] else 0.0
+                }
+                for path in SOLVER_PATHS
+            }
 
 class TrilaterationSolver:
-    def __init__(self, calibration_file: str = 'trilateration_calibration.json'):
+    def __init__(self, calibration_file: str = 'trilateration_calibration.json',
+                 max_sessions: int = 10000, session_ttl: float = 1800.0,
+                 linear_tolerance: float = 1.0, tracking_mode: str = 'window',
+                 kalman_params: Optional[Dict[str, float]] = None, flush_delay: float = 0.5,
+                 projection: Optional[LocalProjection] = None):
+        if tracking_mode not in TRACKING_MODES:
+            raise ValueError(f"Unknown tracking mode: {tracking_mode}")
         self.calibration_file = Path(calibration_file)
-        self.landmark_positions = self._load_landmark_positions()
-        self.last_position = None
-        self.position_history = []
+        # Landmark writes are batched and written behind after flush_delay seconds
+        self.landmarks: LandmarkStore[Point] = LandmarkStore(self.calibration_file, Point, flush_delay)
+        self.landmark_positions = self.landmarks.positions
+        # Each landmark is projected to ENU once, when it is added or moved
+        self.projection = projection or LocalProjection()
+        self._landmark_rows: Dict[str, int] = {}
+        self._landmark_enu = np.empty((0, 3))
+        # Versions come from one counter, so a recreated session never reuses an old version
+        self._versions = itertools.count(1)
+        self.landmark_version = 0
+        # Called as on_fix(session_id, position, version) after every smoothed fix
+        self.on_fix: Optional[Callable[[str, Point, int], None]] = None
         self.max_history = 10  # Keep last 10 positions for smoothing
+        # RMS weighted range residual (metres) under which the linear solution is final
+        self.linear_tolerance = linear_tolerance
+        self.stats = SolverStats()
+        # Tracking mode of new sessions and parameters of their Kalman filters
+        self.tracking_mode = tracking_mode
+        self.kalman_params = kalman_params or {}
+        # Per-client tracking state, evicted when idle or least recently used
+        self.sessions: SessionStore[TrackingSession] = SessionStore(
+            lambda: TrackingSession(tracking=self.tracking_mode,
+                                    position_history=deque(maxlen=self.max_history)),
+            max_sessions=max_sessions, ttl_seconds=session_ttl
+        )
+        # Requests are served from a thread pool; the store's lock guards the shared landmarks
+        self._lock = self.landmarks.lock
+        self._project_landmarks(dict(self.landmark_positions))
         
-    def _load_landmark_positions(self) -> Dict[str, Point]:
-        """Load known landmark positions from calibration file"""
-        if not self.calibration_file.exists():
-            return {}
-            
-        try:
-            with open(self.calibration_file, 'r') as f:
-                data = json.load(f)
-                return {
-                    name: Point(**pos)
-                    for name, pos in data.items()
-                }
-        except Exception as e:
-            print(f"Error loading landmark positions: {str(e)}")
-            return {}
+    @staticmethod
+    def _residuals(point: np.ndarray, landmarks: LandmarkArrays) -> np.ndarray:
+        """Confidence-weighted range residuals for least squares optimization"""
+        ranges = np.linalg.norm(point - landmarks.positions, axis=1)
+        return (ranges - landmarks.distances) * landmarks.confidences
 
-    def _save_landmark_positions(self) -> None:
-        """Save landmark positions to calibration file"""
-        try:
-            data = {
-                name: {
-                    'x': pos.x,
-                    'y': pos.y,
-                    'z': pos.z
-                }
-                for name, pos in self.landmark_positions.items()
-            }
-            with open(self.calibration_file, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            print(f"Error saving landmark positions: {str(e)}")
-
-    def _distance(self, p1: Point, p2: Point) -> float:
-        """Calculate Euclidean distance between two points"""
-        return math.sqrt(
-            (p1.x - p2.x) ** 2 +
-            (p1.y - p2.y) ** 2 +
-            (p1.z - p2.z) ** 2
-        )
+    @staticmethod
+    def _jacobian(point: np.ndarray, landmarks: LandmarkArrays) -> np.ndarray:
+        """Analytic Jacobian of the residuals: weighted unit vectors from each landmark"""
+        offsets = point - landmarks.positions
+        ranges = np.linalg.norm(offsets, axis=1)
+        # The range is not differentiable on a landmark; treat its gradient as zero there
+        ranges = np.maximum(ranges, 1e-12)
+        jacobian = offsets * (landmarks.confidences / ranges)[:, None]
+        if TrilaterationSolver._coplanar(landmarks.positions, landmarks.confidences[None, :] > 0)[0]:
+            # z is unobservable from coplanar landmarks; keep it at the initial guess
+            jacobian[:, 2] = 0.0
+        return jacobian
 
-    def _residuals(self, point: np.ndarray, landmarks: List[Landmark]) -> np.ndarray:
-        """Calculate residuals for least squares optimization"""
-        current_point = Point(point[0], point[1], point[2])
-        residuals = []
-        
-        for landmark in landmarks:
-            calculated_distance = self._distance(current_point, landmark.position)
-            residual = calculated_distance - landmark.distance
-            # Weight by confidence
-            residuals.append(residual * landmark.confidence)
-            
-        return np.array(residuals)
+    @staticmethod
+    def _coplanar(positions: np.ndarray, valid: np.ndarray) -> np.ndarray:
+        """Mask of the M fixes whose valid landmarks (an (M, N) mask) are coplanar"""
+        def spread(values):
+            high = np.where(valid[:, :, None], values[None, :, :], -np.inf).max(axis=1)
+            low = np.where(valid[:, :, None], values[None, :, :], np.inf).min(axis=1)
+            return np.where(valid.any(axis=1)[:, None], high - low, 0.0)
+
+        vertical = spread(positions[:, 2:])[:, 0]
+        horizontal = spread(positions[:, :2]).max(axis=1)
+        return vertical <= PLANAR_Z_RATIO * horizontal
+
+    @staticmethod
+    def _linear_batch(positions: np.ndarray, distances: np.ndarray,
+                      weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Closed-form 2D trilateration for M fixes at once.
+
+        Subtracting the weighted mean of the range equations
+        |x - p_i|^2 = d_i^2 removes the quadratic term, which leaves a
+        weighted linear least-squares problem in (x, y) per fix. Returns
+        (M, 3) estimates with z = 0 and a mask of fixes whose system was
+        well conditioned.
+        """
+        valid = weights > 0
+        counts = valid.sum(axis=1)
+        total = np.maximum(weights.sum(axis=1), 1e-12)[:, None]
+        planar = positions[:, :2]
+
+        centroid = (weights @ planar) / total
+        rhs = distances ** 2 - (planar ** 2).sum(axis=1)[None, :]
+        rhs = rhs - (weights * rhs).sum(axis=1, keepdims=True) / total
+        design = -2.0 * (planar[None, :, :] - centroid[:, None, :])
+
+        squared = weights ** 2
+        normal = np.einsum('mn,mni,mnj->mij', squared, design, design)
+        projected = np.einsum('mn,mni,mn->mi', squared, design, rhs)
+        det = normal[:, 0, 0] * normal[:, 1, 1] - normal[:, 0, 1] ** 2
+        scale = np.trace(normal, axis1=1, axis2=2) ** 2
+        ok = (counts >= 3) & (det > 1e-10 * scale) & (scale > 0)
+
+        estimates = np.full((len(weights), 3), np.nan)
+        estimates[ok, :2] = np.linalg.solve(normal[ok], projected[ok][:, :, None])[:, :, 0]
+        estimates[ok, 2] = 0.0
+        return estimates, ok
+
+    @staticmethod
+    def _rms_residuals(estimates: np.ndarray, positions: np.ndarray, distances: np.ndarray,
+                       weights: np.ndarray) -> np.ndarray:
+        """RMS of the weighted range residuals of M estimates over their valid landmarks"""
+        ranges = np.linalg.norm(estimates[:, None, :] - positions[None, :, :], axis=2)
+        residuals = weights * (ranges - distances)
+        counts = np.maximum((weights > 0).sum(axis=1), 1)
+        return np.sqrt((residuals ** 2).sum(axis=1) / counts)
+
+    def _landmark_arrays(self, distances: Dict[str, float],
+                         confidences: Optional[Dict[str, float]] = None) -> LandmarkArrays:
+        """Collect the known landmarks of one fix into arrays"""
+        with self._lock:
+            names = [name for name in distances if name in self._landmark_rows]
+            positions = self._landmark_enu[[self._landmark_rows[name] for name in names]]
+        return LandmarkArrays(
+            positions=positions,
+            distances=np.array([distances[name] for name in names], dtype=np.float64),
+            confidences=np.array(
+                [confidences.get(name, 1.0) if confidences else 1.0 for name in names],
+                dtype=np.float64
+            )
+        )
 
-    def _estimate_position(self, landmarks: List[Landmark]) -> Optional[Point]:
+    def _estimate_position(self, landmarks: LandmarkArrays, last_position: Optional[Point] = None) -> Optional[Point]:
         """Estimate position using trilateration with least squares"""
         if len(landmarks) < 3:
             return None
-            
-        # Initial guess (use last known position or average of landmarks)
-        if self.last_position:
+
+        start = time.perf_counter()
+        distances, weights = landmarks.distances[None, :], landmarks.confidences[None, :]
+        linear, ok = self._linear_batch(landmarks.positions, distances, weights)
+        if ok[0]:
+            # Fast path: accept the closed-form solution when it already fits the ranges
+            if self._rms_residuals(linear, landmarks.positions, distances, weights)[0] <= self.linear_tolerance:
+                self.stats.record('linear', time.perf_counter() - start)
+                return Point(*linear[0])
+            path = 'refined'
+            initial_guess = linear[0]
+        # Otherwise start from the last known position or average of landmarks
+        elif last_position:
+            path = 'fallback'
             initial_guess = np.array([
-                self.last_position.x,
-                self.last_position.y,
-                self.last_position.z
+                last_position.x,
+                last_position.y,
+                last_position.z
             ])
         else:
+            path = 'fallback'
             initial_guess = np.array([
-                np.mean([l.position.x for l in landmarks]),
-                np.mean([l.position.y for l in landmarks]),
+                landmarks.positions[:, 0].mean(),
+                landmarks.positions[:, 1].mean(),
                 0.0
             ])
             
-        # Solve using least squares
+        solution = self._least_squares(landmarks, initial_guess)
+        self.stats.record(path, time.perf_counter() - start)
+        
+        if solution is None:
+            return None
+            
+        return Point(
+            x=solution[0],
+            y=solution[1],
+            z=solution[2]
+        )
+
+    def _least_squares(self, landmarks: LandmarkArrays, initial_guess: np.ndarray) -> Optional[np.ndarray]:
+        """Robust nonlinear solve of one fix; None if it does not converge"""
+        # scipy.optimize is only imported once a fix needs it
+        from scipy.optimize import least_squares
         result = least_squares(
             self._residuals,
             initial_guess,
+            jac=self._jacobian,
             args=(landmarks,),
             method='trf',
             loss='soft_l1'
         )
-        
-        if not result.success:
-            return None
-            
-        return Point(
-            x=result.x[0],
-            y=result.x[1],
-            z=result.x[2]
-        )
+        return result.x if result.success else None
 
-    def _smooth_position(self, new_position: Point) -> Point:
+    def _smooth_position(self, session: TrackingSession, new_position: Point,
+                         timestamp: Optional[float] = None) -> Point:
         """Apply temporal smoothing to position estimates"""
-        self.position_history.append(new_position)
-        if len(self.position_history) > self.max_history:
-            self.position_history.pop(0)
+        session.version = next(self._versions)
+        if session.tracking == 'kalman':
+            if session.kalman is None:
+                session.kalman = KalmanTracker(**self.kalman_params)
+            position, session.covariance = session.kalman.update(
+                [new_position.x, new_position.y, new_position.z],
+                time.monotonic() if timestamp is None else timestamp
+            )
+            # The filter is the only smoothing state; the history is kept for display
+            filtered = Point(*position)
+            session.position_history.append(filtered)
+            return filtered
+
+        history = session.position_history
+        history.append(new_position)
             
         # Calculate weighted average of recent positions
-        weights = np.linspace(0.5, 1.0, len(self.position_history))
+        weights = np.linspace(0.5, 1.0, len(history))
         weights /= weights.sum()
         
-        x = sum(p.x * w for p, w in zip(self.position_history, weights))
-        y = sum(p.y * w for p, w in zip(self.position_history, weights))
-        z = sum(p.z * w for p, w in zip(self.position_history, weights))
+        x = sum(p.x * w for p, w in zip(history, weights))
+        y = sum(p.y * w for p, w in zip(history, weights))
+        z = sum(p.z * w for p, w in zip(history, weights))
         
         return Point(x, y, z)
 
     def update_landmark_position(self, name: str, position: Point) -> None:
         """Update the position of a known landmark"""
-        self.landmark_positions[name] = position
-        self._save_landmark_positions()
+        self.update_landmark_positions({name: position})
+
+    def update_landmark_positions(self, positions: Dict[str, Point]) -> None:
+        """Insert or update many landmarks with a single deferred write"""
+        with self._lock:
+            self.landmarks.upsert(positions)
+            self._project_landmarks(positions)
+
+    def _project_landmarks(self, positions: Dict[str, Point]) -> None:
+        """Project geodetic landmarks to ENU in one vectorized call and cache the result"""
+        if not positions:
+            return
+        names = list(positions)
+        enu = self.projection.forward(
+            [positions[name].x for name in names],
+            [positions[name].y for name in names],
+            [positions[name].z for name in names]
+        )
+        with self._lock:
+            added = [name for name in names if name not in self._landmark_rows]
+            for name in added:
+                self._landmark_rows[name] = len(self._landmark_rows)
+            if added:
+                self._landmark_enu = np.vstack([self._landmark_enu, np.zeros((len(added), 3))])
+            self._landmark_enu[[self._landmark_rows[name] for name in names]] = enu
+            self.landmark_version = next(self._versions)
 
-    def estimate_position(self, distances: Dict[str, float], confidences: Optional[Dict[str, float]] = None) -> Optional[Point]:
+    def landmark_array(self) -> Tuple[List[str], np.ndarray]:
+        """Get landmark names and their (N, 3) ENU positions in metres"""
+        with self._lock:
+            return list(self._landmark_rows), self._landmark_enu.copy()
+
+    def landmark_points(self) -> Dict[str, Point]:
+        """Get every landmark's ENU position in metres"""
+        with self._lock:
+            return {name: Point(*self._landmark_enu[row]) for name, row in self._landmark_rows.items()}
+
+    def close(self) -> None:
+        """Write any pending landmark changes"""
+        self.landmarks.close()
+
+    def estimate_position(self, distances: Dict[str, float], confidences: Optional[Dict[str, float]] = None,
+                          session_id: Optional[str] = None, timestamp: Optional[float] = None) -> Optional[Point]:
         """Estimate current position based on distances to landmarks"""
-        # Create landmark objects with distances
-        landmarks = []
-        for name, distance in distances.items():
-            if name not in self.landmark_positions:
-                continue
-                
-            confidence = confidences.get(name, 1.0) if confidences else 1.0
-            landmarks.append(Landmark(
-                name=name,
-                position=self.landmark_positions[name],
-                distance=distance,
-                confidence=confidence
-            ))
-            
+        landmarks = self._landmark_arrays(distances, confidences)
         if len(landmarks) < 3:
             return None
             
-        # Estimate position
-        estimated_position = self._estimate_position(landmarks)
-        if estimated_position is None:
-            return None
-            
-        # Apply temporal smoothing
-        smoothed_position = self._smooth_position(estimated_position)
-        self.last_position = smoothed_position
+        # Only updates of the same session are serialized
+        token = session_id or DEFAULT_SESSION
+        session = self.sessions.get(token)
+        with session.lock:
+            # Estimate position
+            estimated_position = self._estimate_position(landmarks, session.last_position)
+            if estimated_position is None:
+                return None
+                
+            # Apply temporal smoothing
+            smoothed_position = self._smooth_position(session, estimated_position, timestamp)
+            session.last_position = smoothed_position
+            version = session.version
         
+        self._notify(token, smoothed_position, version)
         return smoothed_position
 
-    def get_position_history(self) -> List[Point]:
+    def _notify(self, session_id: str, position: Point, version: int) -> None:
+        """Hand a new fix to the on_fix listener, if any"""
+        if self.on_fix is None:
+            return
+        try:
+            self.on_fix(session_id, position, version)
+        except Exception as e:
+            print(f"Error publishing position update: {str(e)}")
+
+    def _padded_problem(self, distances: Union[np.ndarray, Sequence[Dict[str, float]]],
+                        confidences: Optional[Union[np.ndarray, Sequence[Optional[Dict[str, float]]]]],
+                        landmark_names: Optional[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Turn a batch of fixes into landmark positions (N, 3) and padded (M, N) distances and weights"""
+        if landmark_names is not None:
+            names = list(landmark_names)
+            matrix = np.asarray(distances, dtype=np.float64).reshape(-1, len(names))
+            weights = (np.ones_like(matrix) if confidences is None
+                       else np.asarray(confidences, dtype=np.float64).reshape(matrix.shape))
+        else:
+            names = sorted(set().union(*distances)) if len(distances) else []
+            column = {name: i for i, name in enumerate(names)}
+            matrix = np.full((len(distances), len(names)), np.nan)
+            weights = np.ones_like(matrix)
+            for row, fix in enumerate(distances):
+                for name, distance in fix.items():
+                    matrix[row, column[name]] = distance
+                for name, confidence in ((confidences[row] or {}) if confidences else {}).items():
+                    if name in column:
+                        weights[row, column[name]] = confidence
+
+        with self._lock:
+            known = [i for i, name in enumerate(names) if name in self._landmark_rows]
+            positions = self._landmark_enu[[self._landmark_rows[names[i]] for i in known]]
+
+        # Missing distances (NaN padding or unknown landmarks) get zero weight
+        matrix, weights = matrix[:, known], weights[:, known]
+        valid = np.isfinite(matrix)
+        return positions, np.where(valid, matrix, 0.0), np.where(valid, weights, 0.0)
+
+    @staticmethod
+    def _gauss_newton_batch(positions: np.ndarray, distances: np.ndarray, weights: np.ndarray,
+                            initial: np.ndarray, max_iterations: int = 20,
+                            tol: float = 1e-6, solve: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Solve M independent fixes at once with Gauss-Newton.
+
+        Every iteration forms the (M, 3, 3) normal equations with einsum and
+        solves them together, minimizing the single-fix solver's soft_l1
+        loss. Each fix takes the step with the loss's own curvature (the
+        correction scipy applies for robust losses), which converges quickly
+        near the solution; where that step does not lower the loss it takes
+        the iteratively reweighted least squares step, which always does.
+        Fixes drop out of the iteration as soon as their step is below tol.
+        ``solve`` optionally restricts the iteration to a subset of fixes.
+        """
+        def loss(points, rows):
+            ranges = np.linalg.norm(points[:, None, :] - positions[None, :, :], axis=2)
+            return np.sqrt(1.0 + (weights[rows] * (ranges - distances[rows])) ** 2).sum(axis=1)
+
+        estimates = initial.copy()
+        converged = np.zeros(len(estimates), dtype=bool)
+        solvable = (weights > 0).sum(axis=1) >= 3
+        active = np.flatnonzero(solvable if solve is None else solvable & solve)
+        # A tiny ridge keeps the normal equations solvable when all landmarks are coplanar
+        ridge = 1e-9 * np.eye(3)
+        # With coplanar landmarks z is unobservable: noisy ranges are fit equally
+        # well at +z and -z, and the iteration swings between the two. Keep z
+        # at its initial value instead
+        planar = TrilaterationSolver._coplanar(positions, weights > 0)
+
+        for _ in range(max_iterations):
+            if not len(active):
+                break
+            offsets = estimates[active, None, :] - positions[None, :, :]
+            ranges = np.maximum(np.linalg.norm(offsets, axis=2), 1e-12)
+            residuals = weights[active] * (ranges - distances[active])
+            scale = 1.0 + residuals ** 2
+
+            jacobian = (weights[active] / ranges)[:, :, None] * offsets
+            jacobian[planar[active], :, 2] = 0.0
+            gradient = np.einsum('mni,mn->mi', jacobian, residuals / np.sqrt(scale))
+            steps = []
+            # Curvature of the loss first, then the reweighted least squares weights
+            for curvature in (scale ** -1.5, scale ** -0.5):
+                normal = np.einsum('mn,mni,mnj->mij', curvature, jacobian, jacobian) + ridge
+                steps.append(-np.linalg.solve(normal, gradient[:, :, None])[:, :, 0])
+            newton, reweighted = steps
+            worse = loss(estimates[active] + newton, active) > loss(estimates[active], active)
+            step = np.where(worse[:, None], reweighted, newton)
+            estimates[active] += step
+
+            done = np.linalg.norm(step, axis=1) <= tol * (1.0 + np.linalg.norm(estimates[active], axis=1))
+            converged[active[done]] = True
+            active = active[~done]
+
+        return estimates, converged
+
+    def estimate_positions(self, distances: Union[np.ndarray, Sequence[Dict[str, float]]],
+                           confidences: Optional[Union[np.ndarray, Sequence[Optional[Dict[str, float]]]]] = None,
+                           landmark_names: Optional[Sequence[str]] = None,
+                           session_ids: Optional[Sequence[Optional[str]]] = None,
+                           timestamps: Optional[Sequence[Optional[float]]] = None,
+                           max_iterations: int = 20) -> Tuple[np.ndarray, np.ndarray]:
+        """Estimate many independent positions in one vectorized solve.
+
+        ``distances`` is either an (M, N) matrix whose columns follow
+        ``landmark_names`` with NaN for missing distances, or a ragged list of
+        M name -> distance dicts. Returns (M, 3) positions (NaN where fewer
+        than 3 known landmarks were given) and an (M,) convergence flag.
+        Fixes whose closed-form solution already fits are not iterated.
+        Fixes with a session id are smoothed into that session, in order and
+        at their ``timestamps`` when given.
+        """
+        positions, matrix, weights = self._padded_problem(distances, confidences, landmark_names)
+        if not len(matrix):
+            return np.empty((0, 3)), np.empty(0, dtype=bool)
+
+        start = time.perf_counter()
+        counts = (weights > 0).sum(axis=1)
+        linear, ok = self._linear_batch(positions, matrix, weights)
+        rms = self._rms_residuals(np.where(ok[:, None], linear, 0.0), positions, matrix, weights)
+        accepted = ok & (rms <= self.linear_tolerance)
+        linear_seconds = time.perf_counter() - start
+
+        # Start from the linear solution, else the session's last position or the landmark centroid
+        initial = np.zeros((len(matrix), 3))
+        if len(positions):
+            initial[:, :2] = ((weights > 0) @ positions[:, :2]) / np.maximum(counts, 1)[:, None]
+        sessions = [
+            self.sessions.get(session_id) if session_id else None
+            for session_id in (session_ids or [None] * len(matrix))
+        ]
+        for row, session in enumerate(sessions):
+            if session is not None and session.last_position is not None:
+                last = session.last_position
+                initial[row] = (last.x, last.y, last.z)
+        initial[ok] = linear[ok]
+
+        start = time.perf_counter()
+        estimates, converged = self._gauss_newton_batch(
+            positions, matrix, weights, initial, max_iterations, solve=~accepted
+        )
+        # The few fixes the batch leaves unconverged get the single-fix solver
+        for row in np.flatnonzero(~converged & ~accepted & (counts >= 3)):
+            valid = weights[row] > 0
+            solution = self._least_squares(
+                LandmarkArrays(positions[valid], matrix[row, valid], weights[row, valid]), initial[row]
+            )
+            if solution is not None:
+                estimates[row], converged[row] = solution, True
+        nonlinear_seconds = time.perf_counter() - start
+        estimates[accepted] = linear[accepted]
+        converged[accepted] = True
+        estimates[counts < 3] = np.nan
+
+        refined = int((ok & ~accepted).sum())
+        fallback = int((~ok & (counts >= 3)).sum())
+        iterated = max(refined + fallback, 1)
+        self.stats.record('linear', linear_seconds, int(accepted.sum()))
+        self.stats.record('refined', nonlinear_seconds * refined / iterated, refined)
+        self.stats.record('fallback', nonlinear_seconds * fallback / iterated, fallback)
+
+        for row, session in enumerate(sessions):
+            if session is None or not converged[row]:
+                continue
+            with session.lock:
+                smoothed = self._smooth_position(
+                    session, Point(*estimates[row]), timestamps[row] if timestamps else None
+                )
+                session.last_position = smoothed
+                version = session.version
+            estimates[row] = (smoothed.x, smoothed.y, smoothed.z)
+            self._notify(session_ids[row], smoothed, version)
+
+        return estimates, converged
+
+    def get_position_history(self, session_id: Optional[str] = None) -> List[Point]:
         """Get the history of position estimates"""
-        return self.position_history.copy()
+        session = self.sessions.get(session_id or DEFAULT_SESSION, create=False)
+        if session is None:
+            return []
+        with session.lock:
+            return list(session.position_history)
+
+    def configure_session(self, session_id: str, tracking: str) -> None:
+        """Select a session's tracking mode; its smoothing state starts over"""
+        if tracking not in TRACKING_MODES:
+            raise ValueError(f"Unknown tracking mode: {tracking}")
+        session = self.sessions.get(session_id)
+        with session.lock:
+            session.tracking = tracking
+            session.position_history.clear()
+            session.kalman = None
+            session.covariance = None
+            session.version = next(self._versions)
+
+    def get_track(self, session_id: Optional[str] = None) -> Dict[str, Optional[np.ndarray]]:
+        """Get a session's (K, 3) history, current position and 3x3 covariance as ENU arrays"""
+        session = self.sessions.get(session_id or DEFAULT_SESSION, create=False)
+        if session is None:
+            return {"history": np.empty((0, 3)), "position": None, "covariance": None}
+        with session.lock:
+            last = session.last_position
+            return {
+                "history": np.array([[p.x, p.y, p.z] for p in session.position_history]).reshape(-1, 3),
+                "position": np.array([last.x, last.y, last.z]) if last is not None else None,
+                "covariance": session.covariance.copy() if session.covariance is not None else None
+            }
+
+    def get_versions(self, session_id: Optional[str] = None) -> Tuple[int, int]:
+        """Get the landmark and session versions, for caching anything derived from them"""
+        session = self.sessions.get(session_id or DEFAULT_SESSION, create=False)
+        return self.landmark_version, session.version if session is not None else 0
+
+    def get_tracking_state(self, session_id: Optional[str] = None) -> Optional[Dict]:
+        """Get a session's tracking mode and, in Kalman mode, its velocity and position covariance"""
+        session = self.sessions.get(session_id or DEFAULT_SESSION, create=False)
+        if session is None:
+            return None
+        with session.lock:
+            state = {"tracking": session.tracking}
+            if session.kalman is not None and session.kalman.state is not None:
+                state["velocity"] = session.kalman.velocity.tolist()
+                state["covariance"] = session.covariance.tolist()
+            return state
 
-    def reset_position_history(self) -> None:
-        """Reset the position history"""
-        self.position_history = []
-        self.last_position = None 
\ No newline at end of file
+    def reset_position_history(self, session_id: Optional[str] = None) -> None:
+        """Reset the position history; the session keeps its tracking mode"""
+        session = self.sessions.get(session_id or DEFAULT_SESSION, create=False)
+        if session is None:
+            return
+        with session.lock:
+            session.position_history.clear()
+            session.last_position = None
+            session.kalman = None
+            session.covariance = None
+            session.version = next(self._versions) 
\ No newline at end of file
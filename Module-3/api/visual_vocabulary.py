@@ -0,0 +1,154 @@
+import numpy as np
+from scipy import sparse
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+from descriptor_index import knn_exact
+
+# Bump when the layout of the persisted vocabulary changes
+VOCABULARY_VERSION = 1
+
+class VisualVocabulary:
+    """Shared bag-of-visual-words vocabulary with a TF-IDF inverted file.
+
+    Descriptors are quantized to their nearest visual word. Each building is a
+    sparse row of word counts; recognition scores every building by the cosine
+    similarity of TF-IDF vectors, which only touches the posting lists of the
+    words present in the query.
+    """
+
+    def __init__(self, n_words: int = 1000, max_training_descriptors: int = 200000):
+        self.n_words = n_words
+        self.max_training_descriptors = max_training_descriptors
+        self.words = np.empty((0, 0), dtype=np.float32)
+        self._word_sq_norms = np.empty(0, dtype=np.float32)
+        self.names: List[str] = []
+        # Raw term counts, buildings x words
+        self.counts = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.idf = np.empty(0, dtype=np.float32)
+        # Inverted file: words x buildings, L2-normalised TF-IDF weights
+        self._postings = sparse.csr_matrix((0, 0), dtype=np.float32)
+
+    @property
+    def is_built(self) -> bool:
+        return len(self.words) > 0
+
+    def quantize(self, descriptors: np.ndarray) -> np.ndarray:
+        """Map descriptors to visual word ids"""
+        _, nearest = knn_exact(np.asarray(descriptors, dtype=np.float32), self.words, self._word_sq_norms, k=1)
+        return nearest[:, 0]
+
+    def _histogram(self, descriptors: np.ndarray) -> np.ndarray:
+        return np.bincount(self.quantize(descriptors), minlength=len(self.words)).astype(np.float32)
+
+    def build(self, descriptors: Dict[str, List[np.ndarray]]) -> None:
+        """Learn the vocabulary from every building's descriptors and index them"""
+        stacked = [np.vstack(features) for features in descriptors.values() if features]
+        if not stacked:
+            return
+        all_descriptors = np.vstack(stacked).astype(np.float32)
+
+        # Subsample so vocabulary training cost stays bounded as the store grows
+        if len(all_descriptors) > self.max_training_descriptors:
+            rng = np.random.default_rng(42)
+            keep = rng.choice(len(all_descriptors), self.max_training_descriptors, replace=False)
+            all_descriptors = all_descriptors[keep]
+
+        n_words = min(self.n_words, len(all_descriptors))
+        from sklearn.cluster import MiniBatchKMeans
+        kmeans = MiniBatchKMeans(n_clusters=n_words, batch_size=4096, n_init=3, random_state=42)
+        kmeans.fit(all_descriptors)
+        self.words = kmeans.cluster_centers_.astype(np.float32)
+        self._word_sq_norms = np.einsum('ij,ij->i', self.words, self.words)
+
+        self.names = []
+        self.counts = sparse.csr_matrix((0, len(self.words)), dtype=np.float32)
+        for building_name, features in descriptors.items():
+            if features:
+                self.add(building_name, np.vstack(features))
+        self._reweight()
+
+    def add(self, building_name: str, descriptors: np.ndarray, reweight: bool = False) -> None:
+        """Add descriptors of a building to the inverted file"""
+        histogram = sparse.csr_matrix(self._histogram(descriptors))
+        if building_name in self.names:
+            row = self.names.index(building_name)
+            update = sparse.csr_matrix(
+                (histogram.data, (np.full(histogram.nnz, row), histogram.indices)),
+                shape=self.counts.shape
+            )
+            self.counts = self.counts + update
+        else:
+            self.names.append(building_name)
+            self.counts = sparse.vstack([self.counts, histogram], format='csr')
+        if reweight:
+            self._reweight()
+
+    def _reweight(self) -> None:
+        """Recompute IDF and the normalised TF-IDF posting lists"""
+        n_docs = max(len(self.names), 1)
+        doc_freq = np.bincount(self.counts.indices, minlength=len(self.words))
+        self.idf = np.log((n_docs + 1) / (doc_freq + 1)).astype(np.float32) + 1.0
+
+        weighted = self.counts.multiply(self.idf[None, :]).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        weighted = sparse.diags(1.0 / norms) @ weighted
+        self._postings = weighted.T.tocsr().astype(np.float32)
+
+    def score(self, descriptors: np.ndarray) -> np.ndarray:
+        """Cosine similarity between the query and every building"""
+        histogram = self._histogram(descriptors)
+        words = np.flatnonzero(histogram)
+        query = histogram[words] * self.idf[words]
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(self.names), dtype=np.float32)
+
+        # Sparse vote: only the posting lists of words present in the query
+        return np.asarray(self._postings[words].T @ (query / norm)).ravel()
+
+    def recognize(self, descriptors: np.ndarray, min_score: float = 0.1) -> Tuple[Optional[str], float]:
+        """Return the best scoring building and its score"""
+        if not self.is_built or not self.names:
+            return None, 0.0
+        scores = self.score(descriptors)
+        best = int(np.argmax(scores))
+        best_score = float(scores[best])
+        return (self.names[best] if best_score >= min_score else None), best_score
+
+    def save(self, path: Path) -> None:
+        """Persist the vocabulary and inverted file"""
+        try:
+            np.savez(
+                path,
+                version=VOCABULARY_VERSION,
+                words=self.words,
+                names=np.array(self.names, dtype=object),
+                counts_data=self.counts.data,
+                counts_indices=self.counts.indices,
+                counts_indptr=self.counts.indptr,
+                counts_shape=np.array(self.counts.shape)
+            )
+        except Exception as e:
+            print(f"Error saving visual vocabulary: {str(e)}")
+
+    def load(self, path: Path) -> bool:
+        """Load a persisted vocabulary; returns False if missing or outdated"""
+        if not Path(path).exists():
+            return False
+        try:
+            with np.load(path, allow_pickle=True) as data:
+                if int(data['version']) != VOCABULARY_VERSION:
+                    return False
+                self.words = data['words'].astype(np.float32)
+                self.names = [str(name) for name in data['names']]
+                self.counts = sparse.csr_matrix(
+                    (data['counts_data'], data['counts_indices'], data['counts_indptr']),
+                    shape=tuple(data['counts_shape'])
+                )
+            self._word_sq_norms = np.einsum('ij,ij->i', self.words, self.words)
+            self._reweight()
+            return True
+        except Exception as e:
+            print(f"Error loading visual vocabulary: {str(e)}")
+            return False
@@ -1,10 +1,9 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 import io
 import base64
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
+from PIL import Image
 from trilateration import Point, TrilaterationSolver
 
 @dataclass
@@ -18,6 +17,14 @@ class VisualizationConfig:
     show_legend: bool = True
     show_confidence: bool = True
 
+# Square root of the 95% quantile of the chi-square distribution with 2 degrees of freedom
+CONFIDENCE_SCALE_95 = 2.4477
+
+def _pyplot():
+    """Import pyplot on first plot so that importing the API does not load matplotlib"""
+    import matplotlib.pyplot as plt
+    return plt
+
 class PositionVisualizer:
     def __init__(self, trilateration_solver: TrilaterationSolver, config: Optional[VisualizationConfig] = None):
         self.solver = trilateration_solver
@@ -28,16 +35,28 @@ class PositionVisualizer:
         self.history_line = None
         self.landmark_scatter = None
         self.animation = None
+        # Render cache: the encoded PNG is reused until the landmark or history
+        # version (or the figure config) changes
+        self._config_version = 0
+        self._cache: Optional[Tuple[tuple, bytes, str]] = None
+        # Static layer (axes, grid, legend, landmarks) reused between renders
+        self._background = None
+        self._background_key: Optional[tuple] = None
         
     def _setup_plot(self):
         """Initialize the plot with proper styling"""
+        plt = _pyplot()
         plt.style.use('seaborn')
         self.fig, self.ax = plt.subplots(figsize=self.config.figure_size, dpi=self.config.dpi)
+        self._config_version += 1
+        self._cache = None
+        self._background = None
         
         # Set up the plot
         self.ax.set_title('Real-time Position Tracking')
-        self.ax.set_xlabel('Longitude')
-        self.ax.set_ylabel('Latitude')
+        # Positions and landmarks are plotted in the solver's local ENU frame
+        self.ax.set_xlabel('East (m)')
+        self.ax.set_ylabel('North (m)')
         
         if self.config.show_grid:
             self.ax.grid(True, linestyle='--', alpha=0.7)
@@ -55,12 +74,13 @@ class PositionVisualizer:
             
         # Set equal aspect ratio
         self.ax.set_aspect('equal')
+        self.fig.tight_layout()
         
     def _update_plot(self, frame):
         """Update the plot with current position and landmarks"""
         # Get current position and history
         history = self.solver.get_position_history()
-        landmarks = self.solver.landmark_positions
+        landmarks = self.solver.landmark_points()
         
         if not history:
             return self.scatter, self.history_line, self.landmark_scatter
@@ -88,31 +108,34 @@ class PositionVisualizer:
         
     def _adjust_plot_limits(self):
         """Adjust plot limits to show all points with padding"""
-        history = self.solver.get_position_history()
-        landmarks = self.solver.landmark_positions
-        
+        limits = self._plot_limits(self.solver.get_position_history(), self.solver.landmark_points())
+        if limits is not None:
+            self.ax.set_xlim(*limits[:2])
+            self.ax.set_ylim(*limits[2:])
+
+    def _plot_limits(self, history: List[Point], landmarks: Dict[str, Point]) -> Optional[tuple]:
+        """Plot limits (x_min, x_max, y_min, y_max) showing all points with padding"""
         if not history and not landmarks:
-            return
+            return None
             
         # Get all x and y coordinates
         x_coords = [p.x for p in history] + [p.x for p in landmarks.values()]
         y_coords = [p.y for p in history] + [p.y for p in landmarks.values()]
         
-        if not x_coords or not y_coords:
-            return
-            
+
         # Calculate limits with padding
         x_min, x_max = min(x_coords), max(x_coords)
         y_min, y_max = min(y_coords), max(y_coords)
         
-        x_padding = (x_max - x_min) * 0.1
-        y_padding = (y_max - y_min) * 0.1
+        # At least a metre of padding so a single point still gets a valid range
+        x_padding = max((x_max - x_min) * 0.1, 1.0)
+        y_padding = max((y_max - y_min) * 0.1, 1.0)
         
-        self.ax.set_xlim(x_min - x_padding, x_max + x_padding)
-        self.ax.set_ylim(y_min - y_padding, y_max + y_padding)
+        return x_min - x_padding, x_max + x_padding, y_min - y_padding, y_max + y_padding
         
     def start_visualization(self):
         """Start real-time visualization"""
+        from matplotlib.animation import FuncAnimation
         self._setup_plot()
         self.animation = FuncAnimation(
             self.fig,
@@ -120,28 +143,142 @@ class PositionVisualizer:
             interval=self.config.update_interval,
             blit=True
         )
-        plt.show()
+        _pyplot().show()
         
-    def get_current_plot(self) -> str:
-        """Get current plot as base64 encoded image"""
+    def _cache_key(self) -> tuple:
+        landmark_version, history_version = self.solver.get_versions()
+        return landmark_version, history_version, self._config_version
+
+    def current_etag(self) -> str:
+        """ETag of the plot as it would render now, available without rendering"""
+        return '"%d-%d-%d"' % self._cache_key()
+
+    def _draw_background(self, landmarks: Dict[str, Point], limits: Optional[tuple]) -> None:
+        """Fully draw the static layer and keep a copy of it for blitting"""
+        if landmarks:
+            self.landmark_scatter.set_offsets([[p.x, p.y] for p in landmarks.values()])
+        else:
+            self.landmark_scatter.set_offsets(np.empty((0, 2)))
+        if limits is not None:
+            self.ax.set_xlim(*limits[:2])
+            self.ax.set_ylim(*limits[2:])
+        # Animated artists are left out of a full draw and blitted on top
+        self.scatter.set_animated(True)
+        self.history_line.set_animated(True)
+        self.fig.canvas.draw()
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    def _render(self, history: List[Point], landmarks: Dict[str, Point], landmark_version: int) -> bytes:
+        """Render the plot to PNG, redrawing the static layer only when it changed"""
+        limits = self._plot_limits(history, landmarks)
+        x_min, x_max = self.ax.get_xlim()
+        y_min, y_max = self.ax.get_ylim()
+        outside = any(not (x_min <= p.x <= x_max and y_min <= p.y <= y_max) for p in history)
+
+        if self._background is None or self._background_key != landmark_version or outside:
+            self._draw_background(landmarks, limits)
+            self._background_key = landmark_version
+        else:
+            self.fig.canvas.restore_region(self._background)
+
+        if history:
+            self.scatter.set_offsets([[history[-1].x, history[-1].y]])
+            self.history_line.set_data([p.x for p in history], [p.y for p in history])
+        else:
+            self.scatter.set_offsets(np.empty((0, 2)))
+            self.history_line.set_data([], [])
+        self.ax.draw_artist(self.history_line)
+        self.ax.draw_artist(self.scatter)
+
+        buf = io.BytesIO()
+        Image.fromarray(np.asarray(self.fig.canvas.buffer_rgba())).save(buf, format='PNG')
+        return buf.getvalue()
+
+    def render_png(self) -> Tuple[bytes, str]:
+        """Get the current plot as PNG bytes and its ETag, rendering only if something changed"""
+        key = self._cache_key()
+        if self._cache is not None and self._cache[0] == key:
+            return self._cache[1], self._cache[2]
+
         if self.fig is None:
             self._setup_plot()
-            
-        # Update the plot
-        self._update_plot(None)
-        
-        # Save plot to buffer
-        buf = io.BytesIO()
-        self.fig.savefig(buf, format='png', dpi=self.config.dpi, bbox_inches='tight')
-        buf.seek(0)
-        
-        # Convert to base64
-        img_str = base64.b64encode(buf.read()).decode('utf-8')
+            key = self._cache_key()
+        png = self._render(self.solver.get_position_history(), self.solver.landmark_points(), key[0])
+        etag = '"%d-%d-%d"' % key
+        self._cache = (key, png, etag)
+        return png, etag
+
+    def get_current_plot(self) -> str:
+        """Get current plot as base64 encoded image"""
+        png, _ = self.render_png()
+        img_str = base64.b64encode(png).decode('utf-8')
         return f"data:image/png;base64,{img_str}"
         
+    def _lon_lat(self, enu: np.ndarray) -> List[List[float]]:
+        """ENU metres to GeoJSON [longitude, latitude] pairs, rounded to about 1 cm"""
+        geodetic = self.solver.projection.inverse(enu).reshape(-1, 3)
+        return np.round(geodetic[:, [1, 0]], 7).tolist()
+
+    def _confidence_ellipse(self, center: np.ndarray, covariance: np.ndarray,
+                            n_points: int) -> np.ndarray:
+        """Closed ring of the 95% confidence ellipse of the east/north covariance"""
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance[:2, :2])
+        radii = CONFIDENCE_SCALE_95 * np.sqrt(np.maximum(eigenvalues, 0.0))
+        angles = np.linspace(0.0, 2.0 * np.pi, n_points + 1)
+        unit = np.column_stack([np.cos(angles), np.sin(angles)])
+        ring = np.zeros((n_points + 1, 3))
+        ring[:, :2] = center[:2] + (unit * radii) @ eigenvectors.T
+        ring[-1] = ring[0]
+        return ring
+
+    def get_geojson(self, session_id: Optional[str] = None, ellipse_points: int = 32) -> Dict:
+        """Get the track and landmarks as a GeoJSON FeatureCollection, without matplotlib.
+
+        Features are the current position, the history polyline, one point
+        per landmark and, when show_confidence is set and the session has a
+        covariance (Kalman tracking), its 95% confidence ellipse.
+        """
+        track = self.solver.get_track(session_id)
+        names, landmarks = self.solver.landmark_array()
+        features = []
+
+        position = track["position"]
+        if position is None and len(track["history"]):
+            position = track["history"][-1]
+        if position is not None:
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": self._lon_lat(position)[0]},
+                "properties": {"kind": "position"}
+            })
+        if len(track["history"]) > 1:
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "LineString", "coordinates": self._lon_lat(track["history"])},
+                "properties": {"kind": "history"}
+            })
+        if names:
+            for name, coordinates in zip(names, self._lon_lat(landmarks)):
+                features.append({
+                    "type": "Feature",
+                    "geometry": {"type": "Point", "coordinates": coordinates},
+                    "properties": {"kind": "landmark", "name": name}
+                })
+        if self.config.show_confidence and position is not None and track["covariance"] is not None:
+            ring = self._confidence_ellipse(position, track["covariance"], ellipse_points)
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Polygon", "coordinates": [self._lon_lat(ring)]},
+                "properties": {"kind": "confidence", "level": 0.95}
+            })
+
+        return {"type": "FeatureCollection", "features": features}
+
     def close(self):
         """Close the visualization"""
         if self.animation is not None:
             self.animation.event_source.stop()
         if self.fig is not None:
-            plt.close(self.fig) 
\ No newline at end of file
+            _pyplot().close(self.fig)
+        self._cache = None
+        self._background = None 
\ No newline at end of file
@@ -2,24 +2,19 @@ from flask import Flask, request, jsonify
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras.applications import ResNet50
-from tensorflow.keras.preprocessing import image
 from tensorflow.keras.applications.resnet50 import preprocess_input, decode_predictions
-import cv2
-import os
-from werkzeug.utils import secure_filename
+from PIL import Image
+import threading
 
 app = Flask(__name__)
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+INPUT_SIZE = (224, 224)
 
-# Create uploads folder if it doesn't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-# Initialize ResNet model
-model = ResNet50(weights='imagenet')
+# ResNet model, loaded on first use by get_model
+_model = None
+_model_lock = threading.Lock()
 
 # Building information database
 BUILDINGS = {
@@ -43,21 +38,32 @@ BUILDINGS = {
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def preprocess_image(img_path):
-    """Preprocess image for model input"""
-    img = image.load_img(img_path, target_size=(224, 224))
-    img_array = image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
+def get_model():
+    """Load the ResNet model once, with a warmup prediction so the first request is not slow"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                model = ResNet50(weights='imagenet')
+                model.predict(np.zeros((1,) + INPUT_SIZE + (3,), dtype=np.float32))
+                _model = model
+    return _model
+
+def preprocess_image(img_file):
+    """Decode an uploaded image stream straight into the model input array"""
+    # Same steps as keras image.load_img + img_to_array, without a file on disk
+    img = Image.open(img_file)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    img = img.resize(INPUT_SIZE, Image.NEAREST)
+    img_array = np.asarray(img, dtype=np.float32)[np.newaxis]
     return preprocess_input(img_array)
 
-def recognize_building(image_path):
+def recognize_building(processed_img):
     """Recognize building using ResNet model"""
     try:
-        # Preprocess image
-        processed_img = preprocess_image(image_path)
-        
         # Make prediction
-        predictions = model.predict(processed_img)
+        predictions = get_model().predict(processed_img)
         
         # Get top prediction
         decoded_predictions = decode_predictions(predictions, top=1)[0]
@@ -89,19 +95,14 @@ def recognize():
         return jsonify({'error': 'No selected file'}), 400
     
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        try:
+            processed_img = preprocess_image(file.stream)
+        except Exception as e:
+            return jsonify({'error': f'Invalid image: {str(e)}'}), 400
         
         try:
-            result = recognize_building(filepath)
-            # Clean up uploaded file
-            os.remove(filepath)
-            return jsonify(result)
+            return jsonify(recognize_building(processed_img))
         except Exception as e:
-            # Clean up uploaded file in case of error
-            if os.path.exists(filepath):
-                os.remove(filepath)
             return jsonify({'error': str(e)}), 500
     
     return jsonify({'error': 'Invalid file type'}), 400
@@ -120,4 +121,6 @@ def get_building(building_id):
     return jsonify({'error': 'Building not found'}), 404
 
 if __name__ == '__main__':
+    # Load and warm up the model before serving instead of on the first request
+    get_model()
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
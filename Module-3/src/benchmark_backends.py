@@ -0,0 +1,74 @@
+"""Latency and throughput of the inference backends on the Module-1 images.
+
+Times single-image latency and batched throughput for every backend whose
+artifacts exist (run export_model.py first) and reports its agreement with
+the eager model. Run from Module-3/src:
+
+    python benchmark_backends.py [--images ../Module-1/images] [--batch-size 8]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+import numpy as np
+import torch
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from building_inference.backends import BACKENDS, check_parity, load_model, load_sample_batch
+
+def time_latency(model, inputs, repeats):
+    """Per-image latencies in milliseconds at batch size one"""
+    latencies = []
+    with torch.no_grad():
+        for _ in range(repeats):
+            for image in inputs:
+                start = time.perf_counter()
+                model(image.unsqueeze(0))
+                latencies.append((time.perf_counter() - start) * 1000.0)
+    return np.array(latencies)
+
+def time_throughput(model, inputs, batch_size, repeats):
+    """Images per second when classifying in batches"""
+    start = time.perf_counter()
+    with torch.no_grad():
+        for _ in range(repeats):
+            for offset in range(0, len(inputs), batch_size):
+                model(inputs[offset:offset + batch_size])
+    return repeats * len(inputs) / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='../Module-2/resnet50_multiclass_building_detection_full.pth')
+    parser.add_argument('--images', default='../Module-1/images')
+    parser.add_argument('--limit', type=int, default=None, help='number of images to use')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=None, help='torch intra-op threads')
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    inputs, names = load_sample_batch(args.images, args.limit)
+    print(f"{len(names)} images, batch size {args.batch_size}, {torch.get_num_threads()} threads")
+    print(f"{'backend':<12} {'p50 ms':>8} {'p95 ms':>8} {'img/s':>8} {'top-1 agree':>12}")
+
+    reference = None
+    for backend in BACKENDS:
+        try:
+            model = load_model(args.model, backend)
+        except (ImportError, FileNotFoundError, ValueError, RuntimeError) as e:
+            print(f"{backend:<12} skipped: {str(e)}")
+            continue
+        if reference is None:
+            reference = model
+        # Warm up allocator and kernel selection before timing
+        time_throughput(model, inputs[:args.batch_size], args.batch_size, 1)
+
+        latencies = time_latency(model, inputs, args.repeats)
+        throughput = time_throughput(model, inputs, args.batch_size, args.repeats)
+        agreement = check_parity(reference, model, inputs)['top1_agreement']
+        print(f"{backend:<12} {np.percentile(latencies, 50):>8.1f} {np.percentile(latencies, 95):>8.1f} "
+              f"{throughput:>8.1f} {agreement:>12.1%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Latency and allocations of the BuildingDetector preprocessing paths.
+
+Compares, on the Module-1 images, the reference path (full decode, cv2
+BGR->RGB, PIL, Resize + ToTensor + Normalize) with the fused path (reduced
+decode, resize first, normalize into a reused float32 buffer). Allocations
+are counted with tracemalloc, which sees numpy buffers but not torch's
+own allocator. Run from Module-3/src:
+
+    python benchmark_preprocessing.py [--images ../Module-1/images] [--repeats 5]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import cv2
+import numpy as np
+import torchvision.transforms as transforms
+from pathlib import Path
+from PIL import Image
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from building_inference.preprocessing import FastPreprocessor, decode_image
+
+REFERENCE_TRANSFORM = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+])
+
+def reference_path(data):
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    return REFERENCE_TRANSFORM(Image.fromarray(image_rgb)).unsqueeze(0)
+
+def fused_path(preprocessor):
+    return lambda data: preprocessor(decode_image(data))
+
+def measure(preprocess, encoded, repeats):
+    """Median latency (ms), allocated blocks and peak traced bytes per image"""
+    for data in encoded[:2]:
+        preprocess(data)
+
+    latencies = []
+    for _ in range(repeats):
+        for data in encoded:
+            start = time.perf_counter()
+            preprocess(data)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+
+    blocks, peaks = 0, 0
+    tracemalloc.start()
+    for data in encoded:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        preprocess(data)
+        peaks += tracemalloc.get_traced_memory()[1]
+        after = tracemalloc.take_snapshot()
+        blocks += sum(max(stat.count_diff, 0) for stat in after.compare_to(before, 'lineno'))
+    tracemalloc.stop()
+    return np.median(latencies), blocks / len(encoded), peaks / len(encoded)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--images', default='../Module-1/images')
+    parser.add_argument('--limit', type=int, default=None, help='number of images to use')
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    names = sorted(name for name in os.listdir(args.images)
+                   if name.lower().endswith(('.png', '.jpg', '.jpeg')))[:args.limit]
+    encoded = []
+    for name in names:
+        with open(os.path.join(args.images, name), 'rb') as f:
+            encoded.append(f.read())
+
+    preprocessor = FastPreprocessor()
+    difference = max(
+        (reference_path(data) - preprocessor(decode_image(data))).abs().max().item() for data in encoded
+    )
+    print(f"{len(encoded)} images, max |difference| between paths {difference:.3f} (normalized units)")
+    print(f"{'path':<10} {'p50 ms':>8} {'blocks':>8} {'peak MB':>8}")
+    for label, preprocess in (('reference', reference_path), ('fused', fused_path(preprocessor))):
+        latency, blocks, peak = measure(preprocess, encoded, args.repeats)
+        print(f"{label:<10} {latency:>8.2f} {blocks:>8.1f} {peak / 1e6:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Export the building classifier to TorchScript and ONNX.
+
+Writes the artifacts next to the checkpoint (or to --output-dir), then
+checks every exported backend against the eager model on sample images
+and exits non-zero if one of them drifts. Run from Module-3/src:
+
+    python export_model.py [--model ../Module-2/resnet50_multiclass_building_detection_full.pth]
+                           [--images ../Module-1/images] [--atol 1e-3]
+"""
+import argparse
+import sys
+from pathlib import Path
+import torch
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from building_inference.backends import (
+    check_parity, export_model, load_checkpoint, load_model, load_sample_batch
+)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='../Module-2/resnet50_multiclass_building_detection_full.pth')
+    parser.add_argument('--output-dir', default=None, help='directory for the artifacts')
+    parser.add_argument('--images', default='../Module-1/images', help='images for the parity check')
+    parser.add_argument('--limit', type=int, default=32, help='number of images for the parity check')
+    parser.add_argument('--opset', type=int, default=17)
+    parser.add_argument('--atol', type=float, default=1e-3, help='largest allowed probability difference')
+    args = parser.parse_args()
+
+    paths = export_model(args.model, args.output_dir, args.opset)
+    for backend, path in paths.items():
+        print(f"{backend:<12} -> {path}")
+
+    inputs, _ = load_sample_batch(args.images, args.limit)
+    reference = load_checkpoint(args.model, torch.device('cpu'))
+    failed = False
+    for backend in paths:
+        try:
+            candidate = load_model(args.model, backend, artifact_dir=args.output_dir)
+        except ImportError as e:
+            print(f"{backend:<12} skipped: {str(e)}")
+            continue
+        result = check_parity(reference, candidate, inputs, args.atol)
+        failed |= not result['passed']
+        print(f"{backend:<12} max |dlogit| {result['max_logit_diff']:.2e}  "
+              f"max |dprob| {result['max_prob_diff']:.2e}  "
+              f"top-1 agreement {result['top1_agreement']:.1%}  "
+              f"{'ok' if result['passed'] else 'FAILED'}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -5,18 +5,36 @@ import numpy as np
 import cv2
 import pandas as pd
 import os
+import sys
+from pathlib import Path
+
+# The inference helpers are shared with the Module-4 backend from the repository root
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from building_inference.batching import MicroBatcher, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+from building_inference.backends import DEFAULT_BACKEND, backend_device, load_model
+from building_inference.preprocessing import FastPreprocessor
 
 class BuildingDetector:
-    def __init__(self, model_path='../Module-2/resnet50_multiclass_building_detection_full.pth'):
+    def __init__(self, model_path='../Module-2/resnet50_multiclass_building_detection_full.pth',
+                 max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 backend=DEFAULT_BACKEND, fast_preprocessing=True):
         """
         Initialize the building detector with the trained ResNet50 model.
         
         Args:
             model_path (str): Path to the trained model weights
+            max_batch_size (int): Most images classified in one forward pass
+            max_wait_ms (float): How long a request waits for others to join its batch
+            backend (str): 'eager', 'torchscript', 'onnxruntime' (see export_model.py)
+                or 'int8' (see quantize_model.py)
+            fast_preprocessing (bool): Use the fused numpy preprocessing instead of the PIL transforms
         """
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.model = torch.load(model_path, map_location=self.device)
-        self.model.eval()
+        self.backend = backend
+        self.device = backend_device(backend, torch.device('cuda' if torch.cuda.is_available() else 'cpu'))
+        self.model = load_model(model_path, backend, self.device)
+        
+        # Concurrent detect_building calls share one inference queue
+        self.batcher = MicroBatcher(self._classify_batch, max_batch_size, max_wait_ms)
         
         # Define image transformations
         self.transform = transforms.Compose([
@@ -25,6 +43,7 @@ class BuildingDetector:
             transforms.Normalize(mean=[0.485, 0.456, 0.406],
                               std=[0.229, 0.224, 0.225])
         ])
+        self.preprocessor = FastPreprocessor() if fast_preprocessing else None
         
         # Load building annotations
         self.annotations = self._load_annotations()
@@ -73,6 +92,9 @@ class BuildingDetector:
         Returns:
             torch.Tensor: Preprocessed image tensor
         """
+        if self.preprocessor is not None:
+            # Resize, channel swap and normalization in one pass into a per-thread buffer
+            return self.preprocessor(image).to(self.device)
         # Convert BGR to RGB
         image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         # Convert to PIL Image
@@ -83,6 +105,26 @@ class BuildingDetector:
         image_tensor = image_tensor.unsqueeze(0)
         return image_tensor.to(self.device)
     
+    def _classify_batch(self, image_tensors):
+        """
+        Classify a batch of preprocessed images in one forward pass.
+        
+        Args:
+            image_tensors (list): Tensors of shape (1, 3, 224, 224)
+            
+        Returns:
+            list: (class index, confidence) for each image
+        """
+        with torch.no_grad():
+            outputs = self.model(torch.cat(image_tensors))
+            probabilities = torch.nn.functional.softmax(outputs, dim=1)
+            confidence, predicted = torch.max(probabilities, 1)
+        return list(zip(predicted.cpu().tolist(), confidence.cpu().tolist()))
+    
+    def inference_stats(self):
+        """Batch-size and queue-wait histograms of the inference queue"""
+        return self.batcher.stats()
+    
     def detect_building(self, image):
         """
         Detect and classify buildings in the image.
@@ -96,15 +138,8 @@ class BuildingDetector:
         # Preprocess image
         image_tensor = self.preprocess_image(image)
         
-        # Get model predictions
-        with torch.no_grad():
-            outputs = self.model(image_tensor)
-            probabilities = torch.nn.functional.softmax(outputs, dim=1)
-            confidence, predicted = torch.max(probabilities, 1)
-        
-        # Convert to numpy
-        confidence = confidence.cpu().numpy()[0]
-        predicted = predicted.cpu().numpy()[0]
+        # Get model predictions, batched with concurrent requests
+        predicted, confidence = self.batcher.infer(image_tensor)
         
         # Get building name
         building_name = self.class_names[predicted]
@@ -0,0 +1,122 @@
+"""Post-training INT8 quantization of the building classifier.
+
+Quantizes the fp32 ResNet50 checkpoint, calibrating activation ranges on
+the Module-1 images, and evaluates the fp32 and INT8 models on the images
+listed in annotation.csv. The INT8 TorchScript model is published next to
+the checkpoint (where BuildingDetector(backend='int8') finds it) only if
+its top-1 accuracy is at most --max-drop points below fp32. Run from
+Module-3/src:
+
+    python quantize_model.py [--mode static|dynamic] [--max-drop 1.0]
+"""
+import argparse
+import copy
+import csv
+import os
+import sys
+from pathlib import Path
+import torch
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from building_inference.backends import (
+    INPUT_SHAPE, QUANTIZED_ENGINE, artifact_paths, load_checkpoint, load_quantized, load_sample_batch
+)
+
+def quantize(model, calibration_inputs, mode='static', batch_size=16):
+    """
+    Quantize an fp32 classifier to INT8.
+
+    Args:
+        model (torch.nn.Module): fp32 model in eval mode
+        calibration_inputs (torch.Tensor): Preprocessed images used to observe activation ranges
+        mode (str): 'static' quantizes convolutions and activations, 'dynamic' only the linear layers
+        batch_size (int): Batch size of the calibration passes
+
+    Returns:
+        torch.jit.ScriptModule: Frozen INT8 TorchScript model
+    """
+    if QUANTIZED_ENGINE in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = QUANTIZED_ENGINE
+    example = torch.randn(1, *INPUT_SHAPE)
+
+    if mode == 'dynamic':
+        quantized = torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {torch.nn.Linear}, dtype=torch.qint8)
+    elif mode == 'static':
+        from torch.ao.quantization import get_default_qconfig_mapping
+        from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+        qconfig_mapping = get_default_qconfig_mapping(torch.backends.quantized.engine)
+        prepared = prepare_fx(copy.deepcopy(model), qconfig_mapping, example_inputs=(example,))
+        with torch.no_grad():
+            for offset in range(0, len(calibration_inputs), batch_size):
+                prepared(calibration_inputs[offset:offset + batch_size])
+        quantized = convert_fx(prepared)
+    else:
+        raise ValueError(f"Unknown quantization mode '{mode}', expected 'static' or 'dynamic'")
+
+    with torch.no_grad():
+        return torch.jit.freeze(torch.jit.trace(quantized, example))
+
+def load_labeled_batch(annotation_file, image_dir):
+    """
+    Load the annotated images with their class indices.
+
+    Classes are numbered by the sorted unique labels, the same order
+    BuildingDetector uses for its class names.
+
+    Returns:
+        tuple: (N, 3, 224, 224) tensor and (N,) tensor of class indices
+    """
+    with open(annotation_file, newline='') as f:
+        labels = {row['image_name']: row['label'] for row in csv.DictReader(f)}
+    class_names = sorted(set(labels.values()))
+    inputs, names = load_sample_batch(image_dir)
+    keep = [i for i, name in enumerate(names) if name in labels]
+    targets = torch.tensor([class_names.index(labels[names[i]]) for i in keep])
+    return inputs[keep], targets
+
+def top1_accuracy(model, inputs, targets, batch_size=16):
+    correct = 0
+    with torch.no_grad():
+        for offset in range(0, len(inputs), batch_size):
+            logits = model(inputs[offset:offset + batch_size])
+            correct += (logits.argmax(dim=1) == targets[offset:offset + batch_size]).sum().item()
+    return correct / len(targets)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default='../Module-2/resnet50_multiclass_building_detection_full.pth')
+    parser.add_argument('--images', default='../Module-1/images', help='calibration and evaluation images')
+    parser.add_argument('--annotations', default='../Module-1/annotations/annotation.csv')
+    parser.add_argument('--mode', choices=('static', 'dynamic'), default='static')
+    parser.add_argument('--calibration-limit', type=int, default=None, help='number of calibration images')
+    parser.add_argument('--max-drop', type=float, default=1.0,
+                        help='largest allowed top-1 accuracy drop in percentage points')
+    parser.add_argument('--output', default=None, help='path of the published INT8 model')
+    args = parser.parse_args()
+
+    output = args.output or artifact_paths(args.model)['int8']
+    model = load_checkpoint(args.model, torch.device('cpu'))
+    calibration_inputs, _ = load_sample_batch(args.images, args.calibration_limit)
+    inputs, targets = load_labeled_batch(args.annotations, args.images)
+
+    # Evaluate the model as it will be served: saved and loaded back
+    tmp_output = output + '.tmp'
+    quantize(model, calibration_inputs, args.mode).save(tmp_output)
+    quantized = load_quantized(tmp_output)
+
+    fp32_accuracy = top1_accuracy(model, inputs, targets)
+    int8_accuracy = top1_accuracy(quantized, inputs, targets)
+    drop = (fp32_accuracy - int8_accuracy) * 100.0
+    print(f"{len(targets)} annotated images, {len(calibration_inputs)} calibration images, {args.mode} INT8")
+    print(f"fp32 top-1 {fp32_accuracy:.2%}  int8 top-1 {int8_accuracy:.2%}  drop {drop:.2f} points")
+    print(f"size {os.path.getsize(args.model) / 1e6:.1f} MB -> {os.path.getsize(tmp_output) / 1e6:.1f} MB")
+
+    if drop > args.max_drop:
+        os.remove(tmp_output)
+        print(f"Not publishing: accuracy drop exceeds {args.max_drop:.2f} points")
+        sys.exit(1)
+    os.replace(tmp_output, output)
+    print(f"Published {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+# The API and the building detector are flat modules, imported by name
+MODULE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(MODULE_DIR / 'src'))
+# The shared building_inference package lives at the repository root
+sys.path.insert(0, str(MODULE_DIR.parent))
+sys.path.insert(0, str(MODULE_DIR / 'api'))
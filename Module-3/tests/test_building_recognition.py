@@ -0,0 +1,119 @@
+import os
+import pickle
+import threading
+import numpy as np
+import pytest
+from building_recognition import BuildingRecognizer
+
+DIM = 128
+
+def clustered_descriptors(rng, mean, n_clusters=100, per_cluster=8):
+    """Descriptors in tight clusters, so K-means recovers the cluster points as centers"""
+    points = rng.normal(mean, 40.0, (n_clusters, DIM))
+    return [(points + rng.normal(0.0, 0.5, points.shape)).astype(np.float32) for _ in range(per_cluster)]
+
+def write_features(features_dir, name, descriptors, bump_mtime=False):
+    path = features_dir / f"{name}.pkl"
+    with open(path, 'wb') as f:
+        pickle.dump(descriptors, f)
+    if bump_mtime:
+        # Make the change visible even on filesystems with coarse timestamps
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+@pytest.fixture
+def features_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    write_features(tmp_path, 'A', clustered_descriptors(rng, 195.0))
+    write_features(tmp_path, 'B', clustered_descriptors(rng, -500.0))
+    return tmp_path
+
+@pytest.mark.parametrize('backend', ['exact', 'ivf'])
+def test_index_is_rebuilt_when_a_building_is_refit(features_dir, backend):
+    recognizer = BuildingRecognizer(str(features_dir), index_backend=backend)
+    assert recognizer.index.matches(recognizer.feature_centers)
+
+    # Replace A's features outside the app
+    rng = np.random.default_rng(1)
+    new_a = clustered_descriptors(rng, 500.0)
+    write_features(features_dir, 'A', new_a, bump_mtime=True)
+
+    recognizer = BuildingRecognizer(str(features_dir), index_backend=backend)
+    label = recognizer.index.names.index('A')
+    index_block = recognizer.index.vectors[recognizer.index.labels == label]
+    assert index_block.mean() == pytest.approx(np.asarray(recognizer.feature_centers['A']).mean(), abs=1.0)
+    assert index_block.mean() == pytest.approx(500.0, abs=20.0)
+
+    query = new_a[0] + rng.normal(0.0, 0.5, new_a[0].shape).astype(np.float32)
+    assert recognizer.recognize((None, query)) == 'A'
+
+def test_index_fingerprint_is_persisted(features_dir):
+    recognizer = BuildingRecognizer(str(features_dir))
+    reloaded = BuildingRecognizer(str(features_dir))
+    assert reloaded.index.fingerprint == recognizer.index.fingerprint
+    assert reloaded.index.matches(reloaded.feature_centers)
+
+    shifted = {name: np.asarray(centers) + 1.0 for name, centers in reloaded.feature_centers.items()}
+    assert not reloaded.index.matches(shifted)
+
+def textured_image(seed, size=320):
+    """Blurred noise: plenty of SIFT keypoints without any image files"""
+    import cv2
+    rng = np.random.default_rng(seed)
+    noise = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (5, 5), 0)
+
+def test_incremental_training_updates_centers_from_new_image_only(tmp_path):
+    recognizer = BuildingRecognizer(str(tmp_path), incremental_training=True)
+
+    first = recognizer.train(textured_image(0), 'C')
+    centers_after_first = np.array(recognizer.feature_centers['C'])
+    second = recognizer.train(textured_image(1), 'C')
+
+    assert first['sift']['mode'] == 'incremental'
+    assert second['sift']['mode'] == 'incremental'
+    centers = np.asarray(recognizer.feature_centers['C'])
+    assert centers.shape == (recognizer.n_clusters, DIM)
+    assert not np.allclose(centers, centers_after_first)
+    assert recognizer.get_building_info('C')['feature_count'] == 2
+
+    # The index and the appended pickle follow every update
+    label = recognizer.index.names.index('C')
+    assert np.allclose(recognizer.index.vectors[recognizer.index.labels == label], centers)
+    reloaded = BuildingRecognizer(str(tmp_path))
+    assert len(reloaded._load_descriptors('C')) == 2
+    assert np.allclose(reloaded.feature_centers['C'], centers)
+
+def test_recognition_keeps_running_during_a_refit(features_dir):
+    recognizer = BuildingRecognizer(str(features_dir))
+    fitting, release = threading.Event(), threading.Event()
+
+    def slow_runner(fn, *args):
+        fitting.set()
+        assert release.wait(5.0)
+        return fn(*args)
+
+    recognizer.cluster_runner = slow_runner
+    results = {}
+    trainer = threading.Thread(target=lambda: results.update(recognizer.train(textured_image(0), 'A')))
+    trainer.start()
+    try:
+        assert fitting.wait(5.0)
+        # The refit is in progress; matching answers from the current centers
+        with open(features_dir / 'B.pkl', 'rb') as f:
+            query = pickle.load(f)[0]
+        recognized = []
+        matcher = threading.Thread(target=lambda: recognized.append(recognizer.recognize((None, query))))
+        matcher.start()
+        matcher.join(2.0)
+        assert not matcher.is_alive()
+        assert recognized == ['B']
+    finally:
+        release.set()
+        trainer.join(10.0)
+
+    assert results['sift']['mode'] == 'full'
+    assert recognizer.get_building_info('A')['feature_count'] == 9
+    label = recognizer.index.names.index('A')
+    assert np.allclose(recognizer.index.vectors[recognizer.index.labels == label], recognizer.feature_centers['A'])
+    assert BuildingRecognizer(str(features_dir)).index.matches(recognizer.feature_centers)
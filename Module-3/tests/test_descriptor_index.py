@@ -0,0 +1,38 @@
+import numpy as np
+from descriptor_index import DescriptorIndex, IVFIndex, fill_missing_neighbours
+
+def make_centers(rng, n_buildings=3, rows=20, dim=16):
+    return {
+        f"building_{i}": rng.normal(i * 10.0, 1.0, (rows, dim)).astype(np.float32)
+        for i in range(n_buildings)
+    }
+
+def test_exact_knn_returns_sorted_labels():
+    rng = np.random.default_rng(0)
+    centers = make_centers(rng)
+    index = DescriptorIndex()
+    index.build(centers)
+
+    distances, labels = index.knn(centers["building_1"][:5], k=2)
+    assert np.all(labels[:, 0] == index.names.index("building_1"))
+    assert np.allclose(distances[:, 0], 0.0, atol=0.05)
+    assert np.all(distances[:, 0] <= distances[:, 1])
+
+def test_missing_second_neighbour_fails_ratio_test():
+    distances = np.array([[1.0, np.inf], [np.inf, np.inf], [1.0, 4.0]], dtype=np.float32)
+    missing = ~np.isfinite(distances)
+    fill_missing_neighbours(distances, missing)
+
+    good = distances[:, 0] < 0.75 * distances[:, 1]
+    assert good.tolist() == [False, False, True]
+
+def test_ivf_single_member_cells_do_not_pass_ratio_test():
+    rng = np.random.default_rng(1)
+    centers = make_centers(rng, n_buildings=2, rows=4)
+    # One cell per center and one probe: every query sees a single candidate
+    index = IVFIndex(nlist=8, nprobe=1)
+    index.build(centers)
+
+    distances, _ = index.knn(centers["building_0"], k=2)
+    assert np.all(np.isfinite(distances))
+    assert not np.any(distances[:, 0] < 0.75 * distances[:, 1])
@@ -0,0 +1,45 @@
+import math
+import numpy as np
+import pytest
+from distance_estimator import DistanceEstimator, MAX_OBLIQUE_ANGLE
+from geodesy import LocalProjection
+
+PROJECTION = LocalProjection()
+BUILDING_ENU = [200.0, 300.0, 0.0]
+
+@pytest.fixture
+def estimator(tmp_path):
+    estimator = DistanceEstimator(tmp_path / 'camera_calibration.json', projection=PROJECTION)
+    estimator.focal_length = 1000.0
+    estimator.camera_matrix = np.eye(3)
+    return estimator
+
+def lat_lon(enu):
+    lat, lon, _ = PROJECTION.inverse(enu)
+    return float(lat), float(lon)
+
+def user_at_bearing(degrees, radius=50.0):
+    """A user the given bearing (clockwise from north) away from the building"""
+    bearing = math.radians(degrees)
+    offset = radius * np.array([math.sin(bearing), math.cos(bearing), 0.0])
+    return lat_lon(np.subtract(BUILDING_ENU, offset))
+
+def test_without_a_user_location_the_pinhole_distance_is_returned(estimator):
+    assert estimator.distance_from_width(100.0) == pytest.approx(30.0)
+
+@pytest.mark.parametrize('bearing', [180.0, 135.0, -150.0])
+def test_buildings_to_the_south_get_positive_distances(estimator, bearing):
+    distance = estimator.distance_from_width(100.0, user_at_bearing(bearing), lat_lon(BUILDING_ENU))
+    expected = 30.0 / max(abs(math.cos(math.radians(bearing))), math.cos(MAX_OBLIQUE_ANGLE))
+    assert distance == pytest.approx(expected, rel=1e-3)
+
+@pytest.mark.parametrize('bearing', [90.0, -90.0, 89.9, -90.1])
+def test_buildings_to_the_east_or_west_get_bounded_distances(estimator, bearing):
+    distance = estimator.distance_from_width(100.0, user_at_bearing(bearing), lat_lon(BUILDING_ENU))
+    assert distance == pytest.approx(30.0 / math.cos(MAX_OBLIQUE_ANGLE), rel=1e-6)
+
+def test_the_bearing_is_taken_to_the_building_not_the_campus_origin(estimator):
+    # Due north of the building, but east of the campus origin
+    user = user_at_bearing(0.0)
+    assert estimator.distance_from_width(100.0, user, lat_lon(BUILDING_ENU)) == pytest.approx(30.0, rel=1e-6)
+    assert estimator.distance_from_width(100.0, user) > 30.0
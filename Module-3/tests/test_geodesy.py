@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from geodesy import LocalProjection, CAMPUS_ORIGIN
+
+def test_origin_projects_to_zero():
+    projection = LocalProjection()
+    assert projection.forward(*CAMPUS_ORIGIN) == pytest.approx([0.0, 0.0, 0.0], abs=1e-6)
+
+def test_axes_point_east_north_up():
+    projection = LocalProjection()
+    lat, lon = CAMPUS_ORIGIN
+    east, north, _ = projection.forward(lat, lon + 0.001)
+    assert east > 0 and abs(north) < 1e-2
+    east, north, _ = projection.forward(lat + 0.001, lon)
+    assert north > 0 and abs(east) < 1e-6
+    # One millidegree of latitude is about 111 m
+    assert north == pytest.approx(110.75, abs=0.5)
+    assert projection.forward(lat, lon, 10.0)[2] == pytest.approx(10.0, abs=1e-6)
+
+def test_batch_round_trip():
+    projection = LocalProjection()
+    rng = np.random.default_rng(0)
+    enu = rng.uniform([-2000.0, -2000.0, -50.0], [2000.0, 2000.0, 50.0], size=(100, 3))
+
+    geodetic = projection.inverse(enu)
+    assert geodetic.shape == (100, 3)
+    round_trip = projection.forward(geodetic[:, 0], geodetic[:, 1], geodetic[:, 2])
+    assert round_trip == pytest.approx(enu, abs=1e-6)
+    # A single point round-trips through the same vectorized calls
+    assert projection.forward(*projection.inverse(enu[0])) == pytest.approx(enu[0], abs=1e-6)
@@ -0,0 +1,107 @@
+import threading
+import time
+from concurrent.futures import TimeoutError
+import pytest
+from building_inference.batching import MicroBatcher
+
+class Recorder:
+    """run_batch that records the batches it is given"""
+
+    def __init__(self, delay=0.0, gate=None):
+        self.batches = []
+        self.delay = delay
+        self.gate = gate
+        self.started = threading.Event()
+
+    def __call__(self, items):
+        self.started.set()
+        if self.gate is not None:
+            self.gate.wait()
+        time.sleep(self.delay)
+        self.batches.append(list(items))
+        return [item * 10 for item in items]
+
+@pytest.fixture
+def batchers():
+    created = []
+
+    def create(*args, **kwargs):
+        created.append(MicroBatcher(*args, **kwargs))
+        return created[-1]
+    yield create
+    for batcher in created:
+        batcher.close()
+
+def test_each_caller_gets_the_result_of_its_own_input(batchers):
+    recorder = Recorder()
+    batcher = batchers(recorder, max_batch_size=4, max_wait_ms=20)
+    futures = [batcher.submit(i) for i in range(10)]
+
+    assert [future.result(2.0) for future in futures] == [i * 10 for i in range(10)]
+    assert [item for batch in recorder.batches for item in batch] == list(range(10))
+    assert max(len(batch) for batch in recorder.batches) <= 4
+
+def test_requests_queued_behind_a_running_batch_are_grouped(batchers):
+    gate = threading.Event()
+    recorder = Recorder(gate=gate)
+    batcher = batchers(recorder, max_batch_size=8, max_wait_ms=0)
+    first = batcher.submit(0)
+    assert recorder.started.wait(2.0)
+    rest = [batcher.submit(i) for i in range(1, 6)]
+    gate.set()
+
+    assert [future.result(2.0) for future in [first] + rest] == [0, 10, 20, 30, 40, 50]
+    assert recorder.batches == [[0], [1, 2, 3, 4, 5]]
+    assert batcher.stats()['batch_size']['count'] == 2
+
+def test_a_lone_request_waits_at_most_max_wait(batchers):
+    batcher = batchers(Recorder(), max_batch_size=8, max_wait_ms=50)
+    start = time.perf_counter()
+    assert batcher.infer(3, timeout=2.0) == 30
+    assert time.perf_counter() - start < 0.5
+
+def test_infer_times_out_when_the_batch_is_slow(batchers):
+    batcher = batchers(Recorder(delay=0.3), max_wait_ms=0)
+    with pytest.raises(TimeoutError):
+        batcher.infer(1, timeout=0.05)
+
+def test_a_failed_batch_fails_every_caller_in_it(batchers):
+    gate = threading.Event()
+
+    def run_batch(items):
+        gate.wait()
+        raise RuntimeError("model crashed")
+
+    batcher = batchers(run_batch, max_batch_size=4, max_wait_ms=0)
+    futures = [batcher.submit(i) for i in range(3)]
+    gate.set()
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model crashed"):
+            future.result(2.0)
+
+def test_a_wrong_number_of_results_is_an_error(batchers):
+    batcher = batchers(lambda items: items[:-1], max_wait_ms=0)
+    with pytest.raises(RuntimeError, match="0 results for 1 inputs"):
+        batcher.infer(1, timeout=2.0)
+
+def test_cancelled_requests_are_skipped_and_the_worker_keeps_running(batchers):
+    gate = threading.Event()
+    recorder = Recorder(gate=gate)
+    batcher = batchers(recorder, max_batch_size=8, max_wait_ms=0)
+    first = batcher.submit(0)
+    assert recorder.started.wait(2.0)
+    queued = [batcher.submit(i) for i in range(1, 4)]
+    assert queued[1].cancel()
+    assert not first.cancel()
+    gate.set()
+
+    assert [first.result(2.0), queued[0].result(2.0), queued[2].result(2.0)] == [0, 10, 30]
+    assert batcher.infer(4, timeout=2.0) == 40
+    assert recorder.batches == [[0], [1, 3], [4]]
+
+def test_close_finishes_queued_requests(batchers):
+    batcher = batchers(Recorder(delay=0.01), max_batch_size=2, max_wait_ms=0)
+    futures = [batcher.submit(i) for i in range(5)]
+    batcher.close()
+    assert all(future.done() for future in futures)
+    assert [future.result() for future in futures] == [0, 10, 20, 30, 40]
@@ -0,0 +1,90 @@
+import json
+import threading
+import time
+from dataclasses import dataclass
+from landmark_store import LandmarkStore
+
+@dataclass
+class Point:
+    x: float
+    y: float
+    z: float = 0.0
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_a_burst_of_updates_is_written_once(tmp_path):
+    path = tmp_path / 'landmarks.json'
+    store = LandmarkStore(path, Point, flush_delay=0.1)
+    for i in range(20):
+        store.upsert({f"landmark-{i}": Point(i, -i)})
+
+    # Memory is updated right away, the file only after the delay
+    assert len(store.positions) == 20
+    assert not path.exists()
+    assert wait_for(lambda: store.writes == 1)
+    time.sleep(0.2)
+    assert store.writes == 1
+    assert len(json.loads(path.read_text())) == 20
+
+def test_unchanged_positions_do_not_schedule_a_write(tmp_path):
+    store = LandmarkStore(tmp_path / 'landmarks.json', Point, flush_delay=0)
+    store.upsert({'library': Point(1.0, 2.0)})
+    store.upsert({'library': Point(1.0, 2.0)})
+    assert store.writes == 1
+
+def test_close_writes_pending_changes_and_reload_restores_them(tmp_path):
+    path = tmp_path / 'landmarks.json'
+    store = LandmarkStore(path, Point, flush_delay=60.0)
+    store.upsert({'library': Point(24.9, 67.1, 3.0)})
+    store.close()
+
+    assert store.writes == 1
+    assert LandmarkStore(path, Point).positions == {'library': Point(24.9, 67.1, 3.0)}
+    assert list(tmp_path.iterdir()) == [path]
+
+def test_readers_never_see_a_partial_file(tmp_path):
+    path = tmp_path / 'landmarks.json'
+    store = LandmarkStore(path, Point, flush_delay=0)
+    store.upsert({f"landmark-{i}": Point(i, i) for i in range(200)})
+    stop = threading.Event()
+    errors = []
+
+    def read():
+        while not stop.is_set():
+            try:
+                json.loads(path.read_text())
+            except ValueError as e:
+                errors.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    try:
+        for step in range(50):
+            store.upsert({f"landmark-{i}": Point(i, step) for i in range(200)})
+    finally:
+        stop.set()
+        reader.join()
+    assert errors == []
+    assert store.writes == 51
+
+def test_a_failed_write_is_retried_on_the_next_flush(tmp_path, monkeypatch):
+    path = tmp_path / 'landmarks.json'
+    store = LandmarkStore(path, Point, flush_delay=60.0)
+    store.upsert({'library': Point(1.0, 2.0)})
+
+    def fail(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr('landmark_store.os.replace', fail)
+    store.flush()
+    assert store.writes == 0 and not path.exists()
+
+    monkeypatch.undo()
+    store.close()
+    assert store.writes == 1
+    assert json.loads(path.read_text()) == {'library': {'x': 1.0, 'y': 2.0, 'z': 0.0}}
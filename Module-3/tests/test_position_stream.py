@@ -0,0 +1,107 @@
+import asyncio
+import time
+from position_stream import PositionBroadcaster, follow, follow_until
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, timeout=5.0))
+
+def closes_after(seconds):
+    deadline = time.monotonic() + seconds
+
+    async def closed():
+        return time.monotonic() >= deadline
+    return closed
+
+def test_an_idle_stream_without_keepalives_notices_the_disconnect():
+    async def scenario():
+        broadcaster = PositionBroadcaster()
+        subscription = broadcaster.subscribe('idle')
+        start = time.monotonic()
+        try:
+            messages = [m async for m in follow(subscription, closes_after(0.1), keepalive=0.0, poll=0.02)]
+        finally:
+            broadcaster.unsubscribe(subscription)
+        return messages, time.monotonic() - start, broadcaster.stats()
+
+    messages, elapsed, stats = run(scenario())
+    assert messages == []
+    assert elapsed < 1.0
+    assert stats['connections'] == 0
+
+def test_a_closed_future_ends_an_idle_stream_without_polling():
+    async def scenario():
+        broadcaster = PositionBroadcaster()
+        broadcaster.bind(asyncio.get_running_loop())
+        subscription = broadcaster.subscribe('socket')
+        waits = []
+        next_message = subscription.next
+
+        async def counted_next(timeout):
+            waits.append(timeout)
+            return await next_message(timeout)
+        subscription.next = counted_next
+
+        closed = asyncio.get_running_loop().create_future()
+        asyncio.get_running_loop().call_later(0.1, closed.set_result, None)
+        start = time.monotonic()
+        messages = [m async for m in follow_until(subscription, closed, keepalive=0.0)]
+        return messages, waits, time.monotonic() - start
+
+    messages, waits, elapsed = run(scenario())
+    assert messages == []
+    # One untimed wait for the whole idle period, ended by the closure
+    assert waits == [None]
+    assert elapsed < 1.0
+
+def test_follow_until_delivers_fixes_and_keepalives():
+    async def scenario():
+        broadcaster = PositionBroadcaster()
+        broadcaster.bind(asyncio.get_running_loop())
+        subscription = broadcaster.subscribe('walker')
+        closed = asyncio.get_running_loop().create_future()
+        asyncio.get_running_loop().call_later(0.3, closed.set_result, None)
+        messages = []
+        async for message in follow_until(subscription, closed, keepalive=0.05):
+            messages.append(message)
+            if len(messages) == 1:
+                broadcaster.publish('walker', {'version': 1})
+                broadcaster.publish('walker', {'version': 2})
+        return messages
+
+    messages = run(scenario())
+    fixes = [fix['version'] for message in messages if message for fix in message['fixes']]
+    assert fixes == [1, 2]
+    assert messages[0] is None and messages.count(None) >= 3
+
+def test_fixes_are_delivered_in_order_and_keepalives_fill_idle_time():
+    async def scenario():
+        broadcaster = PositionBroadcaster()
+        broadcaster.bind(asyncio.get_running_loop())
+        subscription = broadcaster.subscribe('walker')
+        messages = []
+        async for message in follow(subscription, closes_after(0.3), keepalive=0.05, poll=0.01):
+            messages.append(message)
+            if len(messages) == 1:
+                broadcaster.publish('walker', {'version': 1})
+                broadcaster.publish('walker', {'version': 2})
+        return messages
+
+    messages = run(scenario())
+    fixes = [fix['version'] for message in messages if message for fix in message['fixes']]
+    assert fixes == [1, 2]
+    # The first message is a keepalive, and more follow once the fixes are sent
+    assert messages[0] is None and messages.count(None) >= 3
+
+def test_a_slow_consumer_gets_coalesced_fixes():
+    async def scenario():
+        broadcaster = PositionBroadcaster(max_pending=2)
+        broadcaster.bind(asyncio.get_running_loop())
+        subscription = broadcaster.subscribe('slow')
+        for version in range(5):
+            broadcaster.publish('slow', {'version': version})
+        await asyncio.sleep(0)
+        return await subscription.next(1.0)
+
+    message = run(scenario())
+    assert [fix['version'] for fix in message['fixes']] == [3, 4]
+    assert message['coalesced'] == 3
@@ -0,0 +1,62 @@
+import threading
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+torch = pytest.importorskip('torch')
+transforms = pytest.importorskip('torchvision.transforms')
+from building_inference.preprocessing import FastPreprocessor, decode_image
+
+REFERENCE_TRANSFORM = transforms.Compose([
+    transforms.Resize((224, 224)),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+])
+
+def reference(image):
+    return REFERENCE_TRANSFORM(Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))).unsqueeze(0)
+
+def smooth_image(height, width):
+    """BGR gradients that interpolate alike under any resampling filter"""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    return np.stack([
+        255.0 * x / width, 255.0 * y / height, 127.5 + 100.0 * np.sin(x / 40.0) * np.cos(y / 40.0)
+    ], axis=-1).round().astype(np.uint8)
+
+def test_matches_the_torchvision_transform_without_resizing():
+    image = np.random.default_rng(0).integers(0, 256, (224, 224, 3), dtype=np.uint8)
+    assert torch.allclose(FastPreprocessor()(image), reference(image), atol=1e-5)
+
+def test_matches_the_torchvision_transform_up_to_interpolation_rounding():
+    image = smooth_image(600, 800)
+    difference = (FastPreprocessor()(image) - reference(image)).abs()
+    assert difference.shape == (1, 3, 224, 224)
+    # One uint8 step is about 0.017 normalized units
+    assert difference.mean().item() < 0.02
+    assert difference.max().item() < 0.1
+
+def test_each_thread_reuses_its_own_buffer():
+    preprocessor = FastPreprocessor()
+    first = preprocessor(smooth_image(224, 224))
+    second = preprocessor(smooth_image(300, 300))
+    assert first.data_ptr() == second.data_ptr()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(preprocessor(smooth_image(224, 224)).data_ptr()))
+    thread.start()
+    thread.join()
+    assert other[0] != first.data_ptr()
+
+def test_large_jpegs_are_decoded_at_reduced_resolution():
+    ok, encoded = cv2.imencode('.jpg', smooth_image(1200, 1600))
+    assert ok
+    image = decode_image(encoded.tobytes())
+    # 1/4 scale is the smallest that keeps the short side at least 224 pixels
+    assert image.shape == (300, 400, 3)
+
+def test_small_or_undecodable_images_fall_back_to_a_full_decode():
+    ok, encoded = cv2.imencode('.png', smooth_image(200, 300))
+    assert ok
+    assert decode_image(encoded.tobytes()).shape == (200, 300, 3)
+    assert decode_image(b'not an image') is None
@@ -0,0 +1,56 @@
+import pytest
+import sessions
+from sessions import SessionStore
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, 'monotonic', clock)
+    return clock
+
+def test_sessions_are_created_once_per_token(clock):
+    store = SessionStore(list)
+    first = store.get('a')
+    first.append(1)
+    assert store.get('a') is first
+    assert store.get('b', create=False) is None
+    assert len(store) == 1
+
+def test_the_least_recently_used_session_is_evicted_when_full(clock):
+    store = SessionStore(list, max_sessions=2)
+    store.get('a')
+    store.get('b')
+    store.get('a')
+    store.get('c')
+
+    assert store.get('b', create=False) is None
+    assert store.get('a', create=False) is not None
+    assert store.get('c', create=False) is not None
+    assert store.stats()['evicted'] == 1
+
+def test_idle_sessions_expire_and_access_renews_them(clock):
+    store = SessionStore(list, ttl_seconds=60.0)
+    store.get('idle')
+    store.get('busy')
+    clock.now += 45.0
+    store.get('busy')
+    clock.now += 30.0
+
+    assert store.get('idle', create=False) is None
+    assert store.get('busy', create=False) is not None
+    stats = store.stats()
+    assert stats['active'] == 1 and stats['expired'] == 1 and stats['evicted'] == 0
+
+def test_discard_drops_a_session(clock):
+    store = SessionStore(list)
+    store.get('a')
+    assert store.discard('a')
+    assert not store.discard('a')
+    assert len(store) == 0
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+from trilateration import Point, TrilaterationSolver
+
+LANDMARKS_ENU = {
+    'north_gate': [0.0, 120.0, 0.0],
+    'library': [90.0, 80.0, 0.0],
+    'admin': [-60.0, -40.0, 0.0],
+    'cafe': [70.0, -90.0, 0.0],
+}
+
+@pytest.fixture
+def solver(tmp_path):
+    solver = TrilaterationSolver(str(tmp_path / 'calibration.json'), flush_delay=0)
+    names = list(LANDMARKS_ENU)
+    geodetic = solver.projection.inverse([LANDMARKS_ENU[name] for name in names])
+    solver.update_landmark_positions({name: Point(*row) for name, row in zip(names, geodetic)})
+    yield solver
+    solver.close()
+
+def ranges_from(position, noise=None):
+    distances = {name: float(np.linalg.norm(np.subtract(enu, position))) for name, enu in LANDMARKS_ENU.items()}
+    if noise is not None:
+        distances = {name: d + n for (name, d), n in zip(distances.items(), noise)}
+    return distances
+
+def soft_l1_cost(point, distances):
+    """The robust cost the nonlinear solver minimizes"""
+    residuals = np.array([
+        np.linalg.norm(np.subtract(LANDMARKS_ENU[name], [point.x, point.y, point.z])) - d
+        for name, d in distances.items()
+    ])
+    return np.sum(2.0 * (np.sqrt(1.0 + residuals ** 2) - 1.0))
+
+def test_exact_ranges_take_the_linear_path(solver):
+    position = solver.estimate_position(ranges_from([25.0, 10.0, 0.0]), session_id='a')
+
+    assert [position.x, position.y] == pytest.approx([25.0, 10.0], abs=1e-3)
+    assert solver.stats.snapshot()['linear']['count'] == 1
+
+def test_refined_fix_fits_the_ranges_at_least_as_well_as_the_linear_one(solver):
+    distances = ranges_from([25.0, 10.0, 0.0], noise=[4.0, -3.0, 2.5, -5.0])
+    solver.linear_tolerance = np.inf
+    linear = solver.estimate_position(distances, session_id='linear')
+    solver.linear_tolerance = 0.0
+    refined = solver.estimate_position(distances, session_id='refined')
+
+    paths = solver.stats.snapshot()
+    assert paths['linear']['count'] == 1 and paths['refined']['count'] == 1
+    assert soft_l1_cost(refined, distances) <= soft_l1_cost(linear, distances) + 1e-6
+    assert np.hypot(refined.x - 25.0, refined.y - 10.0) < 10.0
+
+def test_batch_solve_matches_single_fixes(solver):
+    truths = [[25.0, 10.0, 0.0], [-20.0, 40.0, 0.0], [5.0, -30.0, 0.0]]
+    fixes = [ranges_from(truth, noise=[1.0, -0.5, 0.5, -1.0]) for truth in truths]
+    solver.linear_tolerance = 0.0
+
+    # Coplanar landmarks leave z unconstrained; the batch solve must still converge
+    estimates, converged = solver.estimate_positions(fixes)
+    assert converged.all()
+    assert np.abs(estimates[:, 2]).max() < 1e-3
+    for row, distances in enumerate(fixes):
+        single = solver.estimate_position(distances, session_id=f"single-{row}")
+        assert estimates[row, :2] == pytest.approx([single.x, single.y], abs=0.05)
+
+# Surveyed campus landmarks: level ground, but their ENU heights differ by
+# millimetres because the frame's up axis is tangent at the origin
+CAMPUS_LANDMARKS = {
+    'north_gate': (24.9157, 67.0997),
+    'library': (24.9140, 67.1010),
+    'admin': (24.9135, 67.0985),
+    'cafe': (24.9150, 67.0975),
+}
+
+def test_batch_solve_converges_on_projected_campus_landmarks(tmp_path):
+    solver = TrilaterationSolver(str(tmp_path / 'calibration.json'), flush_delay=0)
+    solver.update_landmark_positions({name: Point(*lat_lon) for name, lat_lon in CAMPUS_LANDMARKS.items()})
+    names, enu = solver.landmark_array()
+    assert np.ptp(enu[:, 2]) > 1e-3
+
+    rng = np.random.default_rng(0)
+    truths = np.column_stack([rng.uniform(-100.0, 100.0, (50, 2)), np.zeros(50)])
+    ranges = np.linalg.norm(truths[:, None, :] - enu[None, :, :], axis=2)
+    ranges += rng.normal(0.0, 2.0, ranges.shape)
+    try:
+        estimates, converged = solver.estimate_positions(ranges, landmark_names=names)
+        assert converged.all()
+        assert np.abs(estimates[:, 2]).max() < 1.0
+        assert np.hypot(*(estimates - truths)[:, :2].T).max() < 10.0
+        for row in range(0, 50, 10):
+            single = solver.estimate_position(dict(zip(names, ranges[row])), session_id=f"single-{row}")
+            assert estimates[row, :2] == pytest.approx([single.x, single.y], abs=0.05)
+    finally:
+        solver.close()
+
+def test_kalman_sessions_keep_a_bounded_history_of_filtered_positions(solver):
+    solver.configure_session('walker', 'kalman')
+    filtered = []
+    for step in range(solver.max_history + 5):
+        truth = [-40.0 + 2.0 * step, 5.0, 0.0]
+        filtered.append(solver.estimate_position(ranges_from(truth), session_id='walker', timestamp=float(step)))
+
+    history = solver.get_position_history('walker')
+    assert len(history) == solver.max_history
+    assert history == filtered[-solver.max_history:]
+    assert solver.get_track('walker')['history'].shape == (solver.max_history, 3)
+    assert solver.get_tracking_state('walker')['velocity'][0] == pytest.approx(2.0, abs=0.5)
+
+    solver.reset_position_history('walker')
+    assert solver.get_position_history('walker') == []
+    assert solver.get_tracking_state('walker')['tracking'] == 'kalman'
+
+def test_window_sessions_average_the_last_fixes(solver):
+    for step in range(solver.max_history + 3):
+        solver.estimate_position(ranges_from([float(step), 0.0, 0.0]), session_id='window')
+
+    history = solver.get_position_history('window')
+    assert len(history) == solver.max_history
+    assert history[-1].x == pytest.approx(solver.max_history + 2.0, abs=1e-3)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from trilateration import Point, TrilaterationSolver
+from visualization import CONFIDENCE_SCALE_95, PositionVisualizer, VisualizationConfig
+
+LANDMARKS_ENU = {
+    'north_gate': [0.0, 120.0, 0.0],
+    'library': [90.0, 80.0, 0.0],
+    'admin': [-60.0, -40.0, 0.0],
+    'cafe': [70.0, -90.0, 0.0],
+}
+
+@pytest.fixture
+def solver(tmp_path):
+    solver = TrilaterationSolver(str(tmp_path / 'calibration.json'), flush_delay=0)
+    names = list(LANDMARKS_ENU)
+    geodetic = solver.projection.inverse([LANDMARKS_ENU[name] for name in names])
+    solver.update_landmark_positions({name: Point(*row) for name, row in zip(names, geodetic)})
+    yield solver
+    solver.close()
+
+def walk(solver, session_id, steps=6):
+    solver.configure_session(session_id, 'kalman')
+    for step in range(steps):
+        truth = [-20.0 + 3.0 * step, 10.0, 0.0]
+        ranges = {name: float(np.linalg.norm(np.subtract(enu, truth))) for name, enu in LANDMARKS_ENU.items()}
+        solver.estimate_position(ranges, session_id=session_id, timestamp=float(step))
+
+def enu_of(projection, coordinates):
+    """GeoJSON [lon, lat] pairs back to ENU metres"""
+    coordinates = np.asarray(coordinates)
+    return projection.forward(coordinates[..., 1], coordinates[..., 0])
+
+def test_geojson_has_every_feature_kind_in_lon_lat_order(solver):
+    walk(solver, 'walker')
+    geojson = PositionVisualizer(solver).get_geojson('walker')
+
+    assert geojson['type'] == 'FeatureCollection'
+    kinds = [feature['properties']['kind'] for feature in geojson['features']]
+    assert kinds == ['position', 'history'] + ['landmark'] * len(LANDMARKS_ENU) + ['confidence']
+
+    track = solver.get_track('walker')
+    features = geojson['features']
+    assert enu_of(solver.projection, features[0]['geometry']['coordinates'])[:2] == \
+        pytest.approx(track['position'][:2], abs=0.02)
+    history = enu_of(solver.projection, features[1]['geometry']['coordinates'])
+    np.testing.assert_allclose(history[:, :2], track['history'][:, :2], atol=0.02)
+    for feature in features[2:-1]:
+        enu = enu_of(solver.projection, feature['geometry']['coordinates'])
+        assert enu[:2] == pytest.approx(LANDMARKS_ENU[feature['properties']['name']][:2], abs=0.02)
+
+def test_confidence_is_left_out_without_a_covariance_or_when_disabled(solver):
+    walk(solver, 'walker')
+    hidden = PositionVisualizer(solver, VisualizationConfig(show_confidence=False)).get_geojson('walker')
+    assert 'confidence' not in [f['properties']['kind'] for f in hidden['features']]
+
+    assert PositionVisualizer(solver).get_geojson('nobody')['features'][0]['properties']['kind'] == 'landmark'
+
+def test_confidence_ellipse_is_a_closed_ring_sized_for_95_percent(solver):
+    covariance = np.diag([4.0, 1.0, 9.0])
+    center = np.array([10.0, -5.0, 0.0])
+    ring = PositionVisualizer(solver)._confidence_ellipse(center, covariance, 64)
+
+    assert ring.shape == (65, 3)
+    assert np.array_equal(ring[0], ring[-1])
+    offsets = ring[:, :2] - center[:2]
+    semi_axes = CONFIDENCE_SCALE_95 * np.array([2.0, 1.0])
+    # Every point lies on the ellipse with those semi-axes, which it spans in full
+    np.testing.assert_allclose(np.sum((offsets / semi_axes) ** 2, axis=1), 1.0, atol=1e-9)
+    assert np.abs(offsets).max(axis=0) == pytest.approx(semi_axes, rel=1e-3)
+
+def test_confidence_polygon_round_trips_to_the_session_covariance(solver):
+    walk(solver, 'walker')
+    geojson = PositionVisualizer(solver).get_geojson('walker', ellipse_points=64)
+    polygon = geojson['features'][-1]['geometry']['coordinates']
+
+    assert len(polygon) == 1 and polygon[0][0] == polygon[0][-1]
+    track = solver.get_track('walker')
+    offsets = enu_of(solver.projection, polygon[0])[:, :2] - track['position'][:2]
+    inverse = np.linalg.inv(track['covariance'][:2, :2])
+    mahalanobis = np.einsum('ij,jk,ik->i', offsets, inverse, offsets)
+    np.testing.assert_allclose(np.sqrt(mahalanobis), CONFIDENCE_SCALE_95, rtol=0.05)
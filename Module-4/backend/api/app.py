@@ -12,10 +12,13 @@ from dotenv import load_dotenv
 from functools import wraps
 import time
 
-# Add the parent directory to the path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Add the parent directory to the path, and the repository root for the shared building_inference package
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+sys.path.append(os.path.dirname(os.path.dirname(BACKEND_DIR)))
 
 from modules.building_detection import BuildingDetector
+from building_inference.preprocessing import decode_image
 from modules.distance_estimation import AdvancedDistanceEstimator
 from modules.camera_calibration import CalibrationUtility
 from utils.trilateration import TrilaterationService
@@ -134,8 +137,8 @@ def detect_building():
             logger.error("Empty filename")
             return jsonify({'success': False, 'error': 'No selected file'}), 400
 
-        # Read and process image
-        img = cv2.imdecode(np.frombuffer(file.read(), np.uint8), cv2.IMREAD_COLOR)
+        # Decode at the lowest resolution the classifier needs
+        img = decode_image(file.read())
         if img is None:
             logger.error("Failed to decode image")
             return jsonify({'success': False, 'error': 'Invalid image format'}), 400
@@ -272,6 +275,15 @@ def get_buildings():
         logger.error(f"Error getting buildings: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/inference_stats', methods=['GET'])
+@rate_limit
+def inference_stats():
+    try:
+        return jsonify({'success': True, 'stats': detector.inference_stats()})
+    except Exception as e:
+        logger.error(f"Error getting inference stats: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/health', methods=['GET'])
 @rate_limit
 def health_check():
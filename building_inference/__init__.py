@@ -0,0 +1,11 @@
+"""Inference helpers for the ResNet50 building classifier.
+
+Shared by BuildingDetector in Module-3/src (model_utils.py) and in the
+Module-4 backend (modules/building_detection.py):
+
+- batching: MicroBatcher, the shared micro-batching inference queue
+- backends: eager, TorchScript, ONNX Runtime and INT8 model loading and export
+- preprocessing: reduced-resolution decoding and the fused FastPreprocessor
+
+Scripts in either module put the repository root on sys.path to import it.
+"""
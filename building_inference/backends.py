@@ -0,0 +1,180 @@
+import os
+import cv2
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+
+BACKENDS = ('eager', 'torchscript', 'onnxruntime', 'int8')
+DEFAULT_BACKEND = os.getenv('INFERENCE_BACKEND', 'eager')
+# Quantized kernels: 'x86' (fbgemm) on servers, 'qnnpack' on ARM
+QUANTIZED_ENGINE = os.getenv('QUANTIZED_ENGINE', 'x86')
+
+# Input shape the classifier was trained on; the batch dimension stays dynamic
+INPUT_SHAPE = (3, 224, 224)
+
+def artifact_paths(model_path, output_dir=None):
+    """
+    Paths of the exported artifacts that belong to a checkpoint.
+
+    Args:
+        model_path (str): Path to the pickled PyTorch model
+        output_dir (str): Directory of the artifacts, next to the checkpoint by default
+
+    Returns:
+        dict: Artifact path per exported backend
+    """
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    directory = output_dir or os.path.dirname(model_path)
+    return {
+        'torchscript': os.path.join(directory, stem + '.torchscript.pt'),
+        'onnxruntime': os.path.join(directory, stem + '.onnx'),
+        'int8': os.path.join(directory, stem + '.int8.torchscript.pt')
+    }
+
+def load_sample_batch(image_dir, limit=None):
+    """
+    Load images from a directory (e.g. Module-1/images) as one preprocessed batch.
+
+    Args:
+        image_dir (str): Directory of JPEG/PNG images
+        limit (int): Largest number of images to load
+
+    Returns:
+        tuple: (N, 3, 224, 224) tensor and the image file names
+    """
+    transform = transforms.Compose([
+        transforms.Resize(INPUT_SHAPE[1:]),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+    ])
+    names = sorted(name for name in os.listdir(image_dir)
+                   if name.lower().endswith(('.png', '.jpg', '.jpeg')))[:limit]
+    tensors, loaded = [], []
+    for name in names:
+        image = cv2.imread(os.path.join(image_dir, name))
+        if image is None:
+            print(f"Error reading image: {name}")
+            continue
+        tensors.append(transform(Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))))
+        loaded.append(name)
+    if not tensors:
+        raise FileNotFoundError(f"No readable images in {image_dir}")
+    return torch.stack(tensors), loaded
+
+def load_checkpoint(model_path, device):
+    """Load the full pickled model saved by the Module-2 training notebook"""
+    # Full-model pickles need weights_only=False on torch >= 2.6
+    model = torch.load(model_path, map_location=device, weights_only=False)
+    model.eval()
+    return model
+
+class OnnxRuntimeModel:
+    """ONNX Runtime CPU session with the call interface of a torch module"""
+
+    def __init__(self, onnx_path, num_threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def eval(self):
+        return self
+
+    def __call__(self, batch):
+        logits = self.session.run(None, {self.input_name: batch.detach().cpu().numpy()})[0]
+        return torch.from_numpy(logits)
+
+def load_model(model_path, backend=DEFAULT_BACKEND, device=None, artifact_dir=None):
+    """
+    Load the building classifier for one inference backend.
+
+    Args:
+        model_path (str): Path to the pickled PyTorch model; exported artifacts are looked up next to it
+        backend (str): 'eager', 'torchscript', 'onnxruntime' or 'int8'
+        device (torch.device): Device for the PyTorch backends; ONNX Runtime and INT8 always run on CPU
+        artifact_dir (str): Directory of the exported artifacts, next to the checkpoint by default
+
+    Returns:
+        Callable mapping a (N, 3, 224, 224) tensor to (N, classes) logits
+    """
+    device = device or torch.device('cpu')
+    if backend == 'eager':
+        return load_checkpoint(model_path, device)
+    paths = artifact_paths(model_path, artifact_dir)
+    if backend == 'torchscript':
+        model = torch.jit.load(paths['torchscript'], map_location=device)
+        model.eval()
+        return model
+    if backend == 'onnxruntime':
+        return OnnxRuntimeModel(paths['onnxruntime'])
+    if backend == 'int8':
+        return load_quantized(paths['int8'])
+    raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+def load_quantized(path):
+    """Load an INT8 TorchScript model written by quantize_model.py"""
+    if QUANTIZED_ENGINE in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = QUANTIZED_ENGINE
+    model = torch.jit.load(path, map_location='cpu')
+    model.eval()
+    return model
+
+def backend_device(backend, device):
+    """Device the inputs of a backend have to be on"""
+    return torch.device('cpu') if backend in ('onnxruntime', 'int8') else device
+
+def export_model(model_path, output_dir=None, opset=17):
+    """
+    Export a checkpoint to TorchScript and ONNX.
+
+    Args:
+        model_path (str): Path to the pickled PyTorch model
+        output_dir (str): Directory for the artifacts, next to the checkpoint by default
+        opset (int): ONNX opset version
+
+    Returns:
+        dict: Written artifact path per backend
+    """
+    paths = artifact_paths(model_path, output_dir)
+    model = load_checkpoint(model_path, torch.device('cpu'))
+    example = torch.randn(1, *INPUT_SHAPE)
+
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+        traced = torch.jit.freeze(traced)
+    traced.save(paths['torchscript'])
+
+    torch.onnx.export(
+        model, example, paths['onnxruntime'],
+        input_names=['input'], output_names=['logits'],
+        dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+        opset_version=opset
+    )
+    return {backend: paths[backend] for backend in ('torchscript', 'onnxruntime')}
+
+def check_parity(reference, candidate, inputs, atol=1e-3):
+    """
+    Compare the outputs of two backends on the same inputs.
+
+    Args:
+        reference: Model whose outputs are taken as correct
+        candidate: Model to check
+        inputs (torch.Tensor): Batch of preprocessed images on CPU
+        atol (float): Largest allowed absolute difference of the softmax probabilities
+
+    Returns:
+        dict: Largest logit and probability differences, top-1 agreement and the verdict
+    """
+    with torch.no_grad():
+        expected = reference(inputs).float().cpu()
+        actual = candidate(inputs).float().cpu()
+    prob_diff = (torch.softmax(expected, dim=1) - torch.softmax(actual, dim=1)).abs().max().item()
+    agreement = (expected.argmax(dim=1) == actual.argmax(dim=1)).float().mean().item()
+    return {
+        'max_logit_diff': (expected - actual).abs().max().item(),
+        'max_prob_diff': prob_diff,
+        'top1_agreement': agreement,
+        'passed': prob_diff <= atol and agreement == 1.0
+    }
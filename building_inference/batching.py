@@ -0,0 +1,150 @@
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '8'))
+DEFAULT_MAX_WAIT_MS = float(os.getenv('INFERENCE_MAX_WAIT_MS', '5'))
+
+# Upper bucket bounds of the queue-wait histogram, in milliseconds
+WAIT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+class Histogram:
+    """Counts of observations per bucket; the last bucket is unbounded"""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def snapshot(self) -> Dict:
+        labels = [f"<={bound:g}" for bound in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'count': self.total,
+            'mean': self.sum / self.total if self.total else 0.0
+        }
+
+
+class MicroBatcher:
+    """Shared inference queue that groups concurrent requests into batches.
+
+    Callers submit one input and block until its result is ready. A single
+    worker thread takes the first queued input, waits at most
+    ``max_wait_ms`` for more to arrive, and hands up to ``max_batch_size``
+    inputs to ``run_batch`` in one call. ``run_batch`` returns one result per
+    input, in order; if it raises, every caller in that batch gets the error.
+    Inputs whose future was cancelled before their batch started are skipped.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batch_sizes = Histogram(range(1, self.max_batch_size + 1))
+        self.queue_wait_ms = Histogram(WAIT_BUCKETS_MS)
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+                self._worker.start()
+
+    def submit(self, item: Any) -> Future:
+        """Queue one input; the returned future resolves to its result"""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def infer(self, item: Any, timeout: float = None) -> Any:
+        """Submit one input and wait for its result"""
+        return self.submit(item).result(timeout)
+
+    @staticmethod
+    def _wanted(entry) -> bool:
+        """Whether an entry is the stop sentinel or still has a caller; marks its future running"""
+        return entry is None or entry[1].set_running_or_notify_cancel()
+
+    def _collect(self) -> List:
+        entry = self._queue.get()
+        while not self._wanted(entry):
+            entry = self._queue.get()
+        batch = [entry]
+        if entry is None:
+            return batch
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if not self._wanted(entry):
+                continue
+            batch.append(entry)
+            if entry is None:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            stop = batch[-1] is None
+            batch = [entry for entry in batch if entry is not None]
+            if batch:
+                self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch: List) -> None:
+        started = time.perf_counter()
+        with self._stats_lock:
+            self.batch_sizes.observe(len(batch))
+            for _, _, enqueued in batch:
+                self.queue_wait_ms.observe((started - enqueued) * 1000.0)
+
+        try:
+            results = self.run_batch([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} inputs")
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def close(self) -> None:
+        """Finish queued requests and stop the worker"""
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'pending': self._queue.qsize(),
+                'batch_size': self.batch_sizes.snapshot(),
+                'queue_wait_ms': self.queue_wait_ms.snapshot()
+            }